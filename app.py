@@ -12,6 +12,7 @@ Date: 12/2/18
 from consts import *
 from game2d import *
 from wave import *
+from atlas import ensureAtlas
 
 
 class Invaders(GameApp):
@@ -46,15 +47,22 @@ class Invaders(GameApp):
         input:  the user input, used to control the ship and change state
                 [instance of GInput; it is inherited from GameApp]
         _state: the current state of the game represented as a value from consts.py
-                [one of STATE_INACTIVE, STATE_NEWWAVE, STATE_ACTIVE, STATE_PAUSED, STATE_CONTINUE, STATE_COMPLETE]
+                [one of STATE_LOADING, STATE_INACTIVE, STATE_NEWWAVE, STATE_ACTIVE, STATE_PAUSED, STATE_CONTINUE, STATE_COMPLETE]
         _wave:  the subcontroller for a single wave, which manages the ships and aliens
                 [Wave, or None if there is no wave currently active]
-        _text:  the currently active message
+        _text:  the currently active message, attached to the view above the wave
                 [GLabel, or None if there is no message to display]
+        _next:  the next wave, made a little at a time while the game waits for the
+                player, so that starting it does not skip a frame
+                [Wave made with lazy=True, or None if it is not started yet]
+        _loader: the images, sounds and fonts loaded before the first wave, with the
+                images pinned in the texture cache since they are always on screen
+                [Preloader]
 
     STATE SPECIFIC INVARIANTS:
-        Attribute _wave is only None if _state is STATE_INACTIVE.
-        Attribute _text is only None if _state is STATE_ACTIVE.
+        Attribute _wave is only None if _state is STATE_LOADING or STATE_INACTIVE.
+        Attribute _next is None if _state is STATE_LOADING.
+        Attribute _text is None if and only if _state is STATE_ACTIVE.
 
     For a complete description of how the states work, see the specification for the
     method update.
@@ -67,6 +75,7 @@ class Invaders(GameApp):
         lastkeys:   the number of keys pressed last frame [int >= 0] Credits to Professor White
         scoreCount: the text with a count of the score [GLabel]
         LivesCount: the text with a count of the score [GLabel]
+        _finished:  the number of waves finished so far [int >= 0]
     """
 
     def start(self):
@@ -78,20 +87,34 @@ class Invaders(GameApp):
         You should use it to initialize any game specific attributes.
 
         This method should make sure that all of the attributes satisfy the given
-        invariants. When done, it sets the _state to STATE_INACTIVE and create a message
-        (in attribute _text) saying that the user should press to play a game.
+        invariants. When done, it sets the _state to STATE_LOADING and starts loading the
+        images, sounds and fonts, with a message (in attribute _text) showing how much
+        has been loaded.  The images are loaded from the texture atlas, which is made
+        first if the images have changed since it was saved (see atlas.py).
+
+        The view is retained, so that a frame only adds and removes the objects that
+        appeared or went away since the last one, instead of rebuilding the window.
+        The score and lives are attached to the view above everything else, so they
+        are never drawn again; they show their new text as it changes.  The message
+        in _text is attached the same way, each time a state that shows one begins.
         """
-        self._state = STATE_INACTIVE
+        self.view.retained = True
+        self._state = STATE_LOADING
         self._wave = None
-        if self._state == STATE_INACTIVE:
-            self._text = GLabel(x = GAME_WIDTH/2, y = GAME_HEIGHT/2, \
-                text = "Press 'S' to Play", font_size = 50 )
-        else:
-            self._text = None
+        self._next = None
+        self._text = None
+        ensureAtlas()
+        self._loader = Preloader(atlases = (ATLAS_FILE,), sounds = WAVE_SOUNDS, \
+            fonts = HUD_FONTS, workers = PRELOAD_WORKERS, pin = True)
+        self._showMessage("Loading", GAME_HEIGHT/2)
+        self.lastkeys = 0
+        self._finished = 0
         self.scoreCount =  GLabel(x = 50, y = GAME_HEIGHT - ALIEN_CEILING/4, \
             text = "", font_size = 20 )
         self.LivesCount =  GLabel(x = 50, y = GAME_HEIGHT - ALIEN_CEILING/2, \
             text = "", font_size = 20 )
+        self.view.attach(self.scoreCount, above = True)
+        self.view.attach(self.LivesCount, above = True)
 
     def update(self,dt):
         """
@@ -107,7 +130,12 @@ class Invaders(GameApp):
         STATE_ACTIVE, STATE_PAUSED, STATE_CONTINUE, and STATE_COMPLETE.  Each one of these
         does its own thing and might even needs its own helper.  We describe these below.
 
-        STATE_INACTIVE: This is the state when the application first opens.  It is a
+        STATE_LOADING: This is the state when the application first opens.  The images,
+        sounds and fonts are loaded in the background while a message shows how much
+        has been loaded.  The application switches to STATE_INACTIVE when everything is
+        loaded, so that nothing is read from a file during a wave.
+
+        STATE_INACTIVE: This is the state after the application has loaded.  It is a
         paused state, waiting for the player to start the game.  It displays a simple
         message on the screen. The application remains in this state so long as the
         player never presses a key.  In addition, this is the state the application
@@ -140,24 +168,33 @@ class Invaders(GameApp):
         Precondition: dt is a number (int or float)
         """
         self._determineState()
+        if self._state == STATE_LOADING:
+            self._loadAssets()
+        self._prepareNext()
         if self._state == STATE_NEWWAVE:
-            self._wave = Wave()
+            if self._next is None:
+                self._next = Wave(lazy=True, sounds=self._loader.sounds)
+            if not self._wave is None:
+                self._wave.detach(self.view)
+            self._wave = self._next
+            self._wave.prepare()
+            self._next = None
             self._state = STATE_ACTIVE
+            self._hideMessage()
         if self._state == STATE_ACTIVE:
             self._wave.update(self.input,dt)
-            self.scoreCount.text = "Score: " + str(self._wave.getScore())
-            self.LivesCount.text = "Lives: " + str(self._wave.getLives())
+            self._showCounts()
         if self._state == STATE_ACTIVE and self._wave.getFinish() == True:
             self._state = STATE_COMPLETE
+            self._saveRecording()
+            self.finish()
         if self._state == STATE_ACTIVE and self._wave.getShip() is None:
             self._state = STATE_PAUSED
-        if self._state == STATE_PAUSED:
             self.pausedState()
         if self._state == STATE_CONTINUE:
             self._state = STATE_ACTIVE
+            self._hideMessage()
             self._wave.createShip()
-        if self._state == STATE_COMPLETE:
-            self.finish()
 
     def draw(self):
         """
@@ -170,43 +207,129 @@ class Invaders(GameApp):
         Wave. In order to draw them, you either need to add getters for these attributes
         or you need to add a draw method to class Wave.  We suggest the latter.  See
         the example subcontroller.py from class.
+
+        The aliens and defensive line of the wave, the score and lives, and the
+        message are attached to the view instead of drawn (see start and Wave.attach).
         """
-        if (self._state == STATE_INACTIVE) or (self._state == STATE_PAUSED) or\
-            (self._state == STATE_COMPLETE):
-            self._text.draw(self.view)
         if (not self._wave is None) and (self._state != STATE_COMPLETE):
+            self._wave.attach(self.view)
             self._wave.draw(self.view)
-        if (not self.scoreCount is None) and ((self._state!= STATE_INACTIVE) or\
-            (self._state != STATE_NEWWAVE)):
-            self.scoreCount.draw(self.view)
-        if (not self.LivesCount is None) and ((self._state!= STATE_INACTIVE) or\
-            (self._state != STATE_NEWWAVE)):
-            self.LivesCount.draw(self.view)
+        elif not self._wave is None:
+            self._wave.detach(self.view)
 
     def pausedState(self):
         """
         Method for when the state is paused.
 
-        When self._state == STATE_PAUSED, in other words when the player loses
+        When self._state becomes STATE_PAUSED, in other words when the player loses
         a life, then this method is used to prompt the player to press 'S' to
-        continue.
+        continue.  It is only called on the frame the state changes.
         """
-        self._text = GLabel(x = GAME_WIDTH/2, y = SHIP_BOTTOM, \
-            text = "Press 'S' to Continue", font_size = 50 )
+        self._showMessage("Press 'S' to Continue", SHIP_BOTTOM)
 
     def finish(self):
         """
         Method for when the game is finished.
 
-        When self._state == STATE_COMPLETE, then this method is called to prompt
-        the player whether they lost or won the game.
+        When self._state becomes STATE_COMPLETE, then this method is called to prompt
+        the player whether they lost or won the game.  The message stays on screen
+        in STATE_INACTIVE, until the next wave starts.
         """
         if self._wave.getWin() == True:
-            self._text = GLabel(x = GAME_WIDTH/2, y = GAME_HEIGHT/2, \
-                text = "You Win!!", font_size = 50 )
-        if self._wave.getWin() == False:
-            self._text = GLabel(x = GAME_WIDTH/2, y = GAME_HEIGHT/2, \
-                text = "Game Over", font_size = 50 )
+            self._showMessage("You Win!!", GAME_HEIGHT/2)
+        else:
+            self._showMessage("Game Over", GAME_HEIGHT/2)
+
+    def _loadAssets(self):
+        """
+        Loads part of the images, sounds and fonts, and shows how much is loaded
+
+        At most PRELOAD_BUDGET seconds are spent in each frame.  When everything is
+        loaded, the state changes to STATE_INACTIVE and the first wave is started.
+        """
+        if self._loader.update(PRELOAD_BUDGET):
+            self._state = STATE_INACTIVE
+            self._next = Wave(lazy=True, sounds=self._loader.sounds)
+            self._showMessage("Press 'S' to Play", GAME_HEIGHT/2)
+        else:
+            self._setText(self._text, "Loading " + str(int(100*self._loader.progress)) + "%")
+
+    def _showMessage(self, text, y):
+        """
+        Replaces the message on screen with a new one
+
+        The old message, if any, is detached from the view and the new one attached
+        above everything else.  This is only done when the state changes, so that
+        no label is made in the frames in between.
+
+        Parameter text: the message to show
+        Precondition: text is a string
+
+        Parameter y: the vertical center of the message
+        Precondition: y is a number (int or float)
+        """
+        self._hideMessage()
+        self._text = GLabel(x = GAME_WIDTH/2, y = y, text = text, font_size = 50 )
+        self.view.attach(self._text, above = True)
+
+    def _hideMessage(self):
+        """
+        Detaches the message on screen from the view, if there is one
+        """
+        if not self._text is None:
+            self.view.detach(self._text)
+            self._text = None
+
+    def _showCounts(self):
+        """
+        Shows the score and lives of the wave in scoreCount and LivesCount
+        """
+        self._setText(self.scoreCount, "Score: " + str(self._wave.getScore()))
+        self._setText(self.LivesCount, "Lives: " + str(self._wave.getLives()))
+
+    def _setText(self, label, text):
+        """
+        Sets the text of label, if it is not that text already
+
+        Setting the text of a label renders it again, so it is skipped in the frames
+        where nothing changed.
+
+        Parameter label: the label to change
+        Precondition: label is a GLabel
+
+        Parameter text: the new text
+        Precondition: text is a string
+        """
+        if label.text != text:
+            label.text = text
+
+    def _prepareNext(self):
+        """
+        Makes part of the next wave while the game is waiting for the player
+
+        The next wave is started once the current one is complete, and is made
+        PREPARE_BUDGET seconds at a time in every frame that is not STATE_ACTIVE or
+        STATE_LOADING.
+        """
+        if self._state == STATE_ACTIVE or self._state == STATE_LOADING:
+            return
+        if self._next is None and self._state == STATE_COMPLETE:
+            self._next = Wave(lazy=True, sounds=self._loader.sounds)
+        if not self._next is None:
+            self._next.prepare(PREPARE_BUDGET)
+
+    def _saveRecording(self):
+        """
+        Saves the input of the finished wave, if there is a RECORD_FILE.
+
+        Each wave gets its own file, named after RECORD_FILE with the number of the
+        wave added, so game.rec keeps the waves in game-1.rec, game-2.rec and so on.
+        The files can be played back with no window using replay.py.
+        """
+        self._finished += 1
+        if not RECORD_FILE is None:
+            path = RECORD_FILE[:-len('.rec')] + '-' + str(self._finished) + '.rec'
+            self._wave.getRecorder().save(path)
 
     def _determineState(self):
         """
@@ -215,10 +338,14 @@ class Invaders(GameApp):
         This method checks for a key press, and if there is one, changes the state
         to the next value.  A key press is when a key is pressed for the FIRST TIME.
         We do not want the state to continue to change as we hold down the key.  The
-        user must release the key and press it again to change the state.
+        user must release the key and press it again to change the state.  Key presses
+        are ignored while the game is in STATE_LOADING.  Pausing the game this way
+        shows the same message as losing a ship.
         """
         curr_keys = self.input.key_count
-        change = curr_keys > 0 and self.lastkeys == 0
+        change = curr_keys > 0 and self.lastkeys == 0 and self._state != STATE_LOADING
         if change and self.input.is_key_down('s'):
             self._state = (self._state + 1) % NUM_STATES
+            if self._state == STATE_PAUSED:
+                self.pausedState()
         self.lastkeys= curr_keys
@@ -0,0 +1,149 @@
+"""
+Texture atlas module for Alien Invaders
+
+This module packs the sprite images of the game into one image, so that a frame
+can be drawn with a single texture.  The atlas is written to Images/ in the format
+of Kivy atlases: an image, and a JSON file that maps the name of the image to a
+dictionary with the region [x, y, width, height] of each sprite, where y is
+measured from the bottom of the atlas image as in OpenGL.  The sprites are named by
+their file names, so GameApp.load_atlas can put each region in the texture cache
+under the name that GImage and GSprite already use for the file.
+
+The atlas is made from the PNG files themselves (with decodePNG and encodePNG of
+raster.py, so no Kivy is needed) and kept on disk.  ensureAtlas only makes it again
+when one of the images is newer than the atlas.  The module can also be run as a
+script to make the atlas and print its regions:
+
+    python atlas.py
+"""
+from consts import *
+from raster import encodePNG, loadImage, IMAGE_DIR
+import numpy as np
+import json
+import os
+
+
+# The width of the atlas image, in pixels
+ATLAS_WIDTH = 256
+# The number of clear pixels around each sprite, so that scaling does not blend in
+# the pixels of its neighbors
+ATLAS_PADDING = 2
+
+
+def packImages(sizes, width=ATLAS_WIDTH, padding=ATLAS_PADDING):
+    """
+    Returns (positions, height) for images of the given sizes packed in rows
+
+    The images are placed from the tallest to the shortest, left to right, and a
+    new row is started when an image does not fit.  The positions are the (x, y) of
+    the top left corner of each image, with y measured from the top, in the order of
+    sizes.  The height is the height of the atlas, rounded up to a power of two.
+
+    Parameter sizes: the (width, height) of each image
+    Precondition: sizes is a list of pairs of ints > 0, each no wider than width
+    minus twice the padding
+
+    Parameter width: the width of the atlas
+    Precondition: width is an int > 0
+
+    Parameter padding: the clear pixels around each image
+    Precondition: padding is an int >= 0
+    """
+    order = sorted(range(len(sizes)), key=lambda k: -sizes[k][1])
+    positions = [None]*len(sizes)
+    x = y = shelf = 0
+    for k in order:
+        w, h = sizes[k][0] + 2*padding, sizes[k][1] + 2*padding
+        assert w <= width, 'image %d is wider than the atlas' % k
+        if x + w > width:
+            x = 0
+            y += shelf
+            shelf = 0
+        positions[k] = (x + padding, y + padding)
+        x += w
+        shelf = max(shelf, h)
+    height = 1
+    while height < y + shelf:
+        height *= 2
+    return positions, height
+
+
+def buildAtlas(names=ATLAS_IMAGES, atlas=ATLAS_FILE):
+    """
+    Returns the regions of the atlas made from the images names, after saving it
+
+    The atlas image is saved next to the file atlas in Images/, with the same name
+    and the extension .png.  The regions are a dictionary of file name to
+    [x, y, width, height] (see the module docstring).
+
+    Parameter names: the file names of the images to pack
+    Precondition: names is a sequence of PNG files in Images/
+
+    Parameter atlas: the file name of the atlas
+    Precondition: atlas is a string ending in .atlas
+    """
+    images = [loadImage(name) for name in names]
+    positions, height = packImages([(image.shape[1], image.shape[0]) for image in images])
+    pixels = np.zeros((height, ATLAS_WIDTH, 4), dtype=np.uint8)
+    regions = {}
+    for name, image, (x, y) in zip(names, images, positions):
+        h, w = image.shape[:2]
+        pixels[y:y+h, x:x+w] = image
+        regions[name] = [x, height - y - h, w, h]
+    picture = atlasImage(atlas)
+    with open(os.path.join(IMAGE_DIR, picture), 'wb') as file:
+        file.write(encodePNG(pixels))
+    with open(os.path.join(IMAGE_DIR, atlas), 'w') as file:
+        json.dump({picture: regions}, file, indent=1, sort_keys=True)
+    return regions
+
+
+def atlasImage(atlas=ATLAS_FILE):
+    """
+    Returns the file name of the image of the atlas
+
+    Parameter atlas: the file name of the atlas
+    Precondition: atlas is a string ending in .atlas
+    """
+    return os.path.splitext(atlas)[0] + '.png'
+
+
+def isCurrent(names=ATLAS_IMAGES, atlas=ATLAS_FILE):
+    """
+    Returns True if the atlas exists, has every image and is newer than all of them
+
+    Parameter names: the file names of the images in the atlas
+    Precondition: names is a sequence of PNG files in Images/
+
+    Parameter atlas: the file name of the atlas
+    Precondition: atlas is a string ending in .atlas
+    """
+    paths = [os.path.join(IMAGE_DIR, name) for name in (atlas, atlasImage(atlas))]
+    if not all(os.path.exists(path) for path in paths):
+        return False
+    built = min(os.path.getmtime(path) for path in paths)
+    if any(os.path.getmtime(os.path.join(IMAGE_DIR, name)) > built for name in names):
+        return False
+    with open(paths[0]) as file:
+        regions = json.load(file).get(atlasImage(atlas), {})
+    return all(name in regions for name in names)
+
+
+def ensureAtlas(names=ATLAS_IMAGES, atlas=ATLAS_FILE):
+    """
+    Makes the atlas of the images names if it is not current (see isCurrent)
+
+    Parameter names: the file names of the images in the atlas
+    Precondition: names is a sequence of PNG files in Images/
+
+    Parameter atlas: the file name of the atlas
+    Precondition: atlas is a string ending in .atlas
+    """
+    if not isCurrent(names, atlas):
+        buildAtlas(names, atlas)
+
+
+if __name__ == '__main__':
+    regions = buildAtlas()
+    for name in sorted(regions):
+        print('%-18s %4d %4d %4d %4d' % ((name,) + tuple(regions[name])))
@@ -0,0 +1,271 @@
+"""
+Batch simulation module for Alien Invaders
+
+This module plays many waves with no window, spread over a pool of processes, and
+sums up how they went.  Each wave is a WaveSim with its own seed and settings, played
+by a bot: a function that reads the wave and returns the INPUT flags for the next
+step.  A wave can also be played from a scripted list of [flags, count] runs, like
+the runs of a Recording (see replay.py).
+
+A wave is described by a job, which is a dictionary with the keys
+
+    seed, rows, perrow, speed, boltRate, bot, script
+
+where bot is a name in BOTS and script is a list of runs or None.  Jobs only hold
+plain values, so they can be sent to the worker processes as they are.  The waves
+share nothing, so the number of waves played per second grows with the number of
+processes, up to the number of cores.
+
+The module can also be run as a script.  Like the game, the first three arguments
+change ALIEN_ROWS, ALIENS_IN_ROW and ALIEN_SPEED.  They are followed by the number
+of waves to play for each bot and the number of processes:
+
+    python batch.py 5 11 1.0 200 4
+
+plays 200 waves with each bot on 4 processes and prints a table of the results.
+"""
+from consts import *
+from sim import *
+from concurrent.futures import ProcessPoolExecutor
+import os
+import random
+import time
+
+
+# The most steps a wave may take before it is given up as unfinished (10 minutes)
+TICK_LIMIT = 600*TICK_RATE
+
+
+def idleBot(sim, rng, last):
+    """
+    Returns no input, so the aliens always reach the defense line
+
+    Parameter sim: the wave being played
+    Precondition: sim is a WaveSim
+
+    Parameter rng: the random number generator of the bot
+    Precondition: rng is a random.Random
+
+    Parameter last: the flags returned for the last step
+    Precondition: last is an int combining INPUT flags
+    """
+    return 0
+
+
+def randomBot(sim, rng, last):
+    """
+    Returns random input that changes about three times a second
+
+    Parameter sim: the wave being played
+    Precondition: sim is a WaveSim
+
+    Parameter rng: the random number generator of the bot
+    Precondition: rng is a random.Random
+
+    Parameter last: the flags returned for the last step
+    Precondition: last is an int combining INPUT flags
+    """
+    if rng.random() < 0.05:
+        return rng.choice((0, INPUT_LEFT, INPUT_RIGHT, INPUT_FIRE,
+            INPUT_LEFT | INPUT_FIRE, INPUT_RIGHT | INPUT_FIRE))
+    return last
+
+
+def trackerBot(sim, rng, last):
+    """
+    Returns input that moves the ship under the nearest column of aliens and fires
+
+    The ship steps aside from an alien bolt that is about to hit it.
+
+    Parameter sim: the wave being played
+    Precondition: sim is a WaveSim
+
+    Parameter rng: the random number generator of the bot
+    Precondition: rng is a random.Random
+
+    Parameter last: the flags returned for the last step
+    Precondition: last is an int combining INPUT flags
+    """
+    x = sim.getShipX()
+    bolts = sim.getBolts()
+    k = bolts.overlap(x, SHIP_BOTTOM + 4*SHIP_HEIGHT, SHIP_WIDTH + 2*SHIP_MOVEMENT,
+        8*SHIP_HEIGHT, OWNER_ALIEN)
+    if k >= 0:
+        return INPUT_RIGHT if bolts.x[k] < x or x < SHIP_WIDTH else INPUT_LEFT
+    aliens = sim.getAliens()
+    target = None
+    for c in range(aliens.cols):
+        r = aliens.columnBottom(c)
+        if not r is None:
+            ax = aliens.getPos(r, c)[0]
+            if target is None or abs(ax - x) < abs(target - x):
+                target = ax
+    if target is None or abs(target - x) <= SHIP_MOVEMENT:
+        return INPUT_FIRE
+    return INPUT_FIRE | (INPUT_RIGHT if target > x else INPUT_LEFT)
+
+
+# The bots that can be named in a job
+BOTS = {'idle': idleBot, 'random': randomBot, 'tracker': trackerBot}
+
+
+def makeJobs(count, seed=None, settings=None, bots=('tracker',)):
+    """
+    Returns a list of count jobs for every pair of settings and bot
+
+    The seeds of the waves are drawn from a random number generator started with
+    seed, so the same arguments always give the same jobs.  Every bot plays the
+    same seeds, so that the bots can be compared fairly.
+
+    Parameter count: the number of waves for each pair of settings and bot
+    Precondition: count is an int >= 0
+
+    Parameter seed: the seed for the seeds of the waves, or None for a random one
+    Precondition: seed is an int, or None
+
+    Parameter settings: the settings to play, or None for the ones in consts.py
+    Precondition: settings is a list of tuples (rows, perrow, speed, boltRate), or None
+
+    Parameter bots: the names of the bots to play
+    Precondition: bots is a sequence of keys of BOTS
+    """
+    assert type(count) == int and count >= 0
+    if settings is None:
+        settings = [(ALIEN_ROWS, ALIENS_IN_ROW, ALIEN_SPEED, BOLT_RATE)]
+    rng = random.Random(seed)
+    seeds = [rng.randrange(SEED_RANGE) for k in range(count)]
+    jobs = []
+    for rows, perrow, speed, boltRate in settings:
+        for bot in bots:
+            assert bot in BOTS, repr(bot) + ' is not a bot'
+            for s in seeds:
+                jobs.append({'seed': s, 'rows': rows, 'perrow': perrow,
+                    'speed': speed, 'boltRate': boltRate, 'bot': bot, 'script': None})
+    return jobs
+
+
+def playWave(job):
+    """
+    Returns the result of playing the wave described by job
+
+    The result is a dictionary with the settings and bot of the job and the keys
+
+        win, finished, ticks, seconds, shots, hits, score, lives
+
+    The bot is given a random number generator started with the seed of the wave.
+    A new ship is placed as soon as the old one is hit.  If the job has a script,
+    its runs are played first and the bot plays the rest of the wave.
+
+    Parameter job: the wave to play
+    Precondition: job is a dictionary made as in makeJobs
+    """
+    sim = WaveSim(job['seed'], job['rows'], job['perrow'], job['speed'],
+        job['boltRate'])
+    bot = BOTS[job['bot']]
+    rng = random.Random(job['seed'])
+    script = [] if job['script'] is None else job['script']
+    tick = 1.0/TICK_RATE
+    ticks = shots = hits = 0
+    pos = left = 0
+    flags = 0
+    while not sim.getFinish() and ticks < TICK_LIMIT:
+        if not sim.hasShip():
+            sim.createShip()
+        if left == 0 and pos < len(script):
+            flags, left = script[pos]
+            flags &= ~INPUT_RESPAWN
+            pos += 1
+        if left > 0:
+            left -= 1
+        else:
+            flags = bot(sim, rng, flags)
+        sim.step(flags, tick)
+        ticks += 1
+        if sim.events & EVENT_SHIP_FIRE:
+            shots += 1
+        if sim.events & EVENT_ALIEN_HIT:
+            hits += 1
+    result = {key: job[key] for key in ('seed', 'rows', 'perrow', 'speed',
+        'boltRate', 'bot')}
+    result.update(win=sim.getWin(), finished=sim.getFinish(), ticks=ticks,
+        seconds=ticks*tick, shots=shots, hits=hits, score=sim.getScore(),
+        lives=sim.getLives())
+    return result
+
+
+def runBatch(jobs, workers=None):
+    """
+    Returns the results of playing every job, in the order of jobs
+
+    The jobs are handed to the processes in chunks, so that sending a job costs
+    little next to playing it.  With one worker, the jobs are played in this
+    process.
+
+    Parameter jobs: the waves to play
+    Precondition: jobs is a list of dictionaries made as in makeJobs
+
+    Parameter workers: the number of processes, or None for one per core
+    Precondition: workers is an int > 0, or None
+    """
+    assert workers is None or (type(workers) == int and workers > 0)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        return [playWave(job) for job in jobs]
+    chunk = max(1, len(jobs)//(workers*4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(playWave, jobs, chunksize=chunk))
+
+
+def summarize(results):
+    """
+    Returns a summary of results for every pair of settings and bot
+
+    Each summary is a dictionary with the settings and bot and the keys
+
+        waves, winRate, seconds, shots, accuracy, score
+
+    where seconds, shots and score are averages over the waves, and accuracy is
+    the share of shots that hit an alien.  The summaries are in the order that each
+    pair first appears in results.
+
+    Parameter results: the results of playWave
+    Precondition: results is a list of dictionaries returned by playWave
+    """
+    groups = {}
+    for result in results:
+        key = (result['rows'], result['perrow'], result['speed'],
+            result['boltRate'], result['bot'])
+        groups.setdefault(key, []).append(result)
+    summary = []
+    for (rows, perrow, speed, boltRate, bot), group in groups.items():
+        n = len(group)
+        shots = sum(r['shots'] for r in group)
+        summary.append({'rows': rows, 'perrow': perrow, 'speed': speed,
+            'boltRate': boltRate, 'bot': bot, 'waves': n,
+            'winRate': sum(1 for r in group if r['win'])/n,
+            'seconds': sum(r['seconds'] for r in group)/n,
+            'shots': shots/n,
+            'accuracy': sum(r['hits'] for r in group)/shots if shots > 0 else 0.0,
+            'score': sum(r['score'] for r in group)/n})
+    return summary
+
+
+if __name__ == '__main__':
+    import sys
+    count = int(sys.argv[4]) if len(sys.argv) > 4 else 100
+    workers = int(sys.argv[5]) if len(sys.argv) > 5 else None
+    jobs = makeJobs(count, 0, bots=sorted(BOTS))
+    start = time.perf_counter()
+    results = runBatch(jobs, workers)
+    elapsed = time.perf_counter() - start
+    print('%-8s %5s %4s %5s %4s %6s %5s %8s %6s %5s %7s' % ('bot', 'rows', 'row',
+        'speed', 'rate', 'waves', 'win', 'seconds', 'shots', 'hit', 'score'))
+    for s in summarize(results):
+        print('%-8s %5d %4d %5.2f %4d %6d %4.0f%% %8.1f %6.1f %4.0f%% %7.1f' % (
+            s['bot'], s['rows'], s['perrow'], s['speed'], s['boltRate'], s['waves'],
+            100*s['winRate'], s['seconds'], s['shots'], 100*s['accuracy'],
+            s['score']))
+    ticks = sum(r['ticks'] for r in results)
+    print('%d waves in %.1f seconds, %.0f steps per second' % (len(results), elapsed,
+        ticks/elapsed if elapsed > 0 else float('inf')))
@@ -31,6 +31,8 @@ SHIP_BOTTOM   = 32
 SHIP_MOVEMENT = 5
 # The number of lives a ship has
 SHIP_LIVES    = 3
+# the image file for the ship
+SHIP_IMAGE    = 'ship.png'
 
 # The y-coordinate of the defensive line the ship is protecting
 DEFENSE_LINE = 100
@@ -76,6 +78,9 @@ BOLT_RATE   = 5
 
 ### GAME CONSTANTS ###
 
+# state when the images, sounds and fonts are loading, before STATE_INACTIVE
+# (it is not one of the NUM_STATES states that the 'S' key steps through)
+STATE_LOADING  = -1
 # state before the game has started
 STATE_INACTIVE = 0
 # state when we are initializing a new wave
@@ -99,7 +104,8 @@ arguments are everything after the word python. So if you start the game typing
 
 Python puts ['breakout.py', '3', '4', '0.5'] into sys.argv. Below, we take
 advantage of this fact to change the constants ALIEN_ROWS, ALIENS_IN_ROW, and
-ALIEN_SPEED.
+ALIEN_SPEED.  A fourth argument ending in .rec names a file to record the game to
+(see replay.py).
 """
 try:
     rows = int(sys.argv[1])
@@ -122,7 +128,89 @@ try:
 except:
     pass # Use original value
 
+# the file name to save the input of each finished wave to, with the number of the
+# wave added before .rec (game.rec is saved as game-1.rec, game-2.rec, ...), or None
+# to not save it
+RECORD_FILE = None
+
+try:
+    if sys.argv[4].endswith('.rec'):
+        RECORD_FILE = sys.argv[4]
+except:
+    pass # Use original value
+
 ### ADD MORE CONSTANTS (PROPERLY COMMENTED) AS NECESSARY ###
 
 #Total number of states
 NUM_STATES = 6
+
+
+### SIMULATION CONSTANTS ###
+
+# input flag for holding the left arrow key
+INPUT_LEFT  = 1
+# input flag for holding the right arrow key
+INPUT_RIGHT = 2
+# input flag for holding the up arrow key (fire)
+INPUT_FIRE  = 4
+# input flag for a step that starts with a new ship (only used in recordings)
+INPUT_RESPAWN = 8
+# the number of bits of INPUT flags for each ship; ship i uses the bits << i*INPUT_BITS
+INPUT_BITS = 4
+# the most ships in one wave
+MAX_SHIPS = 2
+
+# event flag when the ship fires a bolt
+EVENT_SHIP_FIRE  = 1
+# event flag when an alien fires a bolt
+EVENT_ALIEN_FIRE = 2
+# event flag when the ship is hit by a bolt
+EVENT_SHIP_HIT   = 4
+# event flag when an alien is hit by a bolt
+EVENT_ALIEN_HIT  = 8
+# event flag when the aliens take a step
+EVENT_MARCH      = 16
+
+# the owner of a bolt fired by an alien
+OWNER_ALIEN = 0
+# the owner of a bolt fired by the ship; ship i fires bolts owned by OWNER_SHIP+i
+OWNER_SHIP  = 1
+# the number of bolts a new BoltBank has room for before it grows
+BOLT_CAPACITY = 64
+
+# the number of simulation steps per second, no matter how fast the game draws
+TICK_RATE = 60
+# the most simulation steps run in one frame; time past this is dropped after a hitch
+MAX_TICKS = 8
+# the seeds picked for a wave with no seed given are in the range 0..SEED_RANGE-1
+SEED_RANGE = 2**32
+# the most seconds per frame spent making the next wave while waiting for the player
+PREPARE_BUDGET = 0.004
+
+
+### LOADING CONSTANTS ###
+
+# the sound file played when the ship fires a bolt
+SHIP_FIRE_SOUND  = 'pew1.wav'
+# the sound file played when an alien fires a bolt
+ALIEN_FIRE_SOUND = 'pew2.wav'
+# the sound file played when the ship is hit by a bolt
+SHIP_HIT_SOUND   = 'blast1.wav'
+# the sound file played when an alien is hit by a bolt
+ALIEN_HIT_SOUND  = 'blast2.wav'
+# the sound files played in a wave
+WAVE_SOUNDS = (SHIP_FIRE_SOUND, ALIEN_FIRE_SOUND, SHIP_HIT_SOUND, ALIEN_HIT_SOUND)
+# the sound played for each EVENT flag, as (flag, sound file), in the order they play
+EVENT_SOUNDS = ((EVENT_SHIP_FIRE, SHIP_FIRE_SOUND), (EVENT_ALIEN_FIRE, ALIEN_FIRE_SOUND),
+    (EVENT_ALIEN_HIT, ALIEN_HIT_SOUND), (EVENT_SHIP_HIT, SHIP_HIT_SOUND))
+# the fonts of the messages and the score, as (name, size); Roboto is the Kivy default
+HUD_FONTS = (('Roboto', 50), ('Roboto', 20))
+# the images packed into the texture atlas, so that a frame binds a single texture
+ATLAS_IMAGES = ALIEN_IMAGES + ('alien-strip1.png', 'alien-strip2.png',
+    'alien-strip3.png', SHIP_IMAGE, 'ship-strip.png')
+# the file in Images/ that maps the images to regions of the atlas (see atlas.py)
+ATLAS_FILE = 'sprites.atlas'
+# the number of threads that decode the images and sounds at startup
+PRELOAD_WORKERS = 4
+# the most seconds per frame spent on loading work that must be in the main thread
+PRELOAD_BUDGET = 0.01
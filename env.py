@@ -0,0 +1,630 @@
+"""
+Vectorized environment module for Alien Invaders
+
+This module runs the rules of a wave in the reset/step interface used to train
+agents.  A VecWaveEnv holds K waves that are stepped in lockstep with one call: step
+takes an array of K actions and returns the observations, rewards and done flags of
+all K waves as NumPy arrays.
+
+The waves are not WaveSim objects.  The state of all K waves is kept as arrays with
+one row per wave (the ship, the offset and alive array of each formation, and the
+bolts), and each rule of WaveSim.step is a single array operation over all of the
+waves at once.  Only the rare events that draw random numbers (picking when and from
+which column the aliens fire) and the bookkeeping of a kill are done one wave at a
+time.  Each wave draws from its own random number generator in the same order as
+WaveSim, so a wave plays exactly like a WaveSim with the same seed and inputs, but
+the cost of a step grows far slower than K.
+
+An action is an int combining INPUT_LEFT, INPUT_RIGHT and INPUT_FIRE (so 0 to 7).
+The observation is a dictionary of arrays with one row per wave:
+
+    'ship':   the x coordinate of the ship and 1 if it is on screen [float32, K x 2]
+    'lives':  the number of lives left [int32, K]
+    'origin': the offset of the formation (see Formation) [float32, K x 2]
+    'alive':  whether each alien is alive [bool, K x rows x cols]
+    'bolts':  the x, y, velocity and owner of each bolt, then zeros [float32,
+              K x maxBolts x 4]
+    'nbolts': the number of bolts of each wave in 'bolts' [int32, K]
+
+The arrays are made once and filled in place, so they are overwritten by the next
+call to reset or step.  Copy them to keep them.  The reward of a step is the points
+scored in it, minus lifePenalty for each life lost.  A ship that is hit is replaced
+at the start of the next step, and a wave that is finished is replaced by a new wave
+right away, so the observation of a finished wave is the first one of its next wave.
+"""
+from consts import *
+from sim import Formation
+import numpy as np
+import random
+
+
+# The reward taken away when the ship is hit
+LIFE_PENALTY = 100
+
+
+class VecWaveEnv(object):
+    """
+    A class to step many waves together and return batched NumPy arrays.
+
+    All of the waves have the same settings, so that the observations have the same
+    shape.  Each wave has its own seed, drawn from the seed given to reset.
+
+    The state of wave k is in row k of the hidden arrays.  A bolt is stored in any
+    free slot of its row and marked in _used, so adding and removing bolts never
+    moves the others.  There are maxBolts slots in each row at first, and the rows
+    are made twice as long when a wave has no free slot left.  The position the bolt
+    would have in the BoltBank of a WaveSim is kept in _pos, and changed the way
+    BoltBank.remove moves bolts, since the first bolt in that order is the one that
+    hits a ship.
+
+    INSTANCE ATTRIBUTES:
+        num:         the number of waves [int > 0]
+        repeat:      the number of simulation steps taken for each action [int > 0]
+        lifePenalty: the reward taken away when the ship is hit [int or float >= 0]
+        _settings:   the settings of every wave (see WaveSim.getSettings)
+                     [tuple (rows, perrow, speed, boltRate)]
+        _slotX:      the x coordinate of each column at offset 0 [float array, cols]
+        _slotY:      the y coordinate of each row at offset 0 [float array, rows]
+        _rng:        the source of the seeds of new waves [random.Random]
+        _seeds:      the seed of each wave [list of num int]
+        _rngs:       the random number generator of each wave [list of num random.Random]
+        _columns:    the columns with a live alien in each wave, in the order of
+                     Formation.getColumns [list of num list of int]
+        _ticks:      the number of steps taken in each wave [int array, num]
+        _shipX:      the x coordinate of the ship [float array, num]
+        _shipAlive:  whether the ship is on screen [bool array, num]
+        _lives:      the number of lives left [int array, num]
+        _score:      the score of the wave [int array, num]
+        _finish:     whether the wave is over [bool array, num]
+        _win:        whether the wave was won [bool array, num]
+        _time:       the time since the last alien step [float array, num]
+        _rt:         whether the aliens are marching right [bool array, num]
+        _dn:         the last march (0 right, 1 down, 2 left) [int array, num]
+        _boltFire:   the alien steps until the next alien bolt, or 0 [int array, num]
+        _alienSteps: the alien steps since the last alien bolt [int array, num]
+        _ox:         the horizontal offset of the formation [float array, num]
+        _oy:         the vertical offset of the formation [float array, num]
+        _alive:      whether each alien is alive [bool array, num x rows x cols]
+        _live:       the number of live aliens [int array, num]
+        _left:       the leftmost column with a live alien [int array, num]
+        _right:      the rightmost column with a live alien [int array, num]
+        _bottomRow:  the lowest row with a live alien [int array, num]
+        _bx:         the x coordinate of each bolt [float array, num x slots]
+        _by:         the y coordinate of each bolt [float array, num x slots]
+        _bvy:        the velocity of each bolt [float array, num x slots]
+        _owner:      who fired each bolt, OWNER_ALIEN or OWNER_SHIP [int8 array,
+                     num x slots]
+        _used:       whether each bolt slot holds a bolt [bool array, num x slots]
+        _pos:        the position of each bolt in a BoltBank [int array, num x slots]
+        _count:      the number of bolts of each wave [int array, num]
+        _obs:        the observation arrays [dict of str to array]
+        _rewards:    the rewards of the last step [float32 array, num]
+        _dones:      whether each wave finished in the last step [bool array, num]
+    """
+
+    def getSeeds(self):
+        """
+        Returns the seed of each wave being played
+
+        A WaveSim made with this seed and the settings of the environment plays
+        exactly like the wave, given the same inputs.
+        """
+        return list(self._seeds)
+
+    def getObservation(self):
+        """
+        Returns the observation arrays of the last call to reset or step
+        """
+        return self._obs
+
+    def __init__(self, num, rows=ALIEN_ROWS, perrow=ALIENS_IN_ROW, speed=ALIEN_SPEED,
+        boltRate=BOLT_RATE, repeat=1, lifePenalty=LIFE_PENALTY, maxBolts=BOLT_CAPACITY):
+        """
+        Initializes an environment of num waves with the given settings.
+
+        The waves are not made until reset is called.
+
+        Parameter num: the number of waves
+        Precondition: num is an int > 0
+
+        Parameter rows: the number of rows of aliens
+        Precondition: rows is an int > 0
+
+        Parameter perrow: the number of aliens per row
+        Precondition: perrow is an int > 0
+
+        Parameter speed: the number of seconds between alien steps
+        Precondition: speed is an int or float > 0
+
+        Parameter boltRate: the most alien steps between alien bolts
+        Precondition: boltRate is an int > 0
+
+        Parameter repeat: the number of simulation steps taken for each action
+        Precondition: repeat is an int > 0
+
+        Parameter lifePenalty: the reward taken away when the ship is hit
+        Precondition: lifePenalty is an int or float >= 0
+
+        Parameter maxBolts: the most bolts of a wave put in the observation
+        Precondition: maxBolts is an int > 0
+        """
+        assert type(num) == int and num > 0
+        assert (type(speed) == int or type(speed) == float) and speed > 0
+        assert type(boltRate) == int and boltRate > 0
+        assert type(repeat) == int and repeat > 0
+        assert (type(lifePenalty) == int or type(lifePenalty) == float) and \
+            lifePenalty >= 0
+        assert type(maxBolts) == int and maxBolts > 0
+        self.num = num
+        self.repeat = repeat
+        self.lifePenalty = lifePenalty
+        self._settings = (rows, perrow, speed, boltRate)
+        grid = Formation(rows, perrow)
+        self._slotX = grid.slotX
+        self._slotY = grid.slotY
+        self._rng = random.Random()
+        self._seeds = []
+        self._rngs = [None]*num
+        self._columns = [None]*num
+        self._ticks = np.zeros(num, dtype=np.int64)
+        self._shipX = np.zeros(num)
+        self._shipAlive = np.zeros(num, dtype=bool)
+        self._lives = np.zeros(num, dtype=np.int64)
+        self._score = np.zeros(num, dtype=np.int64)
+        self._finish = np.zeros(num, dtype=bool)
+        self._win = np.zeros(num, dtype=bool)
+        self._time = np.zeros(num)
+        self._rt = np.zeros(num, dtype=bool)
+        self._dn = np.zeros(num, dtype=np.int64)
+        self._boltFire = np.zeros(num, dtype=np.int64)
+        self._alienSteps = np.zeros(num, dtype=np.int64)
+        self._ox = np.zeros(num)
+        self._oy = np.zeros(num)
+        self._alive = np.zeros((num, rows, perrow), dtype=bool)
+        self._live = np.zeros(num, dtype=np.int64)
+        self._left = np.zeros(num, dtype=np.int64)
+        self._right = np.zeros(num, dtype=np.int64)
+        self._bottomRow = np.zeros(num, dtype=np.int64)
+        self._bx = np.zeros((num, maxBolts))
+        self._by = np.zeros((num, maxBolts))
+        self._bvy = np.zeros((num, maxBolts))
+        self._owner = np.zeros((num, maxBolts), dtype=np.int8)
+        self._used = np.zeros((num, maxBolts), dtype=bool)
+        self._pos = np.zeros((num, maxBolts), dtype=np.int64)
+        self._count = np.zeros(num, dtype=np.int64)
+        self._obs = {'ship': np.zeros((num, 2), dtype=np.float32),
+            'lives': np.zeros(num, dtype=np.int32),
+            'origin': np.zeros((num, 2), dtype=np.float32),
+            'alive': np.zeros((num, rows, perrow), dtype=bool),
+            'bolts': np.zeros((num, maxBolts, 4), dtype=np.float32),
+            'nbolts': np.zeros(num, dtype=np.int32)}
+        self._rewards = np.zeros(num, dtype=np.float32)
+        self._dones = np.zeros(num, dtype=bool)
+
+    def reset(self, seed=None):
+        """
+        Returns the first observation of num new waves
+
+        Parameter seed: the seed for the seeds of the waves, or None for a random one
+        Precondition: seed is an int, or None
+        """
+        self._rng.seed(seed)
+        self._seeds = [0]*self.num
+        self._newWaves(np.arange(self.num))
+        self._observe()
+        return self._obs
+
+    def step(self, actions):
+        """
+        Returns (observation, rewards, dones, infos) after one action in every wave
+
+        Each action is held down for repeat simulation steps.  The rewards and dones
+        are arrays with one value per wave, and infos is a list with one dictionary
+        per wave.  The dictionary of a wave that finished has the keys win, score
+        and ticks for that wave; the others are empty.
+
+        Parameter actions: the INPUT flags for each wave
+        Precondition: actions is a sequence or array of num ints, 0 <= int <= 7
+        """
+        assert len(self._seeds) == self.num, 'reset must be called before step'
+        assert len(actions) == self.num
+        keys = np.asarray(actions, dtype=np.int64) & (INPUT_LEFT | INPUT_RIGHT | INPUT_FIRE)
+        tick = 1.0/TICK_RATE
+        score = self._score.copy()
+        lives = self._lives.copy()
+        for n in range(self.repeat):
+            act = ~self._finish
+            if not act.any():
+                break
+            self._shipX[act & ~self._shipAlive] = GAME_WIDTH/2
+            self._shipAlive |= act
+            self._ticks += act
+            self._tick(act, keys, tick)
+        self._rewards[:] = (self._score - score) - self.lifePenalty*(lives - self._lives)
+        self._dones[:] = self._finish
+        infos = [{} for k in range(self.num)]
+        done = np.flatnonzero(self._finish)
+        for k in done.tolist():
+            infos[k] = {'win': bool(self._win[k]), 'score': int(self._score[k]),
+                'ticks': int(self._ticks[k])}
+        if len(done) > 0:
+            self._newWaves(done)
+        self._observe()
+        return self._obs, self._rewards, self._dones, infos
+
+    # HIDDEN METHODS
+    def _newWaves(self, waves):
+        """
+        Starts a new wave with the next seed in each of the given rows
+
+        The seeds are drawn in the order of the rows, so that the environment plays
+        the same way for the same seed given to reset.
+
+        Parameter waves: the rows to start again
+        Precondition: waves is an int array of rows in 0..num-1, in order
+        """
+        rows, perrow = self._settings[:2]
+        for k in waves.tolist():
+            self._seeds[k] = self._rng.randrange(SEED_RANGE)
+            self._rngs[k] = random.Random(self._seeds[k])
+            self._columns[k] = list(range(perrow))
+        self._ticks[waves] = 0
+        self._shipX[waves] = GAME_WIDTH/2
+        self._shipAlive[waves] = True
+        self._lives[waves] = SHIP_LIVES
+        self._score[waves] = 0
+        self._finish[waves] = False
+        self._win[waves] = False
+        self._time[waves] = 0
+        self._rt[waves] = True
+        self._dn[waves] = 0
+        self._boltFire[waves] = 0
+        self._alienSteps[waves] = 0
+        self._ox[waves] = 0
+        self._oy[waves] = 0
+        self._alive[waves] = True
+        self._live[waves] = rows*perrow
+        self._left[waves] = 0
+        self._right[waves] = perrow-1
+        self._bottomRow[waves] = rows-1
+        self._used[waves] = False
+        self._count[waves] = 0
+
+    def _tick(self, act, keys, t):
+        """
+        Advances each wave marked in act by one update, as WaveSim.step does
+
+        Parameter act: whether each wave is stepped
+        Precondition: act is a bool array of num
+
+        Parameter keys: the INPUT flags held down in each wave
+        Precondition: keys is an int array of num
+
+        Parameter t: the time since the last step
+        Precondition: t is a float >= 0
+        """
+        rows, perrow, speed, boltRate = self._settings
+        for k in np.flatnonzero(act & (self._boltFire == 0)).tolist():
+            self._boltFire[k] = self._rngs[k].randint(1, boltRate)
+
+        # Move the ships, as moveShipX does
+        x = self._shipX
+        new = np.where(keys & INPUT_LEFT, x - SHIP_MOVEMENT, x)
+        new = np.where(keys & INPUT_RIGHT, new + SHIP_MOVEMENT, new)
+        ok = (new <= GAME_WIDTH - SHIP_WIDTH/2) & (new >= SHIP_WIDTH/2)
+        self._shipX = np.where(act & self._shipAlive & ok, new, x)
+        np.add(self._time, t, out=self._time, where=act)
+
+        # March the aliens
+        march = act & (self._time > speed) & (self._live > 0)
+        left = self._slotX[self._left] + self._ox
+        right = self._slotX[np.minimum(self._right, perrow-1)] + self._ox
+        down = march & (((right > GAME_WIDTH - ALIEN_H_SEP - ALIEN_WIDTH/2) &
+            (self._dn == 0)) | ((left < ALIEN_H_SEP + ALIEN_WIDTH/2) & (self._dn == 2)))
+        side = march & ~down
+        self._oy[down] -= ALIEN_V_WALK
+        self._rt[down] = ~self._rt[down]
+        self._dn[down] = 1
+        step = side & self._rt
+        self._ox[step] += ALIEN_H_WALK
+        self._dn[step] = 0
+        step = side & ~self._rt
+        self._ox[step] -= ALIEN_H_WALK
+        self._dn[step] = 2
+        self._time[march] -= speed
+        self._alienSteps += march
+
+        # Fire a bolt from each ship with INPUT_FIRE and no bolt on screen
+        ships = self._used & (self._owner == OWNER_SHIP)
+        fire = np.flatnonzero(act & ((keys & INPUT_FIRE) != 0) & self._shipAlive &
+            ~ships.any(axis=1))
+        self._addBolts(fire, self._shipX[fire], SHIP_BOTTOM + SHIP_HEIGHT/2, BOLT_SPEED,
+            OWNER_SHIP)
+
+        # Fire a bolt from the bottom alien of a random column
+        fire = []
+        where = []
+        for k in np.flatnonzero(act & (self._alienSteps == self._boltFire)).tolist():
+            if self._live[k] == 0:
+                continue
+            columns = self._columns[k]
+            c = columns[self._rngs[k].randrange(len(columns))]
+            r = rows - 1 - int(self._alive[k, ::-1, c].argmax())
+            fire.append(k)
+            where.append((r, c))
+        if fire:
+            fire = np.array(fire)
+            r, c = np.array(where).T
+            self._addBolts(fire, self._slotX[c] + self._ox[fire],
+                self._slotY[r] + self._oy[fire], -BOLT_SPEED, OWNER_ALIEN)
+            self._alienSteps[fire] = 0
+            self._boltFire[fire] = 0
+
+        np.add(self._by, self._bvy, out=self._by, where=self._used & act[:, None])
+        self._collideBoltAlien(act)
+        self._collideBoltShip(act)
+        self._cull()
+
+        # Finish the waves that are won, or where the aliens reached the defense line
+        won = act & (self._live == 0)
+        self._finish |= won
+        self._win |= won
+        bottom = self._slotY[np.maximum(self._bottomRow, 0)] + self._oy
+        self._finish |= act & (self._live > 0) & (bottom - ALIEN_HEIGHT/2 <= DEFENSE_LINE)
+
+    def _collideBoltAlien(self, act):
+        """
+        Kills the first live alien hit by the ship bolt of each wave, as Formation.hit
+
+        The alien hit is removed along with the bolt.  An alien in the top two rows
+        is worth 20 points, and any other alien is worth 10.
+
+        Parameter act: whether each wave is stepped
+        Precondition: act is a bool array of num
+        """
+        rows, perrow = self._settings[:2]
+        k, b = np.nonzero(self._used & (self._owner == OWNER_SHIP) & act[:, None])
+        if len(k) == 0:
+            return
+        bx = self._bx[k, b]
+        by = self._by[k, b]
+        ox = self._ox[k]
+        oy = self._oy[k]
+        pitchX = ALIEN_WIDTH + ALIEN_H_SEP
+        pitchY = ALIEN_HEIGHT + ALIEN_V_SEP
+        left = self._slotX[0] + ox - ALIEN_WIDTH/2
+        top = self._slotY[0] + oy + ALIEN_HEIGHT/2
+        c0 = np.floor((bx - BOLT_WIDTH/2 - left)/pitchX).astype(np.int64)
+        c1 = np.floor((bx + BOLT_WIDTH/2 - left)/pitchX).astype(np.int64)
+        r0 = np.floor((top - by - BOLT_HEIGHT/2)/pitchY).astype(np.int64)
+        r1 = np.floor((top - by + BOLT_HEIGHT/2)/pitchY).astype(np.int64)
+
+        # The cells to check, in the order Formation.hit checks them
+        r = np.stack([r0, r0, r1, r1], axis=1)
+        c = np.stack([c0, c1, c0, c1], axis=1)
+        inside = (r >= 0) & (r < rows) & (c >= 0) & (c < perrow)
+        r = np.clip(r, 0, rows-1)
+        c = np.clip(c, 0, perrow-1)
+        ax = self._slotX[c] + ox[:, None]
+        ay = self._slotY[r] + oy[:, None]
+        hit = inside & self._alive[k[:, None], r, c] & _overlaps(ax, ay, ALIEN_WIDTH,
+            ALIEN_HEIGHT, bx[:, None], by[:, None])
+        found = hit.any(axis=1)
+        if not found.any():
+            return
+        first = hit.argmax(axis=1)[found]
+        k = k[found]
+        r = r[found, first]
+        c = c[found, first]
+        self._score[k] += np.where(rows/(r+1) >= rows/2, 20, 10)
+        self._alive[k, r, c] = False
+        self._removeBolts(k, b[found])
+        self._killed(k, c)
+
+    def _collideBoltShip(self, act):
+        """
+        Removes the ship of each wave hit by an alien bolt, and takes away a life
+
+        The bolt is removed along with the ship.  The wave is finished when there
+        are no lives left.
+
+        Parameter act: whether each wave is stepped
+        Precondition: act is a bool array of num
+        """
+        ships = act & self._shipAlive & (self._lives > 0)
+        dx = np.abs(self._bx - self._shipX[:, None])
+        dy = np.abs(self._by - SHIP_BOTTOM)
+        hit = self._used & (self._owner == OWNER_ALIEN) & ships[:, None] & \
+            ((np.abs(dx - BOLT_WIDTH/2) < SHIP_WIDTH/2) |
+            (dx + BOLT_WIDTH/2 < SHIP_WIDTH/2)) & \
+            ((np.abs(dy - BOLT_HEIGHT/2) < SHIP_HEIGHT/2) |
+            (dy + BOLT_HEIGHT/2 < SHIP_HEIGHT/2))
+        k = np.flatnonzero(hit.any(axis=1))
+        if len(k) == 0:
+            return
+        first = np.where(hit[k], self._pos[k], self._pos.shape[1]).argmin(axis=1)
+        self._removeBolts(k, first)
+        self._shipAlive[k] = False
+        self._lives[k] -= 1
+        self._finish[k] |= self._lives[k] == 0
+
+    def _killed(self, waves, cols):
+        """
+        Updates the occupancy of each wave after an alien in the given column died
+
+        Parameter waves: the waves where an alien died
+        Precondition: waves is an int array of distinct rows in 0..num-1
+
+        Parameter cols: the column of the alien that died in each wave
+        Precondition: cols is an int array of the same length as waves
+        """
+        alive = self._alive[waves]
+        counts = alive.sum(axis=1)
+        for k, c in zip(waves.tolist(), cols.tolist()):
+            columns = self._columns[k]
+            if not self._alive[k, :, c].any():
+                # Remove the column the way Formation.kill does, keeping the order
+                at = columns.index(c)
+                last = columns.pop()
+                if last != c:
+                    columns[at] = last
+        full = counts > 0
+        rows = alive.any(axis=2)
+        self._live[waves] = counts.sum(axis=1)
+        self._left[waves] = full.argmax(axis=1)
+        self._right[waves] = full.shape[1] - 1 - full[:, ::-1].argmax(axis=1)
+        self._bottomRow[waves] = rows.shape[1] - 1 - rows[:, ::-1].argmax(axis=1)
+
+    def _addBolts(self, waves, x, y, vy, owner):
+        """
+        Adds one bolt to each of the given waves
+
+        Parameter waves: the waves to add a bolt to
+        Precondition: waves is an int array of distinct rows in 0..num-1
+
+        Parameter x: the x coordinate of each bolt
+        Precondition: x is a float array of the same length as waves
+
+        Parameter y: the y coordinate of each bolt
+        Precondition: y is a float, or a float array of the same length as waves
+
+        Parameter vy: the velocity of the bolts
+        Precondition: vy is an int or float
+
+        Parameter owner: who fired the bolts
+        Precondition: owner is OWNER_ALIEN or OWNER_SHIP
+        """
+        if len(waves) == 0:
+            return
+        free = ~self._used[waves]
+        if not free.any(axis=1).all():
+            self._grow()
+            free = ~self._used[waves]
+        b = free.argmax(axis=1)
+        self._bx[waves, b] = x
+        self._by[waves, b] = y
+        self._bvy[waves, b] = vy
+        self._owner[waves, b] = owner
+        self._used[waves, b] = True
+        self._pos[waves, b] = self._count[waves]
+        self._count[waves] += 1
+
+    def _removeBolts(self, waves, slots):
+        """
+        Removes one bolt from each of the given waves
+
+        The last bolt of the wave in BoltBank order takes the position of the bolt
+        removed, as in BoltBank.remove.
+
+        Parameter waves: the waves to remove a bolt from
+        Precondition: waves is an int array of distinct rows in 0..num-1
+
+        Parameter slots: the slot of the bolt to remove in each wave
+        Precondition: slots is an int array of used slots, the same length as waves
+        """
+        last = self._count[waves] - 1
+        top = (self._used[waves] & (self._pos[waves] == last[:, None])).argmax(axis=1)
+        self._pos[waves, top] = self._pos[waves, slots]
+        self._used[waves, slots] = False
+        self._count[waves] = last
+
+    def _cull(self):
+        """
+        Removes every bolt that has gone offscreen
+
+        BoltBank.cull removes these bolts from the last one to the first, each time
+        moving the last bolt into the gap.  So the gaps left below the new count are
+        filled by the bolts above it, the highest bolt going to the highest gap.
+        """
+        gone = self._used & ((self._by < -BOLT_HEIGHT/2) |
+            (self._by > GAME_HEIGHT + BOLT_HEIGHT/2))
+        waves = np.flatnonzero(gone.any(axis=1))
+        if len(waves) == 0:
+            return
+        gone = gone[waves]
+        used = self._used[waves] & ~gone
+        pos = self._pos[waves]
+        count = self._count[waves] - gone.sum(axis=1)
+        gaps = gone & (pos < count[:, None])
+        above = used & (pos >= count[:, None])
+        gap = -np.sort(np.where(gaps, -pos, 1), axis=1)
+        src = np.argsort(np.where(above, -pos, 1), axis=1, kind='stable')
+        r, j = np.nonzero(np.arange(pos.shape[1]) < gaps.sum(axis=1)[:, None])
+        pos[r, src[r, j]] = gap[r, j]
+        self._pos[waves] = pos
+        self._used[waves] = used
+        self._count[waves] = count
+
+    def _grow(self):
+        """
+        Makes the rows of bolt slots twice as long, keeping the bolts
+        """
+        def wider(a):
+            out = np.zeros((a.shape[0], a.shape[1]*2), dtype=a.dtype)
+            out[:, :a.shape[1]] = a
+            return out
+        self._bx = wider(self._bx)
+        self._by = wider(self._by)
+        self._bvy = wider(self._bvy)
+        self._owner = wider(self._owner)
+        self._used = wider(self._used)
+        self._pos = wider(self._pos)
+
+    def _observe(self):
+        """
+        Copies the state of every wave into the observation arrays
+
+        The bolts of each wave are packed at the start of its row, in the order of
+        the BoltBank of a WaveSim.
+        """
+        obs = self._obs
+        obs['ship'][:, 0] = self._shipX
+        obs['ship'][:, 1] = self._shipAlive
+        obs['lives'][:] = self._lives
+        obs['origin'][:, 0] = self._ox
+        obs['origin'][:, 1] = self._oy
+        obs['alive'][:] = self._alive
+        out = obs['bolts']
+        size = out.shape[1]
+        order = np.argsort(np.where(self._used, self._pos, self._pos.shape[1]),
+            axis=1)[:, :size]
+        n = np.minimum(self._count, size)
+        for i, a in enumerate((self._bx, self._by, self._bvy, self._owner)):
+            col = np.take_along_axis(a, order, axis=1)
+            width = col.shape[1]
+            out[:, :width, i] = col
+            out[:, width:, i] = 0
+        out[np.arange(size) >= n[:, None]] = 0
+        obs['nbolts'][:] = n
+
+
+def _overlaps(x, y, w, h, bx, by):
+    """
+    Returns whether a corner of each bolt is strictly inside each box, as an array
+
+    This is the array form of _overlaps in sim.py, and checks the corners the same
+    way.  The arguments are broadcast together.
+
+    Parameter x: the x coordinate of the center of each box
+    Precondition: x is a float or float array
+
+    Parameter y: the y coordinate of the center of each box
+    Precondition: y is a float or float array
+
+    Parameter w: the width of the boxes
+    Precondition: w is an int or float > 0
+
+    Parameter h: the height of the boxes
+    Precondition: h is an int or float > 0
+
+    Parameter bx: the x coordinate of the center of each bolt
+    Precondition: bx is a float or float array
+
+    Parameter by: the y coordinate of the center of each bolt
+    Precondition: by is a float or float array
+    """
+    result = False
+    for px in (bx - BOLT_WIDTH/2, bx + BOLT_WIDTH/2):
+        for py in (by - BOLT_HEIGHT/2, by + BOLT_HEIGHT/2):
+            result = result | ((np.abs(px - x) < w/2) & (np.abs(py - y) < h/2))
+    return result
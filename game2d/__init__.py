@@ -10,7 +10,10 @@ Date:   August 1, 2017 (Python 3 version)
 from .gobject import GObject, GScene
 from .grectangle import GRectangle, GEllipse, GImage, GLabel
 from .gsprite import GSprite
+from .gbatch import GBatch
 from .gpath import GPath, GTriangle, GPolygon
 from .gview import GInput, GView
-from .sound import Sound, SoundLibrary
+from .sound import Sound, SoundLibrary, SoundBank
+from .preload import Preloader
+from .cache import TextureCache
 from .app import GameApp
\ No newline at end of file
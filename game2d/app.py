@@ -16,6 +16,9 @@ from kivy.config import Config
 from kivy.clock  import Clock
 
 import os.path
+import json
+
+from .cache import TextureCache
 
 class GameApp(kivy.app.App):
     """
@@ -37,7 +40,7 @@ class GameApp(kivy.app.App):
     thing you should have in this method are calls to ``self.view.draw()``.
     """
     # Class attribute for tracking textures (to reduce memory footprint)
-    TEXTURE_CACHE = {}
+    TEXTURE_CACHE = TextureCache()
     
     
     # MUTABLE ATTRIBUTES
@@ -162,32 +165,89 @@ class GameApp(kivy.app.App):
         return os.path.exists(os.path.join(cls.sounds,name))
     
     @classmethod
-    def load_texture(cls,name):
+    def load_texture(cls,name,image=None,pin=False):
         """
         Returns: The texture for the given file name, or None if it cannot be loaded
         
         The ``name`` must refer to the file in the **Images** folder.  If the texture
         has already been loaded, it will return the cached texture.  Otherwise, it will
-        load the texture and cache it before returning it.
+        load the texture and cache it before returning it.  The cache has a budget in 
+        bytes, so a texture not used for a long time may have to be loaded again 
+        (see :class:`TextureCache`), unless it is pinned.
+        
+        If ``image`` is given, the texture is made from that image instead of reading 
+        the file.  This is how :class:`Preloader` caches images decoded in its threads.
         
         This method will crash if name is not a valid file.
         
         :param name: The file name
         :type name:  ``str``
+        
+        :param image: The image already decoded from the file, or None
+        :type image:  ``ImageLoaderBase`` or ``None``
+        
+        :param pin: Whether the texture should never be dropped from the cache
+        :type pin:  ``bool``
         """
         assert cls.is_image(name), '%s is not an image file' % repr(name)
-        if name in cls.TEXTURE_CACHE:
-            return cls.TEXTURE_CACHE[name]
+        texture = cls.TEXTURE_CACHE.get(name)
+        if not texture is None:
+            if pin:
+                cls.TEXTURE_CACHE.pin(name)
+            return texture
         
         try:
-            from kivy.core.image import Image
-            texture = Image(name).texture
-            cls.TEXTURE_CACHE[name] = texture
+            if image is None:
+                from kivy.core.image import Image
+                image = Image(name)
+            texture = image.texture
+            cls.TEXTURE_CACHE.add(name,texture,pin)
         except:
             texture = None
         
         return texture
     
+    @classmethod
+    def load_atlas(cls,name,image=None,pin=True):
+        """
+        Returns: The names of the images in the given texture atlas
+        
+        An atlas is one image holding many smaller images.  The ``name`` must refer to 
+        an atlas file in the **Images** folder, in the JSON format of Kivy atlases (see 
+        ``atlas.py``).  The atlas texture is put in the texture cache under the name of
+        its image, and each region of it is put in the cache under the file name of the
+        image it holds.  So :meth:`load_texture` returns the region for those names,
+        and :class:`GImage` and :class:`GSprite` objects using them all draw from a
+        single texture.
+        
+        The regions only count once towards the budget of the cache, as part of the
+        atlas texture, and are dropped along with it.  The atlas should be pinned (the
+        default), as the regions cannot be loaded again on their own.
+        
+        :param name: The atlas file name
+        :type name:  ``str``
+        
+        :param image: The atlas image already decoded from its file, or None
+        :type image:  ``ImageLoaderBase`` or ``None``
+        
+        :param pin: Whether the atlas should never be dropped from the cache
+        :type pin:  ``bool``
+        """
+        path = os.path.join(cls.images,name)
+        assert os.path.exists(path), '%s is not an atlas file' % repr(name)
+        with open(path) as file:
+            pages = json.load(file)
+        
+        names = []
+        for page in pages:
+            texture = cls.load_texture(page,image,pin)
+            if texture is None:
+                continue
+            for key, region in pages[page].items():
+                cls.TEXTURE_CACHE.add_region(key,page,texture.get_region(*region))
+                names.append(key)
+        return names
+    
     @classmethod
     def unload_texture(cls,name):
         """
@@ -201,12 +261,7 @@ class GameApp(kivy.app.App):
         :type name:  ``str``
         """
         assert type(name) == str, '%s is not a valid texture name' % repr(name)
-        if name in cls.TEXTURE_CACHE:
-            texture = cls.TEXTURE_CACHE[name]
-            del cls.TEXTURE_CACHE[name]
-            return texture
-        
-        return None
+        return cls.TEXTURE_CACHE.remove(name)
     
     # BUILT-IN METHODS
     def __init__(self,**keywords):
@@ -345,13 +400,20 @@ class GameApp(kivy.app.App):
         
         This method a callback-proxy for the methods `update` and `draw`.  It handles
         important issues behind the scenes, particularly with clearing the window.
+        A retained view is not cleared; instead, the objects not drawn in the frame
+        are taken out at the end of it (see :class:`GView`).
         
         :param dt: time in seconds since last update
         :type dt:  ``int`` or ``float``
         """
-        self.view.clear()
-        self.update(dt)
-        self.draw()
+        if self.view.retained:
+            self.update(dt)
+            self.draw()
+            self.view._sweep()
+        else:
+            self.view.clear()
+            self.update(dt)
+            self.draw()
     
     def _setpaths(self):
         """
@@ -0,0 +1,359 @@
+"""
+Texture cache for 2D game support.
+
+This class keeps the textures loaded by :class:`GameApp` within a memory budget,
+dropping the ones used the longest time ago when the budget is full.
+"""
+from collections import OrderedDict
+
+
+class TextureCache(object):
+    """
+    A class mapping file names to textures, bounded by a budget in bytes.
+
+    The size of a texture is counted as width x height x 4 bytes, which is what an RGBA
+    texture takes on the graphics card.  When adding a texture puts the cache over its
+    :attr:`budget`, the textures used the longest time ago are dropped until it fits.
+    A texture can be pinned so that it is never dropped, which is what you want for
+    images that are always on screen.  Pinned textures count towards the size of the
+    cache, but the cache may go over budget if only pinned textures are left.
+
+    Dropping a texture only removes it from the cache.  The graphics card memory is
+    freed once no :class:`GObject` uses the texture either.
+
+    The frames cut from a texture (see :class:`GSprite`) can be kept with it using
+    :meth:`add_frames`, and are dropped along with the texture.  They are regions of
+    the texture, so they do not count towards the size of the cache.
+
+    In the same way, the images in an atlas are added with :meth:`add_region` under
+    their own names.  They are not textures of their own in the cache: they take no
+    bytes, they are never dropped on their own, and using one counts as a use of
+    the atlas.  They are dropped along with the atlas, and are pinned if it is.
+
+    The attributes :attr:`hits`, :attr:`misses` and :attr:`evictions` count the
+    lookups and drops since the cache was made (or last reset with :meth:`clear`).
+    """
+
+    # MUTABLE PROPERTIES
+    @property
+    def budget(self):
+        """
+        The most bytes of textures to keep.
+
+        Lowering the budget drops textures right away until the cache fits.
+
+        **Invariant**: Must be an int >= 0.
+        """
+        return self._budget
+
+    @budget.setter
+    def budget(self,value):
+        assert type(value) == int and value >= 0, '%s is not a valid budget' % repr(value)
+        self._budget = value
+        self._evict()
+
+    # IMMUTABLE PROPERTIES
+    @property
+    def size(self):
+        """
+        The bytes of textures in the cache, pinned ones included.
+
+        **Immutable**: This value cannot be changed.
+
+        **Invariant**: Must be an int >= 0.
+        """
+        return self._size
+
+    @property
+    def hits(self):
+        """
+        The number of calls to :meth:`get` that found their texture.
+
+        **Immutable**: This value cannot be changed.
+
+        **Invariant**: Must be an int >= 0.
+        """
+        return self._hits
+
+    @property
+    def misses(self):
+        """
+        The number of calls to :meth:`get` that did not find their texture.
+
+        **Immutable**: This value cannot be changed.
+
+        **Invariant**: Must be an int >= 0.
+        """
+        return self._misses
+
+    @property
+    def evictions(self):
+        """
+        The number of textures dropped to stay within the budget.
+
+        **Immutable**: This value cannot be changed.
+
+        **Invariant**: Must be an int >= 0.
+        """
+        return self._evictions
+
+    def __init__(self,budget=64*1024*1024):
+        """
+        Creates a new, empty texture cache.
+
+        :param budget: The most bytes of textures to keep
+        :type budget:  ``int`` >= 0
+        """
+        self._data   = OrderedDict()
+        self._bytes  = {}
+        self._frames = {}
+        self._regions = {}
+        self._atlas  = {}
+        self._pinned = set()
+        self._size   = 0
+        self._hits   = 0
+        self._misses = 0
+        self._evictions = 0
+        self.budget  = budget
+
+    def __len__(self):
+        """
+        :return: The number of textures in this cache, not counting atlas regions.
+        :rtype:  ``int`` >= 0
+        """
+        return len(self._data)
+
+    def __contains__(self, name):
+        """
+        Checks if the texture for a file name is in the cache.
+
+        This does not count as a use of the texture, and is not counted as a hit or
+        a miss.
+
+        :param name: The file name
+        :type name:  ``str``
+
+        :return: True if the texture is in the cache; False otherwise
+        :rtype:  ``bool``
+        """
+        return name in self._data or name in self._regions
+
+    def __iter__(self):
+        """
+        :return: The iterator for the file names, from least to most recently used.
+        :rtype:  ``iterable``
+        """
+        return iter(self._data.keys())
+
+    def get(self, name):
+        """
+        Returns: The texture for the file name, or None if it is not in the cache
+
+        A texture found counts as used just now.  For an atlas region, the atlas
+        counts as used.
+
+        :param name: The file name
+        :type name:  ``str``
+        """
+        if name in self._regions:
+            self._hits += 1
+            self._data.move_to_end(self._atlas[name])
+            return self._regions[name]
+        if name in self._data:
+            self._hits += 1
+            self._data.move_to_end(name)
+            return self._data[name]
+        self._misses += 1
+        return None
+
+    def add(self, name, texture, pin=False, size=None):
+        """
+        Adds the texture for the file name to the cache, replacing any texture there.
+
+        Textures used the longest time ago are dropped if the cache goes over budget.
+        The new texture is only dropped if it is larger than the whole budget.
+
+        The texture is pinned or not as ``pin`` says, even if the texture it replaces
+        was pinned.  Replacing a texture drops the frames and atlas regions of the
+        texture there before.
+
+        :param name: The file name
+        :type name:  ``str``
+
+        :param texture: The texture to keep
+        :type texture:  ``Texture`` (any object with a width and height)
+
+        :param pin: Whether the texture should never be dropped
+        :type pin:  ``bool``
+
+        :param size: The bytes the texture takes, or None for width x height x 4
+        :type size:  ``int`` >= 0 or ``None``
+        """
+        if name in self._regions:
+            self.remove(name)
+        if name in self._data:
+            self._size -= self._bytes[name]
+            self._frames.pop(name,None)
+            self._drop_regions(name)
+            self._data.move_to_end(name)
+        self._data[name] = texture
+        if size is None:
+            size = int(texture.width)*int(texture.height)*4
+        self._bytes[name] = size
+        self._size += self._bytes[name]
+        if pin:
+            self._pinned.add(name)
+        else:
+            self._pinned.discard(name)
+        self._evict()
+
+    def add_region(self, name, atlas, texture):
+        """
+        Adds a region of an atlas texture to the cache, under its own file name.
+
+        The region takes no bytes in the cache, since its pixels are those of the
+        atlas.  It is dropped with the atlas, and is not dropped on its own.
+
+        :param name: The file name of the image in the atlas
+        :type name:  ``str``
+
+        :param atlas: The file name of an atlas texture in the cache
+        :type atlas:  ``str``
+
+        :param texture: The region of the atlas texture
+        :type texture:  ``TextureRegion``
+        """
+        assert atlas in self._data, '%s is not in the cache' % repr(atlas)
+        assert not name in self._data, '%s is a texture in the cache' % repr(name)
+        if name in self._regions:
+            self.remove(name)
+        self._regions[name] = texture
+        self._atlas[name] = atlas
+
+    def remove(self, name):
+        """
+        Returns: The texture removed for the file name, or None if it is not in the cache
+
+        The texture is removed even if it is pinned, along with its atlas regions.
+        Removing an atlas region only removes that region.
+
+        :param name: The file name
+        :type name:  ``str``
+        """
+        if name in self._regions:
+            self._frames.pop(name,None)
+            del self._atlas[name]
+            return self._regions.pop(name)
+        if not name in self._data:
+            return None
+        self._pinned.discard(name)
+        self._frames.pop(name,None)
+        self._drop_regions(name)
+        self._size -= self._bytes.pop(name)
+        return self._data.pop(name)
+
+    def get_frames(self, name, format):
+        """
+        Returns: The frames cut from the texture for the file name, or None if there are none
+
+        This does not count as a use of the texture.
+
+        :param name: The file name
+        :type name:  ``str``
+
+        :param format: The (rows, columns) the texture was cut into
+        :type format:  ``tuple`` of two ``int``
+        """
+        return self._frames.get(name,{}).get(format)
+
+    def add_frames(self, name, format, frames):
+        """
+        Keeps the frames cut from the texture for the file name, until it is dropped.
+
+        This method does nothing if the texture is not in the cache.
+
+        :param name: The file name
+        :type name:  ``str``
+
+        :param format: The (rows, columns) the texture was cut into
+        :type format:  ``tuple`` of two ``int``
+
+        :param frames: The frames, in order
+        :type frames:  ``tuple`` of ``Texture``
+        """
+        if name in self:
+            self._frames.setdefault(name,{})[format] = frames
+
+    def pin(self, name):
+        """
+        Pins the texture for the file name, so that it is never dropped.
+
+        Pinning an atlas region pins the whole atlas.
+
+        :param name: The file name of a texture in the cache
+        :type name:  ``str``
+        """
+        assert name in self, '%s is not in the cache' % repr(name)
+        self._pinned.add(self._atlas.get(name,name))
+
+    def unpin(self, name):
+        """
+        Unpins the texture for the file name, so that it can be dropped again.
+
+        Unpinning an atlas region unpins the whole atlas.
+
+        :param name: The file name
+        :type name:  ``str``
+        """
+        self._pinned.discard(self._atlas.get(name,name))
+        self._evict()
+
+    def is_pinned(self, name):
+        """
+        Returns: True if the texture for the file name is pinned; False otherwise
+
+        :param name: The file name
+        :type name:  ``str``
+        """
+        return self._atlas.get(name,name) in self._pinned
+
+    def clear(self):
+        """
+        Removes every texture, pinned or not, and resets the counters.
+        """
+        self._data.clear()
+        self._bytes.clear()
+        self._frames.clear()
+        self._regions.clear()
+        self._atlas.clear()
+        self._pinned.clear()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    # HIDDEN METHODS
+    def _drop_regions(self, atlas):
+        """
+        Removes the regions of the atlas texture, and the frames cut from them.
+
+        :param atlas: The file name of the atlas texture
+        :type atlas:  ``str``
+        """
+        for name in [name for name in self._atlas if self._atlas[name] == atlas]:
+            self.remove(name)
+
+    def _evict(self):
+        """
+        Drops the textures used the longest time ago, until the cache fits its budget.
+
+        Pinned textures are skipped.
+        """
+        if self._size <= self._budget:
+            return
+        for name in list(self._data.keys()):
+            if self._size <= self._budget:
+                break
+            if not name in self._pinned:
+                self.remove(name)
+                self._evictions += 1
@@ -0,0 +1,200 @@
+"""
+A module to support drawing many images at once.
+
+This module draws a large group of images of the same size, like a formation of
+enemies, as a single mesh instead of one set of graphics commands per image.
+"""
+from kivy.graphics import *
+from kivy.graphics.instructions import *
+from .gobject import GObject
+from .app import GameApp
+
+# #mark -
+class GBatch(GObject):
+    """
+    A class representing a group of images drawn together as one mesh.
+
+    Every image in the batch has the size given by ``width`` and ``height``, its own
+    ``source`` file, and its own position relative to the point (x,y) of the batch.
+    So changing the attributes `x` and `y` moves every image, like a :class:`GScene`,
+    without touching the mesh.
+
+    Images can be hidden and shown again with :meth:`set_visible`.  A hidden image
+    stays in the mesh as a rectangle of size zero, so hiding it only changes a few
+    numbers in place.  The images with the same texture (or with regions of the same
+    texture atlas) are drawn with a single mesh, so a batch of any size is usually a
+    handful of graphics commands.
+
+    Like :class:`GImage`, if you define ``fillcolor``, this object will tint all of the
+    images by the given color.  The :meth:`contains` method treats this object as a
+    single rectangle of size ``width`` x ``height`` around (x,y), which is not useful;
+    check the positions yourself instead.
+    """
+
+    # IMMUTABLE PROPERTIES
+    @property
+    def count(self):
+        """
+        The number of images in this batch, hidden ones included.
+
+        **Immutable**: This value cannot be changed after the batch is made.
+
+        **Invariant**: Must be an int >= 0.
+        """
+        return len(self._sources)
+
+
+    # BUILT-IN METHODS
+    def __init__(self,**keywords):
+        """
+        Creates a new batch of images.
+
+        To use the constructor for this class, you should provide it with a list of
+        keyword arguments that initialize various attributes. For example, to draw two
+        aliens 50 pixels apart, use the constructor::
+
+            GBatch(x=100,y=100,width=33,height=33,sources=['alien1.png','alien2.png'],
+                   positions=[(0,0),(50,0)])
+
+        This class supports the same keywords as :class:`GObject`, plus the keywords
+        ``sources`` and ``positions``.  These are lists with the image file and the
+        center of each image, relative to (x,y).  They must have the same length.  The
+        optional keyword ``visible`` is a list of bools saying which images are shown
+        at first; by default every image is shown.
+
+        :param keywords: dictionary of keyword arguments
+        :type keywords:  keys are attribute names
+        """
+        self._defined = False
+        sources   = list(keywords['sources']) if 'sources' in keywords else []
+        positions = list(keywords['positions']) if 'positions' in keywords else []
+        assert len(sources) == len(positions), 'sources and positions have different lengths'
+        for name in sources:
+            assert GameApp.is_image(name), '%s is not an image file' % repr(name)
+        self._sources   = sources
+        self._positions = [(float(x),float(y)) for x, y in positions]
+        if 'visible' in keywords:
+            assert len(keywords['visible']) == len(sources), 'visible has the wrong length'
+            self._visible = [bool(v) for v in keywords['visible']]
+        else:
+            self._visible = [True]*len(sources)
+        GObject.__init__(self,**keywords)
+        self._reset()
+        self._defined = True
+
+
+    # PUBLIC METHODS
+    def is_visible(self,index):
+        """
+        Returns: True if the image at the given index is shown; False otherwise
+
+        :param index: the position of the image in the batch
+        :type index:  ``int`` 0..count-1
+        """
+        return self._visible[index]
+
+    def set_visible(self,index,value):
+        """
+        Shows or hides the image at the given index.
+
+        :param index: the position of the image in the batch
+        :type index:  ``int`` 0..count-1
+
+        :param value: whether to show the image
+        :type value:  ``bool``
+        """
+        assert type(value) == bool, '%s is not a bool' % repr(value)
+        if self._visible[index] != value:
+            self._visible[index] = value
+            self._write(index)
+            mesh, vertices = self._meshes[self._slots[index][0]]
+            mesh.vertices = vertices
+
+    def set_all_visible(self,values):
+        """
+        Shows or hides every image in the batch at once.
+
+        Only the images that change are updated, and each mesh is sent to the graphics
+        card at most once.
+
+        :param values: whether to show each image, in the order of the batch
+        :type values:  ``list`` or ``tuple`` of ``bool`` with one value per image
+        """
+        assert len(values) == self.count, '%s has the wrong length' % repr(values)
+        changed = set()
+        for index in range(self.count):
+            value = bool(values[index])
+            if self._visible[index] != value:
+                self._visible[index] = value
+                self._write(index)
+                changed.add(self._slots[index][0])
+        for key in changed:
+            mesh, vertices = self._meshes[key]
+            mesh.vertices = vertices
+
+
+    # HIDDEN METHODS
+    def _reset(self):
+        """
+        Resets the drawing cache.
+
+        The images are grouped by texture, and each group becomes one mesh of two
+        triangles per image.
+        """
+        GObject._reset(self)
+        if not self._fillcolor is None:
+            self._cache.add(self._fillcolor)
+        else:
+            self._cache.add(Color(1,1,1))
+
+        groups  = {}
+        order   = []
+        self._coords = []
+        self._slots  = []
+        for name in self._sources:
+            texture = GameApp.load_texture(name)
+            key = None if texture is None else texture.id
+            if not key in groups:
+                groups[key] = (texture, [])
+                order.append(key)
+            self._coords.append((0,0,1,0,1,1,0,1) if texture is None else texture.tex_coords)
+            self._slots.append((key,len(groups[key][1])))
+            groups[key][1].append(len(self._slots)-1)
+
+        self._meshes = {}
+        for key in order:
+            texture, members = groups[key]
+            vertices = [0.0]*(16*len(members))
+            indices  = []
+            for k in range(len(members)):
+                indices.extend((4*k,4*k+1,4*k+2,4*k+2,4*k+3,4*k))
+            self._meshes[key] = (None,vertices)
+            for index in members:
+                self._write(index)
+            mesh = Mesh(vertices=vertices,indices=indices,mode='triangles',texture=texture)
+            self._meshes[key] = (mesh,vertices)
+            self._cache.add(mesh)
+
+        self._cache.add(PopMatrix())
+
+    def _write(self,index):
+        """
+        Writes the corners of the image at the given index into its mesh vertices.
+
+        A hidden image has all four corners at its center.
+
+        :param index: the position of the image in the batch
+        :type index:  ``int`` 0..count-1
+        """
+        key, slot = self._slots[index]
+        vertices = self._meshes[key][1]
+        cx, cy = self._positions[index]
+        if self._visible[index]:
+            w = self.width/2.0
+            h = self.height/2.0
+        else:
+            w = h = 0.0
+        tc = self._coords[index]
+        k = 16*slot
+        vertices[k:k+16] = (cx-w,cy-h,tc[0],tc[1], cx+w,cy-h,tc[2],tc[3],
+                            cx+w,cy+h,tc[4],tc[5], cx-w,cy+h,tc[6],tc[7])
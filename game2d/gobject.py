@@ -89,6 +89,8 @@ class GObject(object):
     subclasses: :class:`GRectangle`, :class:`GEllipse`, :class:`GImage`, :class:`GLabel`,
     :class:`GTriangle`, :class:`GPolygon`, or :class:`GPath`.
     """
+    # The views this object is attached to (see GView.attach)
+    _views = ()
 
     # MUTABLE PROPERTIES
     @property
@@ -602,12 +604,18 @@ class GObject(object):
     def _reset(self):
         """
         Resets the drawing cache.
+
+        The new cache takes the place of the old one in every view this object is
+        attached to.
         """
+        old = self._cache if hasattr(self,'_cache') else None
         self._cache = InstructionGroup()
         self._cache.add(PushMatrix())
         self._cache.add(self._trans)
         self._cache.add(self._rotate)
         self._cache.add(self._scale)
+        for view in self._views:
+            view._replace(self,old,self._cache)
 
     def _build_matrix(self):
         """
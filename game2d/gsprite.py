@@ -33,6 +33,12 @@ class GSprite(GRectangle):
     
     If the image supports transparency, then this object can be used to represent irregular 
     shapes.  However, the :meth:`contains` method still treats this shape as a  rectangle.
+    
+    The frames of a filmstrip are cut from its texture once, and shared by every sprite
+    with the same ``source`` and ``format``.  So many sprites of the same filmstrip cost
+    no more to make than one, and changing the frame only swaps the texture.  The frames
+    are kept with the texture in the texture cache of :class:`GameApp`, so they are
+    dropped when it is.
     """
     
     # MUTABLE PROPERTIES
@@ -130,20 +136,7 @@ class GSprite(GRectangle):
         x = -self.width/2.0
         y = -self.height/2.0
         
-        texture = GameApp.load_texture(self.source)
-        if texture:
-            width  = texture.width/self._format[1]
-            height = texture.height/self._format[0]
-            
-            ty = 0
-            for row in range(self._format[0]):
-                tx = 0
-                for col in range(self._format[1]):
-                    self._images[row*self._format[1]+col] = texture.get_region(int(tx),texture.height-int(ty)-int(height),int(width),int(height))
-                    tx += width
-                ty += width
-        else:
-            print('Failed to load',repr(self.source))
+        self._images = self._getFrames()
         
         self._texture = self._images[self._frame]
         self._bounds = Rectangle(pos=(x,y), size=(self.width, self.height),texture=self._texture)
@@ -159,4 +152,35 @@ class GSprite(GRectangle):
             self._cache.add(line)
         
         self._cache.add(PopMatrix())
+    
+    def _getFrames(self):
+        """
+        Returns the frames of this filmstrip, cutting them from the texture if needed.
+        
+        The frames are kept in the texture cache of :class:`GameApp`, and shared by all
+        sprites with the same source and format.  If the texture cannot be loaded, every
+        frame is None.
+        """
+        texture = GameApp.load_texture(self.source)
+        if not texture:
+            print('Failed to load',repr(self.source))
+            return [None]*self.count
+        
+        frames = GameApp.TEXTURE_CACHE.get_frames(self.source,self._format)
+        if not frames is None:
+            return frames
+        
+        width  = texture.width/self._format[1]
+        height = texture.height/self._format[0]
+        frames = []
+        ty = 0
+        for row in range(self._format[0]):
+            tx = 0
+            for col in range(self._format[1]):
+                frames.append(texture.get_region(int(tx),texture.height-int(ty)-int(height),int(width),int(height)))
+                tx += width
+            ty += height
+        frames = tuple(frames)
+        GameApp.TEXTURE_CACHE.add_frames(self.source,self._format,frames)
+        return frames
 
@@ -319,12 +319,44 @@ class GView(FloatLayout):
     :class:`GObject` instances to the :meth:`draw` method.  You must do this every
     animation frame, as the game is constantly clearing the window.
 
+    If :attr:`retained` is True, the window is no longer cleared and rebuilt every
+    frame.  Objects drawn in a frame stay where they are in the window, and the window
+    only changes when the objects drawn, or their order, differ from the last frame.
+    The objects are always shown in the order they were drawn in.
+
+    Objects can also be attached with :meth:`attach`.  An attached object stays in the
+    window, without being drawn every frame, until it is detached with :meth:`detach`.
+    It is shown below the objects drawn every frame, or above them if attached with
+    ``above=True``, in the order the objects were attached.  Attaching the objects that
+    are always on screen keeps the cost of a frame small, even with many objects.
+
     **You should never construct an object of this class**.  Creating a new instance
     of this class will not properly display it on the screen.  Instead, you should
     only use the one provided in the `view` attribute of :class:`GameApp`.
     See the documentation of that class for more information.
     """
 
+    # MUTABLE ATTRIBUTES
+    @property
+    def retained(self):
+        """
+        Whether the view keeps its contents from one frame to the next.
+
+        Turning this off clears the view, except for the attached objects.
+
+        **Invariant**: Must be a boolean.
+        """
+        return self._retained
+
+    @retained.setter
+    def retained(self,value):
+        assert type(value) == bool, '%s is not a bool' % repr(value)
+        if not value:
+            self.clear()
+        elif not self._retained:
+            self._drawn.clear()
+        self._retained = value
+
     # BUILT-IN METHODS
     def __init__(self):
         """
@@ -337,10 +369,22 @@ class GView(FloatLayout):
         """
         FloatLayout.__init__(self)
         self._frame = InstructionGroup()
+        self._below = InstructionGroup()
+        self._middle = InstructionGroup()
+        self._above = InstructionGroup()
+        self._frame.add(self._below)
+        self._frame.add(self._middle)
+        self._frame.add(self._above)
         self.bind(pos=self._reset)
         self.bind(size=self._reset)
         self._reset()
         self._contents = set()
+        self._shown    = []
+        self._drawn    = set()
+        self._order    = []
+        self._attached = {}
+        self._fixed    = set()
+        self._retained = False
 
 
     # PUBLIC METHODS
@@ -354,21 +398,126 @@ class GView(FloatLayout):
         :param cmd: the command to draw
         :type cmd:  A Kivy graphics command
         """
-        if not cmd in self._contents:
-            self._frame.add(cmd)
+        if cmd in self._drawn or cmd in self._fixed:
+            return
+        self._drawn.add(cmd)
+        if self._retained:
+            self._order.append(cmd)
+        else:
+            self._middle.add(cmd)
             self._contents.add(cmd)
+            self._shown.append(cmd)
 
     def clear(self):
         """
-        Clears the contents of the view.
+        Clears the contents of the view, except for the attached objects.
 
         This method is called for you automatically at the start of the animation
-        frame.  That way, you are not drawing images on top of one another.
+        frame, unless the view is :attr:`retained`.  That way, you are not drawing
+        images on top of one another.
         """
-        self._frame.clear()
+        self._middle.clear()
         self._contents.clear()
+        self._shown = []
+        self._drawn.clear()
+        self._order = []
+
+    def attach(self,obj,above=False):
+        """
+        Adds the given object to this view until it is detached.
+
+        The object is shown in every frame without calling its ``draw`` method, and it
+        keeps showing its current state as its attributes change.  Attaching an object
+        that is already attached does nothing.
+
+        :param obj: the object to attach
+        :type obj:  :class:`GObject`
+
+        :param above: whether to show the object above the objects drawn every frame
+        :type above:  ``bool``
+        """
+        if obj in self._attached:
+            return
+        group = self._above if above else self._below
+        self._attached[obj] = (group,obj._cache)
+        self._fixed.add(obj._cache)
+        obj._views = obj._views+(self,)
+        group.add(obj._cache)
+
+    def detach(self,obj):
+        """
+        Removes the given object from this view, if it is attached.
+
+        :param obj: the object to detach
+        :type obj:  :class:`GObject`
+        """
+        if not obj in self._attached:
+            return
+        group, cmd = self._attached.pop(obj)
+        self._fixed.discard(cmd)
+        obj._views = tuple(view for view in obj._views if not view is self)
+        group.remove(cmd)
+
+    def is_attached(self,obj):
+        """
+        Returns: True if the given object is attached to this view; False otherwise
+
+        :param obj: the object to check
+        :type obj:  :class:`GObject`
+        """
+        return obj in self._attached
 
     # HIDDEN METHODS
+    def _sweep(self):
+        """
+        Ends a frame of a retained view, putting the objects drawn in the window in order.
+
+        The window is only changed if the objects drawn differ from the last frame.
+        This method is called for you automatically at the end of the animation frame.
+        """
+        if self._order != self._shown:
+            for cmd in self._shown:
+                if not cmd in self._drawn:
+                    self._middle.remove(cmd)
+            shown = [cmd for cmd in self._shown if cmd in self._drawn]
+            for pos in range(len(self._order)):
+                cmd = self._order[pos]
+                if pos < len(shown) and shown[pos] is cmd:
+                    continue
+                if cmd in self._contents:
+                    self._middle.remove(cmd)
+                    shown.remove(cmd)
+                self._middle.insert(pos,cmd)
+                shown.insert(pos,cmd)
+            self._shown = self._order
+            self._contents = self._drawn
+            self._drawn = set()
+        else:
+            self._drawn.clear()
+        self._order = []
+
+    def _replace(self,obj,old,new):
+        """
+        Puts the new drawing cache of an attached object in place of the old one.
+
+        :param obj: the attached object
+        :type obj:  :class:`GObject`
+
+        :param old: the drawing cache being replaced
+        :type old:  ``InstructionGroup``
+
+        :param new: the new drawing cache
+        :type new:  ``InstructionGroup``
+        """
+        if not obj in self._attached:
+            return
+        group = self._attached[obj][0]
+        self._attached[obj] = (group,new)
+        self._fixed.discard(old)
+        self._fixed.add(new)
+        group.insert(group.indexof(old),new)
+        group.remove(old)
+
     def _reset(self,obj=None,value=None):
         """
         Resets the view canvas in response to a resizing event
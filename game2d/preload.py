@@ -0,0 +1,202 @@
+"""
+Asset preloading for 2D game support.
+
+This class loads the images, sounds and fonts of a game before they are first used,
+so that decoding a file never stalls an animation frame.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os.path
+import json
+import time
+
+from .app import GameApp
+from .sound import SoundBank
+
+
+class Preloader(object):
+    """
+    A class to load images, sounds and fonts in the background.
+
+    The files are read and decoded by a pool of threads.  The work that Kivy only
+    allows in the main thread (making textures and sounds, and rendering fonts) is done
+    by the method :meth:`update`, which should be called once an animation frame until
+    it returns True.  The images are put in the texture cache of :class:`GameApp`, and
+    the sounds in the sound bank :attr:`sounds`.  Kivy can only open a sound from a file
+    name, so a worker just reads the whole file, and the sound is then made from the
+    file in memory.  A font is loaded by rendering some text with it once at the given
+    size.
+
+    An atlas (see :meth:`GameApp.load_atlas`) is loaded like an image, and the
+    images it holds are then in the texture cache too.
+
+    The loading starts as soon as the preloader is created::
+
+        loader = Preloader(images=['ship.png'],sounds=['pew1.wav'],fonts=[('Roboto',20)])
+
+    and an animation frame checks on it with::
+
+        if loader.update(0.01):
+            # Everything is loaded
+    """
+
+    # IMMUTABLE PROPERTIES
+    @property
+    def sounds(self):
+        """
+        The sound bank that the sounds are loaded into, with the file names as keys.
+
+        **Immutable**: This value cannot be changed.
+
+        **Invariant**: Must be a :class:`SoundBank`.
+        """
+        return self._sounds
+
+    @property
+    def progress(self):
+        """
+        The fraction of the files that have been loaded.
+
+        **Immutable**: This value cannot be changed.
+
+        **Invariant**: Must be a float in the range 0..1.
+        """
+        if self._total == 0:
+            return 1.0
+        return self._loaded/self._total
+
+    @property
+    def done(self):
+        """
+        Whether or not every file has been loaded.
+
+        **Immutable**: This value cannot be changed.
+
+        **Invariant**: Must be a boolean.
+        """
+        return self._loaded == self._total
+
+    def __init__(self,images=(),sounds=(),fonts=(),workers=4,bank=None,pin=False,atlases=()):
+        """
+        Creates a new preloader and starts decoding the files.
+
+        :param images: The names of files in the **Images** folder
+        :type images:  ``iterable`` of ``str``
+
+        :param sounds: The names of files in the **Sounds** folder
+        :type sounds:  ``iterable`` of ``str``
+
+        :param fonts: The fonts to load, as pairs of font name and font size.  The name
+            is a file in the **Fonts** folder or a font known to Kivy, like 'Roboto'.
+        :type fonts:  ``iterable`` of (``str``, ``int``)
+
+        :param workers: The number of threads decoding the files
+        :type workers:  ``int`` > 0
+
+        :param bank: The sound bank to load the sounds into, or None for the shared bank
+        :type bank:  :class:`SoundBank` or ``None``
+
+        :param pin: Whether the images should never be dropped from the texture cache
+        :type pin:  ``bool``
+
+        :param atlases: The names of atlas files in the **Images** folder
+        :type atlases:  ``iterable`` of ``str``
+        """
+        assert type(workers) == int and workers > 0, '%s is not a valid worker count' % repr(workers)
+        self._sounds = SoundBank.shared() if bank is None else bank
+        self._images = []
+        self._atlases = []
+        self._pending = []
+        self._fonts = list(fonts)
+        self._pin = pin
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        for name in images:
+            assert GameApp.is_image(name), '%s is not an image file' % repr(name)
+            self._images.append((name,self._pool.submit(self._decode_image,name)))
+        for name in atlases:
+            path = os.path.join(GameApp.images,name)
+            assert os.path.exists(path), '%s is not an atlas file' % repr(name)
+            with open(path) as file:
+                page = list(json.load(file))[0]
+            self._atlases.append((name,self._pool.submit(self._decode_image,page)))
+        for name in sounds:
+            assert GameApp.is_sound(name), '%s is not a sound file' % repr(name)
+            self._pending.append((name,self._pool.submit(self._read_sound,name)))
+        self._total  = len(self._images)+len(self._atlases)+len(self._pending)+len(self._fonts)
+        self._loaded = 0
+
+    def update(self,budget=None):
+        """
+        Finishes the loading work that must be done in the main thread.
+
+        This method makes the textures of the images decoded so far, makes the sounds
+        read so far and loads fonts until it runs out of time.  The work is done one file at a time, so it may run
+        a little past ``budget``.
+
+        :param budget: The most time to spend in seconds, or None to wait for every file
+        :type budget:  ``int`` or ``float`` >= 0, or ``None``
+
+        :return: True if every file has been loaded; False otherwise
+        :rtype:  ``bool``
+        """
+        start = time.perf_counter()
+        while not self.done:
+            if not budget is None and time.perf_counter()-start >= budget:
+                return False
+            if self._images and (budget is None or self._images[0][1].done()):
+                name, future = self._images.pop(0)
+                GameApp.load_texture(name,future.result(),self._pin)
+            elif self._atlases and (budget is None or self._atlases[0][1].done()):
+                name, future = self._atlases.pop(0)
+                GameApp.load_atlas(name,future.result(),self._pin)
+            elif self._pending and (budget is None or self._pending[0][1].done()):
+                name, future = self._pending.pop(0)
+                future.result()
+                self._sounds.load(name,name)
+            elif self._fonts:
+                self._load_font(*self._fonts.pop(0))
+            else:
+                return False
+            self._loaded += 1
+        self._pool.shutdown(wait=False)
+        return True
+
+    # HIDDEN METHODS
+    def _decode_image(self,name):
+        """
+        Returns the image in the given file, decoded but without a texture.
+
+        This method is called in a worker thread.
+
+        :param name: The file name
+        :type name:  ``str``
+        """
+        from kivy.core.image import ImageLoader
+        return ImageLoader.load(os.path.join(GameApp.images,name))
+
+    def _read_sound(self,name):
+        """
+        Returns the number of bytes in the given sound file, after reading all of them.
+
+        This method is called in a worker thread.  It makes no Kivy objects; it only
+        brings the file into memory so that making the sound in :meth:`update` does
+        not wait on the disk.
+
+        :param name: The file name
+        :type name:  ``str``
+        """
+        with open(os.path.join(GameApp.sounds,name),'rb') as file:
+            return len(file.read())
+
+    def _load_font(self,name,size):
+        """
+        Loads a font by rendering text with it once.
+
+        :param name: The font name
+        :type name:  ``str``
+
+        :param size: The font size
+        :type size:  ``int`` or ``float`` > 0
+        """
+        from kivy.core.text import Label
+        label = Label(text='0123456789 ABCabc',font_name=name,font_size=size)
+        label.refresh()
@@ -179,3 +179,247 @@ class SoundLibrary(object):
         :rtype:  ``iterable``
         """
         return self._data.keys()
+
+
+# #mark -
+class SoundBank(SoundLibrary):
+    """
+    A sound library that can play the same sound many times at once.
+    
+    A :class:`Sound` cannot overlap with itself, so a sound played again before it
+    finishes cuts itself off.  A sound bank loads a small pool of voices (Sound objects)
+    for each file, and the method :meth:`play` plays the sound on a voice that is not 
+    busy.  If every voice of the sound is busy, the play either steals the voice that
+    was started the longest time ago, or is dropped, depending on :attr:`steal`::
+        
+        bank['pew'] = 'pew1.wav'
+        bank.play('pew')
+    
+    The files are loaded once, so a bank should be kept for as long as its sounds may 
+    be played.  The class method :meth:`shared` returns a bank shared by the whole 
+    program.  The attributes :attr:`played`, :attr:`stolen` and :attr:`dropped` count 
+    the plays since the bank was made.
+    """
+    # Class attribute for the bank shared by the whole program
+    _shared = None
+    
+    # MUTABLE PROPERTIES
+    @property
+    def steal(self):
+        """
+        Whether a play steals a busy voice when every voice of the sound is busy.
+        
+        If this value is False, the play is dropped instead.
+        
+        **Invariant**: Must be a boolean.
+        """
+        return self._steal
+    
+    @steal.setter
+    def steal(self,value):
+        assert type(value) == bool, '%s is not a bool' % repr(value)
+        self._steal = value
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def voices(self):
+        """
+        The number of voices loaded for each sound, unless given to :meth:`load`.
+        
+        **Immutable**: This value cannot be changed after the bank is made.
+        
+        **Invariant**: Must be an int > 0.
+        """
+        return self._voices
+    
+    @property
+    def played(self):
+        """
+        The number of plays that were given a voice.
+        
+        **Immutable**: This value cannot be changed.
+        
+        **Invariant**: Must be an int >= 0.
+        """
+        return self._played
+    
+    @property
+    def stolen(self):
+        """
+        The number of plays that cut off a busy voice.
+        
+        These plays are also counted in :attr:`played`.
+        
+        **Immutable**: This value cannot be changed.
+        
+        **Invariant**: Must be an int >= 0.
+        """
+        return self._stolen
+    
+    @property
+    def dropped(self):
+        """
+        The number of plays that found every voice busy and were not played.
+        
+        **Immutable**: This value cannot be changed.
+        
+        **Invariant**: Must be an int >= 0.
+        """
+        return self._dropped
+    
+    # CLASS METHODS
+    @classmethod
+    def shared(cls):
+        """
+        Returns: The sound bank shared by the whole program
+        
+        The bank is made, with no sounds, the first time this method is called.
+        """
+        if cls._shared is None:
+            cls._shared = SoundBank()
+        return cls._shared
+    
+    def __init__(self,voices=4,steal=True):
+        """
+        Creates a new, empty sound bank.
+        
+        :param voices: The number of voices loaded for each sound
+        :type voices:  ``int`` > 0
+        
+        :param steal: Whether a play steals a busy voice when every voice is busy
+        :type steal:  ``bool``
+        """
+        assert type(voices) == int and voices > 0, '%s is not a valid voice count' % repr(voices)
+        SoundLibrary.__init__(self)
+        self._voices  = voices
+        self.steal    = steal
+        self._started = {}
+        self._clock   = 0
+        self._played  = 0
+        self._stolen  = 0
+        self._dropped = 0
+    
+    def __getitem__(self, key):
+        """
+        Accesses the first voice of the sound for the given name.
+        
+        Playing this voice directly does not use the other voices.  Use :meth:`play`
+        instead.
+        
+        :param key: The key identifying a sound
+        :type key:   ``str``
+        
+        :return: The first voice of the given sound name.
+        :rtype:  :class:`Sound`
+        """
+        return self._data[key][0]
+    
+    def __setitem__(self, key, filename):
+        """
+        Loads the voices of the sound in the file filename and assigns them the given name.
+        
+        :param key: The key identifying a sound
+        :type key:  ``str``
+        
+        :param filename: The name of the file containing the sound source
+        :type filename:  ``str``
+        """
+        self.load(key,filename)
+    
+    def __delitem__(self, key):
+        """
+        Stops and deletes the voices of the sound for the given name.
+        
+        :param key: The key identifying a sound
+        :type key:  ``str``
+        """
+        self.stop(key)
+        del self._data[key]
+        del self._started[key]
+    
+    def load(self, key, filename, voices=None):
+        """
+        Loads the voices of the sound in the file filename and assigns them the given name.
+        
+        If the name is already in the bank, the sound is not loaded again.
+        
+        :param key: The key identifying a sound
+        :type key:  ``str``
+        
+        :param filename: The name of the file containing the sound source
+        :type filename:  ``str``
+        
+        :param voices: The number of voices, or None for :attr:`voices`
+        :type voices:  ``int`` > 0 or ``None``
+        """
+        assert voices is None or (type(voices) == int and voices > 0), \
+            '%s is not a valid voice count' % repr(voices)
+        if key in self._data:
+            return
+        if voices is None:
+            voices = self._voices
+        pool = [Sound(filename) for k in range(voices)]
+        self._started[key] = [0]*voices
+        self._data[key] = pool
+    
+    def play(self, key, volume=None):
+        """
+        Plays the sound for the given name on a voice that is not busy.
+        
+        If every voice is busy, the voice started the longest time ago is stopped and
+        played again if :attr:`steal` is True.  Otherwise the play is dropped.
+        
+        :param key: The key identifying a sound
+        :type key:  ``str``
+        
+        :param volume: The volume of this play, or None to keep the voice volume
+        :type volume:  ``float`` in 0..1 or ``None``
+        
+        :return: True if the sound was played; False if it was dropped
+        :rtype:  ``bool``
+        """
+        pool = self._data[key]
+        started = self._started[key]
+        voice = None
+        for k in range(len(pool)):
+            if not pool[k].playing:
+                voice = k
+                break
+        if voice is None:
+            if not self._steal:
+                self._dropped += 1
+                return False
+            voice = started.index(min(started))
+            pool[voice].stop()
+            self._stolen += 1
+        if not volume is None:
+            pool[voice].volume = volume
+        self._clock += 1
+        started[voice] = self._clock
+        pool[voice].play()
+        self._played += 1
+        return True
+    
+    def stop(self, key=None):
+        """
+        Stops every voice of the sound for the given name.
+        
+        :param key: The key identifying a sound, or None to stop every sound
+        :type key:  ``str`` or ``None``
+        """
+        keys = self._data.keys() if key is None else [key]
+        for k in keys:
+            for voice in self._data[k]:
+                voice.stop()
+    
+    def busy(self, key=None):
+        """
+        Returns: The number of voices of the given sound that are playing
+        
+        :param key: The key identifying a sound, or None to count every sound
+        :type key:  ``str`` or ``None``
+        
+        :rtype:  ``int`` >= 0
+        """
+        keys = self._data.keys() if key is None else [key]
+        return sum(1 for k in keys for voice in self._data[k] if voice.playing)
@@ -0,0 +1,500 @@
+"""
+Software audio mixer module for Alien Invaders
+
+This module plays the sound effects of the game without going through the audio
+stack of the platform for every sound.  The WAV files in Sounds/ are decoded once
+into NumPy arrays of samples at the rate of the mixer, and a Mixer adds up the
+voices that are playing into one stream of blocks of blockSize frames.  Each voice
+has its own volume.  When every voice is busy, a new sound takes the voice that was
+started the longest time ago, like a SoundBank (see game2d).
+
+The blocks are 16-bit stereo samples and are handed to a sink, an object with the
+methods write(block) and close().  A NullSink throws them away and a FileSink
+writes them to a WAV file, so runs with no window or sound card mix the sounds the
+same way and the time spent per block can be measured.  The WAV files are read by
+decodeWAV, which only uses struct and NumPy (the module wave of the standard library
+is hidden by wave.py in this folder).
+
+The module can also be run as a script:
+
+    python mixer.py sounds.wav
+
+plays a wave with the tracker bot of batch.py, mixes its sounds into sounds.wav and
+prints the time spent per block.  With no file name, the sounds go to a NullSink.
+"""
+from consts import *
+from sim import *
+import numpy as np
+import struct
+import time
+import os
+
+
+# The folder with the sounds of the game
+SOUND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Sounds')
+# The number of frames (samples per channel) per second of the mixed stream
+MIX_RATE = 44100
+# The number of frames in a block
+BLOCK_SIZE = 512
+# The most sounds that can play at once
+MIX_VOICES = 16
+
+# The format tags of a WAV file for integer samples, float samples and the
+# extensible format, which has the real tag at the start of its subformat
+_FORMAT_PCM = 1
+_FORMAT_FLOAT = 3
+_FORMAT_EXTENSIBLE = 0xFFFE
+_WAV_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')
+
+
+def decodeWAV(data):
+    """
+    Returns (rate, samples) for the sound in a WAV file
+
+    The samples are a float32 array of frames x channels, with values from -1 to 1.
+    Integer samples of 8, 16, 24 or 32 bits and float samples of 32 bits are
+    supported; anything else raises a ValueError.
+
+    Parameter data: the contents of a WAV file
+    Precondition: data is a bytes object
+    """
+    if data[:4] != b'RIFF' or data[8:12] != b'WAVE':
+        raise ValueError('data is not a WAV file')
+    pos = 12
+    header = None
+    body = None
+    while pos + 8 <= len(data):
+        kind, size = struct.unpack_from('<4sI', data, pos)
+        if kind == b'fmt ':
+            header = struct.unpack_from('<HHIIHH', data, pos+8)
+            if header[0] == _FORMAT_EXTENSIBLE:
+                header = struct.unpack_from('<H', data, pos+32) + header[1:]
+        elif kind == b'data':
+            body = data[pos+8:pos+8+size]
+        pos += 8 + size + (size & 1)
+    if header is None or body is None:
+        raise ValueError('data has no WAV header or no samples')
+    form, channels, rate, rest, align, bits = header
+    width = bits//8
+    count = len(body)//(width*channels)
+    body = body[:count*width*channels]
+    if form == _FORMAT_FLOAT and bits == 32:
+        samples = np.frombuffer(body, '<f4').astype(np.float32)
+    elif form != _FORMAT_PCM:
+        raise ValueError('only PCM and float WAV files are supported')
+    elif bits == 8:
+        samples = (np.frombuffer(body, np.uint8).astype(np.float32) - 128)/128
+    elif bits == 16:
+        samples = np.frombuffer(body, '<i2').astype(np.float32)/32768
+    elif bits == 24:
+        raw = np.frombuffer(body, np.uint8).reshape(-1, 3).astype(np.int32)
+        value = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        value -= (value & 0x800000) << 1
+        samples = value.astype(np.float32)/8388608
+    elif bits == 32:
+        samples = (np.frombuffer(body, '<i4')/2147483648.0).astype(np.float32)
+    else:
+        raise ValueError('only 8, 16, 24 and 32 bit WAV files are supported')
+    return rate, samples.reshape(count, channels)
+
+
+def loadSound(name, rate=MIX_RATE):
+    """
+    Returns the samples of the sound name in Sounds/, ready to mix
+
+    The samples are a float32 array of frames x 2.  A mono sound is copied to both
+    channels, and a sound recorded at another rate is resampled to rate by linear
+    interpolation.
+
+    Parameter name: the file name of the sound
+    Precondition: name is a string naming a WAV file in Sounds/
+
+    Parameter rate: the number of frames per second to resample to
+    Precondition: rate is an int > 0
+    """
+    with open(os.path.join(SOUND_DIR, name), 'rb') as file:
+        source, samples = decodeWAV(file.read())
+    if samples.shape[1] == 1:
+        samples = np.repeat(samples, 2, axis=1)
+    elif samples.shape[1] > 2:
+        samples = samples[:, :2]
+    if source != rate and len(samples) > 0:
+        count = max(1, int(round(len(samples)*rate/source)))
+        where = np.arange(count)*(source/rate)
+        known = np.arange(len(samples))
+        samples = np.stack([np.interp(where, known, samples[:, k]) for k in range(2)],
+            axis=1)
+    return np.ascontiguousarray(samples, dtype=np.float32)
+
+
+class NullSink(object):
+    """
+    A class to throw away mixed blocks, counting them.
+
+    INSTANCE ATTRIBUTES:
+        blocks: the number of blocks written [int >= 0]
+        frames: the number of frames written [int >= 0]
+    """
+
+    def __init__(self):
+        """
+        Initializes a sink with nothing written.
+        """
+        self.blocks = 0
+        self.frames = 0
+
+    def write(self, block):
+        """
+        Counts the block as written
+
+        Parameter block: the mixed samples
+        Precondition: block is an int16 array of frames x 2
+        """
+        self.blocks += 1
+        self.frames += len(block)
+
+    def close(self):
+        """
+        Does nothing, since nothing is open
+        """
+        pass
+
+
+class FileSink(NullSink):
+    """
+    A class to write mixed blocks to a 16-bit stereo WAV file.
+
+    The sizes in the header of the file are filled in by close.
+
+    INSTANCE ATTRIBUTES (in addition to those of NullSink):
+        rate:  the number of frames per second [int > 0]
+        _file: the file being written, or None once it is closed [file]
+    """
+
+    def __init__(self, path, rate=MIX_RATE):
+        """
+        Initializes a sink that writes to a new WAV file at path.
+
+        Parameter path: the file to write
+        Precondition: path is a string naming a file that can be written
+
+        Parameter rate: the number of frames per second
+        Precondition: rate is an int > 0
+        """
+        NullSink.__init__(self)
+        self.rate = rate
+        self._file = open(path, 'wb')
+        self._file.write(self._header())
+
+    def write(self, block):
+        """
+        Writes the block to the file
+
+        Parameter block: the mixed samples
+        Precondition: block is an int16 array of frames x 2
+        """
+        NullSink.write(self, block)
+        self._file.write(block.astype('<i2', copy=False).tobytes())
+
+    def close(self):
+        """
+        Fills in the header and closes the file, if it is not closed yet
+        """
+        if not self._file is None:
+            self._file.seek(0)
+            self._file.write(self._header())
+            self._file.close()
+            self._file = None
+
+    def _header(self):
+        """
+        Returns the header of a WAV file with the frames written so far
+        """
+        size = self.frames*4
+        return _WAV_HEADER.pack(b'RIFF', 36 + size, b'WAVE', b'fmt ', 16, _FORMAT_PCM,
+            2, self.rate, self.rate*4, 4, 16, b'data', size)
+
+
+class Mixer(object):
+    """
+    A class to add up the sounds that are playing into a stream of blocks.
+
+    Sounds are loaded once with load (or the first time they are played) and are
+    played on voices.  Each voice has a sound, the next frame of it to mix and a
+    volume.  The method mix adds every voice into one block, sends it to the sink
+    and frees the voices that have finished.  The arrays of a block are made once,
+    so mixing a block allocates nothing but the slices of the sounds.
+
+    INSTANCE ATTRIBUTES:
+        rate:      the number of frames per second [int > 0]
+        blockSize: the number of frames in a block [int > 0]
+        sink:      where the blocks are sent [NullSink or FileSink]
+        played:    the number of sounds given a voice [int >= 0]
+        stolen:    the number of sounds that took a busy voice [int >= 0]
+        blocks:    the number of blocks mixed [int >= 0]
+        mixTime:   the seconds spent mixing blocks, sink included [float >= 0]
+        _sounds:   the samples of each sound loaded [dict of str to float32 array]
+        _voice:    the sound of each voice [list of MIX_VOICES str, or None if free]
+        _pos:      the next frame to mix of each voice [list of int >= 0]
+        _volume:   the volume of each voice [list of float, 0 <= float <= 1]
+        _started:  when each voice was started, in sounds played [list of int >= 0]
+        _ids:      the id returned by play for each voice [list of int >= 0]
+        _acc:      the frames of time passed that are not mixed yet [float >= 0]
+        _mix:      the block being added up [float32 array, blockSize x 2]
+        _out:      the block sent to the sink [int16 array, blockSize x 2]
+    """
+
+    def getBlockCost(self):
+        """
+        Returns the average seconds spent mixing one block, or 0 if none were mixed
+        """
+        return self.mixTime/self.blocks if self.blocks > 0 else 0.0
+
+    def getBusy(self):
+        """
+        Returns the number of voices playing
+        """
+        return sum(1 for name in self._voice if not name is None)
+
+    def __init__(self, sink=None, rate=MIX_RATE, blockSize=BLOCK_SIZE, voices=MIX_VOICES):
+        """
+        Initializes a mixer with no sounds loaded and every voice free.
+
+        Parameter sink: where the blocks are sent, or None for a NullSink
+        Precondition: sink is a NullSink, a FileSink or an object with the same
+        methods write and close, or None
+
+        Parameter rate: the number of frames per second
+        Precondition: rate is an int > 0
+
+        Parameter blockSize: the number of frames in a block
+        Precondition: blockSize is an int > 0
+
+        Parameter voices: the most sounds that can play at once
+        Precondition: voices is an int > 0
+        """
+        assert type(rate) == int and rate > 0
+        assert type(blockSize) == int and blockSize > 0
+        assert type(voices) == int and voices > 0
+        self.rate = rate
+        self.blockSize = blockSize
+        self.sink = NullSink() if sink is None else sink
+        self.played = 0
+        self.stolen = 0
+        self.blocks = 0
+        self.mixTime = 0.0
+        self._sounds = {}
+        self._voice = [None]*voices
+        self._pos = [0]*voices
+        self._volume = [1.0]*voices
+        self._started = [0]*voices
+        self._ids = [0]*voices
+        self._acc = 0.0
+        self._mix = np.zeros((blockSize, 2), dtype=np.float32)
+        self._out = np.zeros((blockSize, 2), dtype=np.int16)
+
+    def load(self, name):
+        """
+        Decodes the sound name in Sounds/, if it is not loaded yet
+
+        Parameter name: the file name of the sound
+        Precondition: name is a string naming a WAV file in Sounds/
+        """
+        if not name in self._sounds:
+            self._sounds[name] = loadSound(name, self.rate)
+
+    def play(self, name, volume=1.0):
+        """
+        Returns the id of a voice that starts playing the sound name
+
+        The sound starts at the next block mixed.  If every voice is busy, the
+        voice started the longest time ago is stopped and used.
+
+        Parameter name: the file name of the sound
+        Precondition: name is a string naming a WAV file in Sounds/
+
+        Parameter volume: the volume of the voice
+        Precondition: volume is an int or float, 0 <= volume <= 1
+        """
+        assert (type(volume) == int or type(volume) == float) and 0 <= volume <= 1
+        self.load(name)
+        if None in self._voice:
+            k = self._voice.index(None)
+        else:
+            k = self._started.index(min(self._started))
+            self.stolen += 1
+        self.played += 1
+        self._voice[k] = name
+        self._pos[k] = 0
+        self._volume[k] = float(volume)
+        self._started[k] = self.played
+        self._ids[k] = self.played
+        return self.played
+
+    def setVolume(self, voice, volume):
+        """
+        Changes the volume of a voice, if it is still playing
+
+        Parameter voice: the id returned by play
+        Precondition: voice is an int > 0
+
+        Parameter volume: the new volume
+        Precondition: volume is an int or float, 0 <= volume <= 1
+        """
+        assert (type(volume) == int or type(volume) == float) and 0 <= volume <= 1
+        k = self._find(voice)
+        if k >= 0:
+            self._volume[k] = float(volume)
+
+    def stop(self, voice=None):
+        """
+        Stops a voice, or every voice
+
+        Parameter voice: the id returned by play, or None to stop every voice
+        Precondition: voice is an int > 0, or None
+        """
+        if voice is None:
+            self._voice = [None]*len(self._voice)
+            return
+        k = self._find(voice)
+        if k >= 0:
+            self._voice[k] = None
+
+    def mix(self):
+        """
+        Adds up one block of every voice and sends it to the sink
+
+        The samples are clipped to the range of 16-bit samples.
+        """
+        start = time.perf_counter()
+        out = self._mix
+        out.fill(0)
+        size = self.blockSize
+        for k in range(len(self._voice)):
+            name = self._voice[k]
+            if name is None:
+                continue
+            samples = self._sounds[name]
+            pos = self._pos[k]
+            n = min(size, len(samples) - pos)
+            if n > 0:
+                part = out[:n]
+                part += samples[pos:pos+n]*self._volume[k]
+            self._pos[k] = pos + n
+            if self._pos[k] >= len(samples):
+                self._voice[k] = None
+        np.clip(out, -1.0, 1.0, out=out)
+        out *= 32767
+        self._out[:] = out
+        self.sink.write(self._out)
+        self.blocks += 1
+        self.mixTime += time.perf_counter() - start
+
+    def advance(self, dt):
+        """
+        Mixes the blocks for dt more seconds of sound
+
+        The time that does not fill a whole block is kept for the next call, like
+        the time between simulation steps in Wave.
+
+        Parameter dt: the seconds of sound to mix
+        Precondition: dt is an int or float >= 0
+        """
+        self._acc += dt*self.rate
+        while self._acc >= self.blockSize:
+            self._acc -= self.blockSize
+            self.mix()
+
+    def close(self):
+        """
+        Stops every voice and closes the sink
+        """
+        self.stop()
+        self.sink.close()
+
+    def _find(self, voice):
+        """
+        Returns the voice with the given id, or -1 if it is not playing
+
+        Parameter voice: the id returned by play
+        Precondition: voice is an int > 0
+        """
+        for k in range(len(self._voice)):
+            if self._ids[k] == voice and not self._voice[k] is None:
+                return k
+        return -1
+
+
+def playEvents(mixer, events, volume=1.0):
+    """
+    Plays the sounds for the EVENT flags raised by a step, as Wave does
+
+    Parameter mixer: the mixer to play the sounds on
+    Precondition: mixer is a Mixer
+
+    Parameter events: the events raised by the simulation
+    Precondition: events is an int combining EVENT flags
+
+    Parameter volume: the volume of the sounds
+    Precondition: volume is an int or float, 0 <= volume <= 1
+    """
+    for flag, name in EVENT_SOUNDS:
+        if events & flag:
+            mixer.play(name, volume)
+
+
+def benchmark(sink=None, ticks=60*TICK_RATE, seed=0):
+    """
+    Returns the cost of mixing the sounds of a wave played by the tracker bot
+
+    The wave is played for the given number of steps (or until it is finished),
+    and the sounds of its events are mixed as the steps go by.  The result is a
+    dictionary with the keys
+
+        ticks, blocks, played, stolen, blockCost, realtime
+
+    where blockCost is the seconds spent per block and realtime is how many times
+    faster than real time the blocks are mixed.
+
+    Parameter sink: where the blocks are sent, or None for a NullSink
+    Precondition: sink is a NullSink, a FileSink, or None
+
+    Parameter ticks: the most steps to play
+    Precondition: ticks is an int > 0
+
+    Parameter seed: the seed of the wave
+    Precondition: seed is an int >= 0
+    """
+    import batch
+    import random
+    mixer = Mixer(sink)
+    for flag, name in EVENT_SOUNDS:
+        mixer.load(name)
+    sim = WaveSim(seed)
+    rng = random.Random(seed)
+    tick = 1.0/TICK_RATE
+    flags = 0
+    n = 0
+    while n < ticks and not sim.getFinish():
+        if not sim.hasShip():
+            sim.createShip()
+        flags = batch.trackerBot(sim, rng, flags)
+        sim.step(flags, tick)
+        playEvents(mixer, sim.events)
+        mixer.advance(tick)
+        n += 1
+    mixer.close()
+    cost = mixer.getBlockCost()
+    return {'ticks': n, 'blocks': mixer.blocks, 'played': mixer.played,
+        'stolen': mixer.stolen, 'blockCost': cost,
+        'realtime': mixer.blockSize/mixer.rate/cost if cost > 0 else float('inf')}
+
+
+if __name__ == '__main__':
+    import sys
+    sink = FileSink(sys.argv[1]) if len(sys.argv) > 1 else None
+    result = benchmark(sink)
+    print('%d steps, %d blocks, %d sounds (%d took a busy voice)' % (result['ticks'],
+        result['blocks'], result['played'], result['stolen']))
+    print('%.1f us per block, %.0fx real time' % (result['blockCost']*1e6,
+        result['realtime']))
@@ -10,9 +10,10 @@ could just be an instance of GImage that you move across the screen. You only ne
 class when you add extra features to an object. So technically Bolt, which has a velocity,
 is really the only model that needs to have its own class.
 
-With that said, we have included the subclasses for Ship and Aliens.  That is because
-there are a lot of constants in consts.py for initializing the objects, and you might
-want to add a custom initializer.  With that said, feel free to keep the pass underneath
+With that said, we have included the subclass for Ship.  That is because there are a
+lot of constants in consts.py for initializing the objects, and you might want to add a
+custom initializer.  The aliens are drawn all together by a GBatch in Wave, so they
+have no class here.  With that said, feel free to keep the pass underneath
 the class definitions if you do not want to do that.
 
 You are free to add even more models to this module.  You may wish to do this when you
@@ -98,7 +99,7 @@ class Ship(GImage):
         assert (type(x) == float or type(x) == int) and x >= 0
         assert (type(y) == float or type(y) == int) and y >= 0
         super().__init__(x=x,y=y,width = SHIP_WIDTH, height = SHIP_HEIGHT, \
-            source = 'ship.png')
+            source = SHIP_IMAGE)
 
     def collides(self, bolt):
         """
@@ -129,136 +130,6 @@ class Ship(GImage):
         return False
 
 
-class Alien(GImage):
-    """
-    A class to represent a single alien.
-
-    At the very least, you want a __init__ method to initialize the alien dimensions.
-    These dimensions are all specified in consts.py.
-
-    You also MIGHT want to add code to detect a collision with a bolt. We do not require
-    this.  You could put this method in Wave if you wanted to.  But the advantage of
-    putting it here is that Ships and Aliens collide with different bolts.  Ships
-    collide with Alien bolts, not Ship bolts.  And Aliens collide with Ship bolts, not
-    Alien bolts. An easy way to keep this straight is for this class to have its own
-    collision method.
-
-    However, there is no need for any more attributes other than those inherited by
-    GImage. You would only add attributes if you needed them for extra gameplay
-    features (like giving each alien a score value). If you add attributes, list
-    them below.
-
-    LIST MORE ATTRIBUTES (AND THEIR INVARIANTS) HERE IF NECESSARY
-    """
-
-    def setSource(self, i):
-        """
-        Sets the source of the imag eof the alien to i
-
-        This is a helper function that sets the source of the image to i for an
-        alien
-
-        Parameter i: The image of the alien
-        Preconditon: i is a str of a valid image
-        """
-        assert type(i) == str and (i in ALIEN_IMAGES or i == '')
-        self.source = i
-
-    def getX(self):
-        """
-        Return: the x coordinate of the center of an alien
-
-        A getter method that returns self.x, or the x coordinate of the center
-        of the alien
-        """
-        return self.x
-
-    def setX(self, x):
-        """
-        Sets the x coordinate of the center of an alien.
-
-        This is a helper function that changes the x coordinate of the center of
-        an alien to x
-
-        Parameter x: the x coordinate of the center of an alien
-        Preconditon: x is an int or float and x >= 0
-        """
-        assert (type(x) == int or type(x) == float) and x >= 0
-        self.x = x
-
-    def getY(self):
-        """
-        Return: the y coordinate of the center of an alien.
-
-        A gettor method that returns self.y, or the y coordinate of the center
-        of the alien
-        """
-        return self.y
-
-    def setY(self,y):
-        """
-        Sets the y coordinate of the center of an alien.
-
-        This is a helper function that changes the y coordinate of the center of
-        the alien
-
-        Parameter y: the y coordinate of the center of an alien
-        Preconditon: y is an int or float and y >= 0
-        """
-        assert (type(y) == int  or type(y) == float) and y >= 0
-        self.y = y
-
-    def __init__(self,x,y,i):
-        """
-        Initializes the aliens.
-
-        With the coordinates and image supplied, it creates and draws the aliens
-        the same way you create an draw a GImage Object.
-
-        Parameter x: the horizontal coordinate of the center of the alien image.
-        Precondition: x is an int and x >= 0
-
-        Parameter y: the vertical coordinate of the center of the alien image.
-        Precondition: y is an int and y>=0
-
-        Parameter i: The image of the alien.
-        Precondtion: i is a string and is in ALIEN_IMAGES
-        """
-        assert type(x) == int and x >= 0
-        assert type(y) == int and x >= 0
-        assert type(i) == str and (i in ALIEN_IMAGES or i =='')
-        super().__init__(x=x,y=y,width = ALIEN_WIDTH, height = ALIEN_HEIGHT,\
-            source = i)
-
-    def collides(self, bolt):
-        """
-        Returns: True if the bolt was fired by the ship and collides with this alien
-
-        This method checks the coordinates of the four corners of the bolt to see
-        if the Alien contains thoses coordinates. If it does, then the bolt collides
-        with the Alien, and the method returns True. If not, it returns False
-
-        Parameter bolt: The laser bolt to check
-        Precondition: bolt is of class Bolt
-        """
-        assert isinstance(bolt, Bolt) == True
-        if bolt.isPlayerBolt() == False:
-            return False
-        if self.contains([bolt.getX() - (BOLT_WIDTH/2), bolt.getY() + \
-            (BOLT_HEIGHT/2)]):
-            return True
-        elif self.contains([bolt.getX() - (BOLT_WIDTH/2), bolt.getY() - \
-            (BOLT_HEIGHT/2)]):
-            return True
-        elif self.contains([bolt.getX() + (BOLT_WIDTH/2), bolt.getY() - \
-            (BOLT_HEIGHT/2)]):
-            return True
-        elif self.contains([bolt.getX() + (BOLT_WIDTH/2), bolt.getY() + \
-            (BOLT_HEIGHT/2)]):
-            return True
-        return False
-
-
 class Bolt(GRectangle):
     """
     A class representing a laser bolt.
@@ -362,3 +233,132 @@ class Bolt(GRectangle):
             linecolor = 'black', fillcolor = 'black')
         self._velocity = v
         self.playerBolt = t
+
+    def reset(self, x, y, v, t):
+        """
+        Moves the bolt and gives it a new velocity and owner.
+
+        This method lets a BoltPool reuse a bolt instead of creating a new one.
+        Only the position changes on screen, so the drawing cache is kept.
+
+        Parameter x: the horizontal coordinate of the center of the bolt.
+        Precondition: x is an int or float
+
+        Parameter y: the vertical coordinate of the center of the bolt.
+        Precondition: y is an int or float
+
+        Parameter v: The velocity of the bolt.
+        Precondtion: v is an int or float
+
+        Parameter t: Whether the bolt is from the player of the alien.
+        Precondition: t is a bool
+        """
+        assert (type(x) == int or type(x) == float)
+        assert (type(v) == int) or (type(v) == float)
+        assert type(t) == bool
+        self.x = x
+        self.setY(y)
+        self._velocity = v
+        self.playerBolt = t
+
+
+class BoltPool(object):
+    """
+    A class to reuse Bolt objects instead of creating a new one for every shot.
+
+    Creating a Bolt builds all of its GRectangle properties and drawing cache, and
+    a bolt only lives until it leaves the screen. Instead, a bolt that is no longer
+    needed is given back to the pool with release, and acquire hands it out again
+    after calling its reset method. Once the pool has as many bolts as were ever on
+    screen at once (the high-water mark), firing creates no new objects.
+
+    INSTANCE ATTRIBUTES:
+        _free:      the bolts that are ready to be reused [list of Bolt]
+        _created:   the number of bolts this pool has created [int >= 0]
+        _reused:    the number of times a bolt was reused [int >= 0]
+        _inUse:     the number of bolts acquired and not yet released [int >= 0]
+        _highWater: the largest value _inUse has ever had [int >= 0]
+    """
+
+    def getCreated(self):
+        """
+        Returns the number of bolts this pool has created
+        """
+        return self._created
+
+    def getReused(self):
+        """
+        Returns the number of times a released bolt was handed out again
+        """
+        return self._reused
+
+    def getInUse(self):
+        """
+        Returns the number of bolts handed out and not yet released
+        """
+        return self._inUse
+
+    def getHighWater(self):
+        """
+        Returns the largest number of bolts that have been in use at once
+        """
+        return self._highWater
+
+    def getFree(self):
+        """
+        Returns the number of bolts waiting in the pool to be reused
+        """
+        return len(self._free)
+
+    def __init__(self):
+        """
+        Initializes an empty pool.
+        """
+        self._free = []
+        self._created = 0
+        self._reused = 0
+        self._inUse = 0
+        self._highWater = 0
+
+    def acquire(self, x, y, v, t):
+        """
+        Returns a bolt at (x, y) with velocity v, fired by the player if t is True
+
+        A released bolt is reused if there is one. Otherwise a new Bolt is created.
+
+        Parameter x: the horizontal coordinate of the center of the bolt.
+        Precondition: x is an int or float
+
+        Parameter y: the vertical coordinate of the center of the bolt.
+        Precondition: y is an int or float
+
+        Parameter v: The velocity of the bolt.
+        Precondtion: v is an int or float
+
+        Parameter t: Whether the bolt is from the player of the alien.
+        Precondition: t is a bool
+        """
+        if len(self._free) > 0:
+            bolt = self._free.pop()
+            bolt.reset(x, y, v, t)
+            self._reused += 1
+        else:
+            # An alien bolt may be just below the screen, which __init__ does not allow
+            bolt = Bolt(x, max(y, 0), v, t)
+            bolt.setY(y)
+            self._created += 1
+        self._inUse += 1
+        if self._inUse > self._highWater:
+            self._highWater = self._inUse
+        return bolt
+
+    def release(self, bolt):
+        """
+        Gives a bolt back to the pool so that it can be reused
+
+        Parameter bolt: The bolt that is no longer needed
+        Precondition: bolt is a Bolt that was returned by acquire
+        """
+        assert isinstance(bolt, Bolt)
+        self._free.append(bolt)
+        self._inUse -= 1
@@ -0,0 +1,470 @@
+"""
+Software rendering module for Alien Invaders
+
+This module draws a wave into a NumPy array with no window, no GPU and no Kivy, so
+that agents can be trained on pixels and screenshots can be taken on a machine with
+no display.  The class Rasterizer draws the state of a WaveSim (see sim.py) the way
+Wave does on screen: the aliens and the ship from the images in Images/, the bolts
+as black rectangles and the defense line as a black line on a white background.
+
+The images are read by decodePNG, a small PNG reader that only uses zlib and NumPy.
+It reads the images that come with the game, which are all 8-bit RGBA and not
+interlaced, and raises a ValueError for anything else.  Frames can be written back
+out with encodePNG.  The module can also be run as a script:
+
+    python raster.py frame.png --seed=42
+
+draws the first frame of the wave with seed 42 to frame.png.  The seed is given as a
+flag, since consts.py reads the numbers in the first three arguments as the size
+and speed of the wave.
+"""
+from consts import *
+from sim import *
+import numpy as np
+import struct
+import zlib
+import math
+import os
+
+
+# The folder with the images of the game
+IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Images')
+# The width of the defense line in pixels
+LINE_WIDTH = 2
+
+_PNG_MAGIC = b'\x89PNG\r\n\x1a\n'
+
+
+def decodePNG(data):
+    """
+    Returns the pixels of a PNG image as a uint8 array of height x width x 4
+
+    Only 8-bit RGBA images that are not interlaced are supported.
+
+    Parameter data: the contents of a PNG file
+    Precondition: data is a bytes object
+    """
+    if data[:8] != _PNG_MAGIC:
+        raise ValueError('data is not a PNG image')
+    pos = 8
+    header = None
+    parts = []
+    while pos < len(data):
+        size, kind = struct.unpack_from('>I4s', data, pos)
+        body = data[pos+8:pos+8+size]
+        if kind == b'IHDR':
+            header = struct.unpack('>IIBBBBB', body)
+        elif kind == b'IDAT':
+            parts.append(body)
+        elif kind == b'IEND':
+            break
+        pos += size + 12
+    if header is None:
+        raise ValueError('data has no PNG header')
+    width, height, depth, color, compress, method, interlace = header
+    if depth != 8 or color != 6 or interlace != 0:
+        raise ValueError('only 8-bit RGBA PNG images that are not interlaced are supported')
+    stride = width*4
+    raw = np.frombuffer(zlib.decompress(b''.join(parts)), dtype=np.uint8)
+    if len(raw) != height*(stride+1):
+        raise ValueError('the image data has the wrong length')
+    raw = raw.reshape(height, stride+1)
+    out = np.zeros((height, stride), dtype=np.uint8)
+    prior = np.zeros(stride, dtype=np.uint8)
+    for y in range(height):
+        _unfilter(raw[y, 0], raw[y, 1:], prior, out[y])
+        prior = out[y]
+    return out.reshape(height, width, 4)
+
+
+def encodePNG(pixels):
+    """
+    Returns a PNG file with the given pixels
+
+    Parameter pixels: the image
+    Precondition: pixels is a uint8 array of height x width x 3 (RGB) or x 4 (RGBA)
+    """
+    height, width, depth = pixels.shape
+    assert pixels.dtype == np.uint8 and depth in (3, 4)
+    rows = np.zeros((height, width*depth + 1), dtype=np.uint8)
+    rows[:, 1:] = pixels.reshape(height, width*depth)
+    header = struct.pack('>IIBBBBB', width, height, 8, 2 if depth == 3 else 6, 0, 0, 0)
+    return (_PNG_MAGIC + _chunk(b'IHDR', header) +
+        _chunk(b'IDAT', zlib.compress(rows.tobytes())) + _chunk(b'IEND', b''))
+
+
+def loadImage(name):
+    """
+    Returns the pixels of the image name in Images/ (see decodePNG)
+
+    Parameter name: the file name of the image
+    Precondition: name is a string naming a PNG file in Images/
+    """
+    with open(os.path.join(IMAGE_DIR, name), 'rb') as file:
+        return decodePNG(file.read())
+
+
+class Sprite(object):
+    """
+    A class to represent an image scaled to the size it is drawn at.
+
+    The image is stored as lists of pixels ready to draw.  The pixels that are fully
+    transparent are left out, since drawing them changes nothing.  The pixels that
+    are fully opaque are just copied, so only their color is kept.  The others are
+    stored ready to blend: the color times alpha, and 255 - alpha, both as uint16
+    so that a blend needs no conversion from float.  The images of the game are
+    almost all opaque or transparent pixels, so a sprite is mostly copied.
+
+    INSTANCE ATTRIBUTES:
+        width:      the width in pixels [int > 0]
+        height:     the height in pixels [int > 0]
+        solid:      the rows and columns of the opaque pixels [tuple of 2 int arrays]
+        solidColor: the color of each opaque pixel [uint8 array, n x 3]
+        blend:      the rows and columns of the other visible pixels [tuple of 2 int
+                    arrays]
+        color:      the color times alpha of each pixel in blend [uint16 array, m x 3]
+        clear:      255 minus alpha of each pixel in blend [uint16 array, m x 1]
+    """
+
+    def __init__(self, pixels, width, height):
+        """
+        Initializes a sprite of the image pixels scaled to width x height.
+
+        The image is scaled by picking the nearest pixel.
+
+        Parameter pixels: the image
+        Precondition: pixels is a uint8 array of rows x cols x 4
+
+        Parameter width: the width to scale to
+        Precondition: width is an int > 0
+
+        Parameter height: the height to scale to
+        Precondition: height is an int > 0
+        """
+        rows = (np.arange(height)*pixels.shape[0])//height
+        cols = (np.arange(width)*pixels.shape[1])//width
+        scaled = pixels[rows][:, cols]
+        alpha = scaled[:, :, 3]
+        solid = alpha == 255
+        blend = (alpha > 0) & ~solid
+        self.width = width
+        self.height = height
+        self.solid = np.nonzero(solid)
+        self.solidColor = scaled[:, :, :3][solid]
+        self.blend = np.nonzero(blend)
+        part = scaled[blend].astype(np.uint16)
+        self.color = part[:, :3]*part[:, 3:]
+        self.clear = 255 - part[:, 3:]
+
+
+class Rasterizer(object):
+    """
+    A class to draw waves into reused uint8 RGB arrays.
+
+    The frame is the game window divided by scale in each direction.  Everything
+    that does not change during a wave is made once and kept: the sprites scaled to
+    size, and a background with the defense line already drawn on it.  Drawing a
+    frame copies the background into the frame and draws the aliens, the ships and
+    the bolts over it.
+
+    The objects are not drawn one at a time.  The positions of all the aliens of
+    every frame in a batch are found as arrays, and the pixels of each alien image
+    are put into the frames with one indexed write, and so are the ships and the
+    bolts.  This only works if no two of the sprites in one write overlap.  So if the
+    frame is so small that two aliens next to each other can share a pixel, the
+    aliens are drawn one grid slot at a time, in the order of the rows and columns.
+
+    The arrays returned by render and renderBatch are reused, so they are
+    overwritten by the next call.  Copy them to keep them.
+
+    INSTANCE ATTRIBUTES:
+        scale:       the number of game pixels for each pixel of the frame [int > 0]
+        width:       the width of a frame [int > 0]
+        height:      the height of a frame [int > 0]
+        _background: the frame with only the background and defense line
+                     [uint8 array, height x width x 3]
+        _frame:      the array returned by render [uint8 array, height x width x 3]
+        _batch:      the array returned by renderBatch, or None if it is not made yet
+                     [uint8 array, n x height x width x 3]
+        _sprites:    the sprites by image file name [dict of str to Sprite]
+        _bolt:       a black sprite the size of a bolt [Sprite]
+        _apart:      whether the sprites of two aliens can never overlap [bool]
+    """
+
+    def __init__(self, scale=1):
+        """
+        Initializes a rasterizer that draws frames 1/scale the size of the window.
+
+        Parameter scale: the number of game pixels for each pixel of the frame
+        Precondition: scale is an int > 0
+        """
+        assert type(scale) == int and scale > 0
+        self.scale = scale
+        self.width = GAME_WIDTH//scale
+        self.height = GAME_HEIGHT//scale
+        self._background = np.full((self.height, self.width, 3), 255, dtype=np.uint8)
+        top = int(self._row(DEFENSE_LINE + LINE_WIDTH/2))
+        self._background[top:top + max(1, LINE_WIDTH//scale)] = 0
+        self._frame = self._background.copy()
+        self._batch = None
+        self._sprites = {}
+        alien = self._size(ALIEN_WIDTH), self._size(ALIEN_HEIGHT)
+        for name in ALIEN_IMAGES:
+            self._sprites[name] = Sprite(loadImage(name), *alien)
+        self._sprites[SHIP_IMAGE] = Sprite(loadImage(SHIP_IMAGE),
+            self._size(SHIP_WIDTH), self._size(SHIP_HEIGHT))
+        black = np.array([[[0, 0, 0, 255]]], dtype=np.uint8)
+        self._bolt = Sprite(black, self._size(BOLT_WIDTH), self._size(BOLT_HEIGHT))
+        # Rounding moves the centers of two neighbors at most 1 pixel closer
+        self._apart = (math.ceil((ALIEN_WIDTH + ALIEN_H_SEP)/scale) - 1 >= alien[0] and
+            math.ceil((ALIEN_HEIGHT + ALIEN_V_SEP)/scale) - 1 >= alien[1])
+
+    def render(self, sim):
+        """
+        Returns the frame of the wave sim
+
+        Parameter sim: the wave to draw
+        Precondition: sim is a WaveSim
+        """
+        np.copyto(self._frame, self._background)
+        self._drawObjects([sim], self._frame[np.newaxis])
+        return self._frame
+
+    def renderBatch(self, sims):
+        """
+        Returns the frames of the waves sims as one array of n x height x width x 3
+
+        Parameter sims: the waves to draw
+        Precondition: sims is a list of WaveSim
+        """
+        n = len(sims)
+        if self._batch is None or len(self._batch) != n:
+            self._batch = np.empty((n, self.height, self.width, 3), dtype=np.uint8)
+        self._batch[:] = self._background
+        self._drawObjects(sims, self._batch)
+        return self._batch
+
+    def _drawObjects(self, sims, frames):
+        """
+        Draws the aliens, the ships and the bolts of each wave into its frame
+
+        Parameter sims: the waves to draw
+        Precondition: sims is a list of WaveSim
+
+        Parameter frames: the frames to draw into, with the background already drawn
+        Precondition: frames is a uint8 array of len(sims) x height x width x 3
+        """
+        aliens = [[], [], [], [], []]
+        ships = [[] for i in range(MAX_SHIPS)]
+        bolts = [[], [], []]
+        for k in range(len(sims)):
+            sim = sims[k]
+            grid = sim.getAliens()
+            rows, cols = np.nonzero(grid.alive)
+            aliens[0].append(np.full(len(rows), k))
+            aliens[1].append(grid.slotX[cols] + grid.ox)
+            aliens[2].append(grid.slotY[rows] + grid.oy)
+            aliens[3].append(grid.kind[rows])
+            aliens[4].append(rows*grid.cols + cols)
+            for i in range(sim.getShips()):
+                if sim.hasShip(i):
+                    ships[i].append((k, sim.getShipX(i)))
+            bank = sim.getBolts()
+            bolts[0].append(np.full(bank.count, k))
+            bolts[1].append(bank.x[:bank.count])
+            bolts[2].append(bank.y[:bank.count])
+        waves, xs, ys, kinds, slots = [np.concatenate(part) for part in aliens]
+        groups = kinds if self._apart else slots
+        for group in np.unique(groups).tolist():
+            pick = groups == group
+            sprite = self._sprites[ALIEN_IMAGES[kinds[pick][0]]]
+            self._blit(frames, sprite, waves[pick], self._col(xs[pick]) - sprite.width//2,
+                self._row(ys[pick]) - sprite.height//2)
+        ship = self._sprites[SHIP_IMAGE]
+        for placed in ships:
+            if len(placed) > 0:
+                waves = np.array([k for k, x in placed])
+                xs = np.array([x for k, x in placed])
+                self._blit(frames, ship, waves, self._col(xs) - ship.width//2,
+                    np.full(len(xs), self._row(SHIP_BOTTOM) - ship.height//2))
+        waves, xs, ys = [np.concatenate(part) for part in bolts]
+        self._blit(frames, self._bolt, waves, self._col(xs - BOLT_WIDTH/2),
+            self._row(ys + BOLT_HEIGHT/2))
+
+    def _blit(self, frames, sprite, waves, left, top):
+        """
+        Draws sprite into frames once for each of the positions given
+
+        Copy j has its top left corner at column left[j] and row top[j] of frame
+        waves[j].  The parts of the sprite outside of the frames are left out.  No
+        two of the copies may overlap, since each pixel is read and written once.
+
+        Parameter frames: the frames to draw into
+        Precondition: frames is a uint8 array of n x height x width x 3
+
+        Parameter sprite: the sprite to draw
+        Precondition: sprite is a Sprite
+
+        Parameter waves: the frame of each copy
+        Precondition: waves is an int array of m values in 0..n-1
+
+        Parameter left: the first column of each copy
+        Precondition: left is an int array of m
+
+        Parameter top: the first row of each copy
+        Precondition: top is an int array of m
+        """
+        if len(waves) == 0:
+            return
+        pixels = frames.reshape(-1, 3)
+        at, which = self._pixels(sprite, waves, left, top, sprite.solid)
+        # Each pixel is written as one 3 byte value instead of three bytes
+        pixels.view('V3')[at, 0] = sprite.solidColor.view('V3')[which, 0]
+        if len(sprite.color) > 0:
+            at, which = self._pixels(sprite, waves, left, top, sprite.blend)
+            dst = pixels[at]
+            pixels[at] = (dst*sprite.clear[which] + sprite.color[which] + 127)//255
+
+    def _pixels(self, sprite, waves, left, top, cells):
+        """
+        Returns the pixels of the frames covered by the given cells of each copy
+
+        The result is the pair (at, which).  at is the position of each pixel
+        covered, counting the pixels of all the frames in order, and which picks the
+        cell that covers it.  When every copy is inside of its frame, at has a row
+        for each copy and which is a slice of all the cells.  Otherwise the cells
+        outside of the frames are left out, and both are flat int arrays.
+
+        Parameter sprite: the sprite being drawn
+        Precondition: sprite is a Sprite
+
+        Parameter waves: the frame of each copy
+        Precondition: waves is an int array of m
+
+        Parameter left: the first column of each copy
+        Precondition: left is an int array of m
+
+        Parameter top: the first row of each copy
+        Precondition: top is an int array of m
+
+        Parameter cells: the rows and columns in the sprite
+        Precondition: cells is a tuple of 2 int arrays of the same length
+        """
+        base = (waves*self.height + top)*self.width + left
+        at = base[:, np.newaxis] + (cells[0]*self.width + cells[1])
+        if ((left >= 0) & (top >= 0) & (left + sprite.width <= self.width) &
+            (top + sprite.height <= self.height)).all():
+            return (at, slice(None))
+        rows = top[:, np.newaxis] + cells[0]
+        cols = left[:, np.newaxis] + cells[1]
+        inside = (rows >= 0) & (rows < self.height) & (cols >= 0) & (cols < self.width)
+        which = np.broadcast_to(np.arange(len(cells[0])), at.shape)
+        return (at[inside], which[inside])
+
+    def _col(self, x):
+        """
+        Returns the columns of the frame for the game x coordinates x
+
+        Parameter x: the x coordinates in the game window
+        Precondition: x is a float or float array
+        """
+        return np.round(np.divide(x, self.scale)).astype(int)
+
+    def _row(self, y):
+        """
+        Returns the rows of the frame for the game y coordinates y
+
+        Rows are counted down from the top of the frame, while y goes up from the
+        bottom of the window.
+
+        Parameter y: the y coordinates in the game window
+        Precondition: y is a float or float array
+        """
+        return np.round(np.divide(GAME_HEIGHT - y, self.scale)).astype(int)
+
+    def _size(self, n):
+        """
+        Returns the number of frame pixels for n game pixels, at least 1
+
+        Parameter n: a length in the game window
+        Precondition: n is an int or float > 0
+        """
+        return max(1, int(round(n/self.scale)))
+
+
+def _unfilter(kind, line, prior, out):
+    """
+    Undoes the PNG filter of one row of an RGBA image
+
+    Parameter kind: the filter type of the row
+    Precondition: kind is an int
+
+    Parameter line: the filtered bytes of the row
+    Precondition: line is a uint8 array
+
+    Parameter prior: the unfiltered bytes of the row above (zeros for the first row)
+    Precondition: prior is a uint8 array the length of line
+
+    Parameter out: the array to put the unfiltered bytes in
+    Precondition: out is a uint8 array the length of line
+    """
+    if kind == 0:
+        out[:] = line
+    elif kind == 1:
+        pixels = line.reshape(-1, 4).astype(np.uint32)
+        out[:] = (np.cumsum(pixels, axis=0) & 0xFF).reshape(-1)
+    elif kind == 2:
+        out[:] = line + prior
+    elif kind == 3:
+        up = prior.tolist()
+        raw = line.tolist()
+        result = [0]*len(raw)
+        for i in range(len(raw)):
+            a = result[i-4] if i >= 4 else 0
+            result[i] = (raw[i] + ((a + up[i]) >> 1)) & 0xFF
+        out[:] = result
+    elif kind == 4:
+        up = prior.tolist()
+        raw = line.tolist()
+        result = [0]*len(raw)
+        for i in range(len(raw)):
+            a = result[i-4] if i >= 4 else 0
+            c = up[i-4] if i >= 4 else 0
+            b = up[i]
+            p = a + b - c
+            pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+            if pa <= pb and pa <= pc:
+                pred = a
+            elif pb <= pc:
+                pred = b
+            else:
+                pred = c
+            result[i] = (raw[i] + pred) & 0xFF
+        out[:] = result
+    else:
+        raise ValueError('unknown PNG filter type %d' % kind)
+
+
+def _chunk(kind, body):
+    """
+    Returns a PNG chunk with the given type and contents
+
+    Parameter kind: the type of the chunk
+    Precondition: kind is a 4 byte bytes object
+
+    Parameter body: the contents of the chunk
+    Precondition: body is a bytes object
+    """
+    return (struct.pack('>I', len(body)) + kind + body +
+        struct.pack('>I', zlib.crc32(kind + body) & 0xFFFFFFFF))
+
+
+if __name__ == '__main__':
+    import sys
+    seed = None
+    for arg in sys.argv[2:]:
+        if arg.startswith('--seed='):
+            seed = int(arg[len('--seed='):])
+    frame = Rasterizer().render(WaveSim(seed))
+    with open(sys.argv[1], 'wb') as file:
+        file.write(encodePNG(frame))
@@ -0,0 +1,256 @@
+"""
+Recording and replay module for Alien Invaders
+
+This module records the input of a wave and plays it back with no window.  A wave is
+stepped on a fixed timestep with its own seeded random number generator (see Wave and
+WaveSim), so the seed, the settings and the INPUT flags of every step are all that is
+needed to play the wave again exactly.
+
+A Recorder collects the INPUT flags of each step.  Runs of steps with the same flags
+are stored as one (flags, count) pair, since the keys held down rarely change from one
+step to the next.  The file written by Recorder.save starts with a fixed header:
+
+    magic 'AIRP', version, seed, tick rate, ALIEN_ROWS, ALIENS_IN_ROW,
+    ALIEN_SPEED, BOLT_RATE, number of runs
+
+followed by 3 bytes per run.  The function replay plays a Recording back into a new
+WaveSim as fast as the CPU allows.  The module can also be run as a script:
+
+    python replay.py game.rec
+
+plays the file and prints the result and the number of steps per second.
+"""
+from consts import *
+from sim import *
+import struct
+import time
+
+
+# The layout of the header and of each run in a recording file
+_HEADER = struct.Struct('<4sHQdiidiI')
+_RUN = struct.Struct('<BH')
+_MAGIC = b'AIRP'
+_VERSION = 1
+# The longest run stored as a single pair
+_MAX_RUN = 0xFFFF
+
+
+class Recording(object):
+    """
+    A class to represent the recorded input of a wave.
+
+    INSTANCE ATTRIBUTES:
+        seed:     the seed the wave was started with [int >= 0]
+        tickRate: the number of simulation steps per second [float > 0]
+        rows:     the number of rows of aliens [int > 0]
+        perrow:   the number of aliens per row [int > 0]
+        speed:    the number of seconds between alien steps [float > 0]
+        boltRate: the most alien steps between alien bolts [int > 0]
+        runs:     the recorded input as [flags, count] pairs [list of lists of 2 ints]
+    """
+
+    def getTicks(self):
+        """
+        Returns the number of steps in the recording
+        """
+        return sum(run[1] for run in self.runs)
+
+    def __init__(self, seed, tickRate=TICK_RATE, rows=ALIEN_ROWS, perrow=ALIENS_IN_ROW,
+        speed=ALIEN_SPEED, boltRate=BOLT_RATE, runs=None):
+        """
+        Initializes a recording with the given seed and settings.
+
+        Parameter seed: the seed the wave was started with
+        Precondition: seed is an int >= 0
+
+        Parameter tickRate: the number of simulation steps per second
+        Precondition: tickRate is an int or float > 0
+
+        Parameter rows: the number of rows of aliens
+        Precondition: rows is an int > 0
+
+        Parameter perrow: the number of aliens per row
+        Precondition: perrow is an int > 0
+
+        Parameter speed: the number of seconds between alien steps
+        Precondition: speed is an int or float > 0
+
+        Parameter boltRate: the most alien steps between alien bolts
+        Precondition: boltRate is an int > 0
+
+        Parameter runs: the recorded input as [flags, count] pairs, or None
+        Precondition: runs is a list of lists [int, int > 0], or None
+        """
+        assert type(seed) == int and seed >= 0
+        assert (type(tickRate) == int or type(tickRate) == float) and tickRate > 0
+        self.seed = seed
+        self.tickRate = float(tickRate)
+        self.rows = rows
+        self.perrow = perrow
+        self.speed = float(speed)
+        self.boltRate = boltRate
+        self.runs = [] if runs is None else runs
+
+    def toBytes(self):
+        """
+        Returns the recording in the file format of this module
+        """
+        data = bytearray(_HEADER.size + _RUN.size*len(self.runs))
+        _HEADER.pack_into(data, 0, _MAGIC, _VERSION, self.seed, self.tickRate,
+            self.rows, self.perrow, self.speed, self.boltRate, len(self.runs))
+        pos = _HEADER.size
+        for flags, count in self.runs:
+            _RUN.pack_into(data, pos, flags, count)
+            pos += _RUN.size
+        return bytes(data)
+
+    @classmethod
+    def fromBytes(cls, data):
+        """
+        Returns the Recording stored in data
+
+        This method raises a ValueError if data is not a recording.
+
+        Parameter data: the contents of a recording file
+        Precondition: data is a bytes object
+        """
+        if len(data) < _HEADER.size:
+            raise ValueError('data is too short to be a recording')
+        magic, version, seed, tickRate, rows, perrow, speed, boltRate, n = \
+            _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError('data is not a recording of version %d' % _VERSION)
+        if len(data) != _HEADER.size + n*_RUN.size:
+            raise ValueError('data has the wrong length for %d runs' % n)
+        runs = [list(run) for run in _RUN.iter_unpack(data[_HEADER.size:])]
+        return cls(seed, tickRate, rows, perrow, speed, boltRate, runs)
+
+    def save(self, path):
+        """
+        Writes the recording to the file path
+
+        Parameter path: the name of the file
+        Precondition: path is a string
+        """
+        with open(path, 'wb') as file:
+            file.write(self.toBytes())
+
+    @classmethod
+    def load(cls, path):
+        """
+        Returns the Recording stored in the file path
+
+        Parameter path: the name of the file
+        Precondition: path is a string naming a recording file
+        """
+        with open(path, 'rb') as file:
+            return cls.fromBytes(file.read())
+
+
+class Recorder(object):
+    """
+    A class to record the INPUT flags of every step of a wave.
+
+    Call record once per simulation step with the flags given to WaveSim.step.  A step
+    that starts with a new ship (after the player loses a life) should also include
+    INPUT_RESPAWN, so that the replay places the ship at the same time.
+
+    INSTANCE ATTRIBUTES:
+        _recording: the recording being built [Recording]
+    """
+
+    def getRecording(self):
+        """
+        Returns the recording built so far
+        """
+        return self._recording
+
+    def __init__(self, seed, tickRate=TICK_RATE, rows=ALIEN_ROWS, perrow=ALIENS_IN_ROW,
+        speed=ALIEN_SPEED, boltRate=BOLT_RATE):
+        """
+        Initializes a recorder for a wave with the given seed and settings.
+
+        The settings are the ones given to WaveSim (see WaveSim.getSettings).
+
+        Parameter seed: the seed the wave was started with
+        Precondition: seed is an int >= 0
+
+        Parameter tickRate: the number of simulation steps per second
+        Precondition: tickRate is an int or float > 0
+
+        Parameter rows: the number of rows of aliens
+        Precondition: rows is an int > 0
+
+        Parameter perrow: the number of aliens per row
+        Precondition: perrow is an int > 0
+
+        Parameter speed: the number of seconds between alien steps
+        Precondition: speed is an int or float > 0
+
+        Parameter boltRate: the most alien steps between alien bolts
+        Precondition: boltRate is an int > 0
+        """
+        self._recording = Recording(seed, tickRate, rows, perrow, speed, boltRate)
+
+    def record(self, flags):
+        """
+        Records the INPUT flags of one step
+
+        Parameter flags: the flags of the step
+        Precondition: flags is an int combining INPUT flags
+        """
+        runs = self._recording.runs
+        if len(runs) > 0 and runs[-1][0] == flags and runs[-1][1] < _MAX_RUN:
+            runs[-1][1] += 1
+        else:
+            runs.append([flags, 1])
+
+    def save(self, path):
+        """
+        Writes the recording to the file path
+
+        Parameter path: the name of the file
+        Precondition: path is a string
+        """
+        self._recording.save(path)
+
+
+def replay(recording, sim=None):
+    """
+    Returns the WaveSim after playing every step of recording
+
+    The wave is stepped as fast as possible, with no window and no sound.  A new
+    wave is made with the seed and the settings of the recording.
+
+    Parameter recording: the recording to play
+    Precondition: recording is a Recording
+
+    Parameter sim: the wave to play the recording into, or None for a new one
+    Precondition: sim is a WaveSim started with the seed and settings of recording,
+    or None
+    """
+    assert isinstance(recording, Recording)
+    if sim is None:
+        sim = WaveSim(recording.seed, recording.rows, recording.perrow,
+            recording.speed, recording.boltRate)
+    tick = 1.0/recording.tickRate
+    for flags, count in recording.runs:
+        keys = flags & ~INPUT_RESPAWN
+        for k in range(count):
+            if flags & INPUT_RESPAWN:
+                sim.createShip()
+            sim.step(keys, tick)
+    return sim
+
+
+if __name__ == '__main__':
+    import sys
+    recording = Recording.load(sys.argv[1])
+    start = time.perf_counter()
+    sim = replay(recording)
+    elapsed = time.perf_counter() - start
+    ticks = recording.getTicks()
+    print('seed %d: %d steps, score %d, lives %d, %s' % (recording.seed, ticks,
+        sim.getScore(), sim.getLives(), 'won' if sim.getWin() else
+        ('lost' if sim.getFinish() else 'unfinished')))
+    print('%.0f steps per second' % (ticks/elapsed if elapsed > 0 else float('inf')))
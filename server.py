@@ -0,0 +1,607 @@
+"""
+Co-op server module for Alien Invaders
+
+This module lets two players fight the same wave over the network.  The server owns
+the wave: each room is a WaveSim with one ship per player (see WaveSim), stepped at
+TICK_RATE by an asyncio task.  Many rooms run in one process and one thread, since a
+room only wakes up once a step.
+
+Players talk to the server over TCP.  Every message starts with its length as 2
+bytes, then a type byte:
+
+    'J' + room name              client -> server, join (or make) a room
+    'W' slot, tick rate, rows, cols, ships
+                                 server -> client, the ship of the player and the
+                                 settings of the wave
+    'I' seq, flags               client -> server, the INPUT flags of one step
+    'S' tick, ack, dropped, score, lives, state, ox, oy, ships, alive, bolts
+                                 server -> client, the state of the wave
+
+The server uses one input of each player per step, in order, and keeps using the
+last one when a player has sent nothing new.  Each state says the seq of the last
+input used for that player (ack), so CoopClient can move its own ship right away
+and correct it when the state comes back: it starts from the position in the state
+and applies again the inputs that the server has not used yet (see moveShipX).
+
+A player that sends inputs faster than the server steps would fall further and
+further behind, so at most MAX_PENDING inputs wait for each player.  When another
+one comes, the oldest waiting input is dropped and never used.  The ack then moves
+past it, so the client stops applying it again, and the state counts the inputs
+dropped for the player so far (dropped), so that the client can tell.
+
+A state has at most MAX_SENT_BOLTS bolts and the alive array is sent as bits, so a
+state is never larger than stateSize(rows, cols), and the bandwidth to each player
+is at most that every SEND_EVERY steps.  A state is skipped for a player that has
+not read the last ones yet.  The module can also be run as a script:
+
+    python server.py 8765
+
+serves rooms on port 8765 of localhost until it is stopped.
+"""
+from consts import *
+from sim import *
+from stream import BOLT_LAYOUT, packBolts, unpackBolts
+from collections import deque
+import numpy as np
+import asyncio
+import struct
+
+
+# The largest number of bolts sent in one state
+MAX_SENT_BOLTS = 32
+# The number of simulation steps between states sent to the players
+SEND_EVERY = 2
+# The most inputs of one player waiting to be used; the oldest one is dropped for a
+# new one when there are this many
+MAX_PENDING = 8
+# The number of simulation steps before a ship that was hit comes back
+RESPAWN_TICKS = TICK_RATE
+# The most bytes waiting to be sent to a player before states to it are skipped
+MAX_BUFFERED = 4096
+
+# The layouts of the messages (see the module docstring)
+_LENGTH = struct.Struct('<H')
+_WELCOME = struct.Struct('<cBdHHB')
+_INPUT = struct.Struct('<cIB')
+_STATE = struct.Struct('<cIIIiBBddB')
+_SHIP = struct.Struct('<dB')
+# The bits of the state field of a state message
+_STATE_WIN = 1
+_STATE_FINISH = 2
+# The ack and dropped fields of a state message, and where they are
+_ACK = struct.Struct('<II')
+_ACK_AT = 5
+
+
+def stateSize(rows, cols):
+    """
+    Returns the most bytes in a state message, not counting its length
+
+    Parameter rows: the number of rows of aliens
+    Precondition: rows is an int > 0
+
+    Parameter cols: the number of aliens per row
+    Precondition: cols is an int > 0
+    """
+    return (_STATE.size + MAX_SHIPS*_SHIP.size + (rows*cols + 7)//8 +
+        MAX_SENT_BOLTS*BOLT_LAYOUT.itemsize)
+
+
+def encodeState(sim, tick, ack=0, dropped=0):
+    """
+    Returns a state message for the wave sim as a bytearray
+
+    The bolts are packed as in stream.py (see packBolts).
+
+    Parameter sim: the wave to send
+    Precondition: sim is a WaveSim
+
+    Parameter tick: the number of steps the wave has taken
+    Precondition: tick is an int >= 0
+
+    Parameter ack: the seq of the last input used or dropped for the player
+    Precondition: ack is an int >= 0
+
+    Parameter dropped: the number of inputs of the player dropped so far
+    Precondition: dropped is an int >= 0
+    """
+    aliens = sim.getAliens()
+    bolts = sim.getBolts()
+    n = min(bolts.count, MAX_SENT_BOLTS)
+    flags = (_STATE_WIN if sim.getWin() else 0) | (_STATE_FINISH if sim.getFinish() else 0)
+    bits = np.packbits(aliens.alive.reshape(-1)).tobytes()
+    out = bytearray(_STATE.size + MAX_SHIPS*_SHIP.size + len(bits) +
+        n*BOLT_LAYOUT.itemsize)
+    _STATE.pack_into(out, 0, b'S', tick, ack, dropped, sim.getScore(), sim.getLives(),
+        flags, aliens.ox, aliens.oy, n)
+    pos = _STATE.size
+    for i in range(MAX_SHIPS):
+        if i < sim.getShips():
+            _SHIP.pack_into(out, pos, sim.getShipX(i), sim.hasShip(i))
+        pos += _SHIP.size
+    out[pos:pos+len(bits)] = bits
+    pos += len(bits)
+    out[pos:] = packBolts(bolts, n)
+    return out
+
+
+def decodeState(data, rows, cols):
+    """
+    Returns the state message data as a dictionary
+
+    The dictionary has the keys tick, ack, dropped, score, lives, win, finish,
+    origin (a pair of floats), ships (a list of MAX_SHIPS (x, alive) pairs), alive
+    (a bool array of rows x cols) and bolts (a list of (x, y, owner) tuples).
+
+    Parameter data: a state message, without its length
+    Precondition: data is a bytes-like object made by encodeState
+
+    Parameter rows: the number of rows of aliens
+    Precondition: rows is an int > 0
+
+    Parameter cols: the number of aliens per row
+    Precondition: cols is an int > 0
+    """
+    kind, tick, ack, dropped, score, lives, flags, ox, oy, n = \
+        _STATE.unpack_from(data, 0)
+    pos = _STATE.size
+    ships = []
+    for i in range(MAX_SHIPS):
+        x, alive = _SHIP.unpack_from(data, pos)
+        ships.append((x, bool(alive)))
+        pos += _SHIP.size
+    size = (rows*cols + 7)//8
+    bits = np.frombuffer(bytes(data[pos:pos+size]), dtype=np.uint8)
+    alive = np.unpackbits(bits)[:rows*cols].astype(bool).reshape(rows, cols)
+    pos += size
+    bolts = unpackBolts(data, pos, n)
+    return {'tick': tick, 'ack': ack, 'dropped': dropped, 'score': score,
+        'lives': lives, 'win': bool(flags & _STATE_WIN),
+        'finish': bool(flags & _STATE_FINISH), 'origin': (ox, oy), 'ships': ships,
+        'alive': alive, 'bolts': bolts}
+
+
+class Player(object):
+    """
+    A class to represent a player connected to the server.
+
+    INSTANCE ATTRIBUTES:
+        writer:  the connection to the player [asyncio.StreamWriter]
+        slot:    the index of the ship of the player, or -1 if not in a room [int]
+        pending: the inputs not used yet, as (seq, flags) pairs [deque]
+        flags:   the last INPUT flags used [int]
+        ack:     the seq of the last input used or dropped [int >= 0]
+        dropped: the number of inputs dropped [int >= 0]
+    """
+
+    def __init__(self, writer):
+        """
+        Initializes a player on the connection writer.
+
+        Parameter writer: the connection to the player
+        Precondition: writer is an asyncio.StreamWriter
+        """
+        self.writer = writer
+        self.slot = -1
+        self.pending = deque()
+        self.flags = 0
+        self.ack = 0
+        self.dropped = 0
+
+    def push(self, seq, flags):
+        """
+        Adds an input to the end of pending
+
+        If MAX_PENDING inputs are already waiting, the oldest one is dropped, and
+        ack is moved past it.
+
+        Parameter seq: the seq of the input
+        Precondition: seq is an int greater than the seq of every input pushed
+
+        Parameter flags: the keys held down by the player
+        Precondition: flags is an int combining INPUT flags
+        """
+        if len(self.pending) >= MAX_PENDING:
+            self.ack = self.pending.popleft()[0]
+            self.dropped += 1
+        self.pending.append((seq, flags))
+
+    def send(self, data):
+        """
+        Sends the message data to the player, unless it has not read the last ones
+
+        Parameter data: the message, without its length
+        Precondition: data is a bytes-like object
+        """
+        if self.writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+            return
+        self.writer.write(_LENGTH.pack(len(data)) + data)
+
+
+class Room(object):
+    """
+    A class to run one wave shared by up to MAX_SHIPS players.
+
+    Only the ships of the players in the room are on screen.  A ship is placed
+    when its player joins and removed when they leave.
+
+    INSTANCE ATTRIBUTES:
+        name:     the name of the room [str]
+        sim:      the wave being played [WaveSim]
+        tick:     the number of steps the wave has taken [int >= 0]
+        _players: the player of each ship [list of Player or None]
+        _down:    the steps since each ship was hit [list of int >= 0]
+        _task:    the task stepping the wave, or None if it has not started [Task]
+    """
+
+    def __init__(self, name, seed=None):
+        """
+        Initializes an empty room with a new wave.
+
+        Parameter name: the name of the room
+        Precondition: name is a string
+
+        Parameter seed: the seed of the wave, or None for a random one
+        Precondition: seed is an int >= 0, or None
+        """
+        self.name = name
+        self.sim = WaveSim(seed, ships=MAX_SHIPS)
+        for i in range(MAX_SHIPS):
+            self.sim.removeShip(i)
+        self.tick = 0
+        self._players = [None]*MAX_SHIPS
+        self._down = [0]*MAX_SHIPS
+        self._task = None
+
+    def isEmpty(self):
+        """
+        Returns True if no player is in the room
+        """
+        return all(p is None for p in self._players)
+
+    def join(self, player):
+        """
+        Returns the ship given to player, or -1 if the room is full
+
+        The wave starts when the first player joins.
+
+        Parameter player: the player joining
+        Precondition: player is a Player not in a room
+        """
+        if not None in self._players:
+            return -1
+        player.slot = self._players.index(None)
+        self._players[player.slot] = player
+        self.sim.createShip(player.slot)
+        self._down[player.slot] = 0
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return player.slot
+
+    def leave(self, player):
+        """
+        Removes player and their ship from the room, and stops the wave if the room
+        is empty
+
+        Parameter player: the player leaving
+        Precondition: player is a Player
+        """
+        if 0 <= player.slot < MAX_SHIPS and self._players[player.slot] is player:
+            self._players[player.slot] = None
+            self.sim.removeShip(player.slot)
+        if self.isEmpty() and not self._task is None:
+            self._task.cancel()
+
+    def step(self):
+        """
+        Steps the wave once with the next input of each player
+
+        A ship that was hit comes back after RESPAWN_TICKS steps, as long as its
+        player is still in the room.
+        """
+        inputs = 0
+        for i in range(MAX_SHIPS):
+            player = self._players[i]
+            if player is None:
+                continue
+            if player.pending:
+                player.ack, player.flags = player.pending.popleft()
+            keys = player.flags & (INPUT_LEFT | INPUT_RIGHT | INPUT_FIRE)
+            inputs |= keys << (i*INPUT_BITS)
+            if not self.sim.hasShip(i):
+                self._down[i] += 1
+                if self._down[i] >= RESPAWN_TICKS:
+                    self.sim.createShip(i)
+                    self._down[i] = 0
+        self.sim.step(inputs, 1.0/TICK_RATE)
+        self.tick += 1
+
+    def broadcast(self):
+        """
+        Sends the state of the wave to every player in the room
+
+        The message is made once, and only the ack and dropped fields are changed
+        for each player.
+        """
+        data = encodeState(self.sim, self.tick)
+        for player in self._players:
+            if not player is None:
+                _ACK.pack_into(data, _ACK_AT, player.ack, player.dropped)
+                player.send(data)
+
+    def close(self):
+        """
+        Stops the wave and disconnects every player in the room
+        """
+        if not self._task is None:
+            self._task.cancel()
+        for player in self._players:
+            if not player is None:
+                player.writer.close()
+
+    async def run(self):
+        """
+        Steps the wave TICK_RATE times a second until it is finished
+
+        The steps are timed from the start, so a late step does not push back the
+        ones after it.  After a hitch longer than MAX_TICKS steps, the steps that
+        were missed are dropped.  The players are sent the last state and
+        disconnected when the wave is finished.
+        """
+        loop = asyncio.get_running_loop()
+        tick = 1.0/TICK_RATE
+        due = loop.time()
+        while not self.sim.getFinish():
+            self.step()
+            if self.tick % SEND_EVERY == 0:
+                self.broadcast()
+            due += tick
+            delay = due - loop.time()
+            if delay < -MAX_TICKS*tick:
+                due = loop.time()
+            await asyncio.sleep(max(0.0, delay))
+        self.broadcast()
+        for player in self._players:
+            if not player is None:
+                player.writer.close()
+
+
+class CoopServer(object):
+    """
+    A class to serve co-op rooms on a TCP port.
+
+    INSTANCE ATTRIBUTES:
+        host:    the address to listen on [str]
+        port:    the port to listen on, or 0 to pick a free one [int >= 0]
+        rooms:   the rooms being played, by name [dict of str to Room]
+        _server: the listening server, or None if not started [asyncio.Server]
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        """
+        Initializes a server that is not listening yet.
+
+        Parameter host: the address to listen on
+        Precondition: host is a string
+
+        Parameter port: the port to listen on, or 0 to pick a free one
+        Precondition: port is an int >= 0
+        """
+        self.host = host
+        self.port = port
+        self.rooms = {}
+        self._server = None
+
+    async def start(self):
+        """
+        Starts listening, and sets port to the port actually used
+        """
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """
+        Stops listening and closes every room
+        """
+        self._server.close()
+        for room in list(self.rooms.values()):
+            room.close()
+        self.rooms.clear()
+        await self._server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        """
+        Talks to one player until it disconnects
+
+        Parameter reader: the messages from the player
+        Precondition: reader is an asyncio.StreamReader
+
+        Parameter writer: the connection to the player
+        Precondition: writer is an asyncio.StreamWriter
+        """
+        player = Player(writer)
+        room = None
+        try:
+            data = await _readMessage(reader)
+            if data[:1] != b'J':
+                return
+            name = data[1:].decode('utf-8', 'replace')
+            room = self.rooms.get(name)
+            if room is None or room.sim.getFinish():
+                room = Room(name)
+                self.rooms[name] = room
+            if room.join(player) < 0:
+                room = None
+                return
+            rows, cols, speed, boltRate = room.sim.getSettings()
+            player.send(_WELCOME.pack(b'W', player.slot, float(TICK_RATE), rows, cols,
+                MAX_SHIPS))
+            while True:
+                data = await _readMessage(reader)
+                if data[:1] == b'I' and len(data) == _INPUT.size:
+                    kind, seq, flags = _INPUT.unpack(data)
+                    player.push(seq, flags)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if not room is None:
+                room.leave(player)
+                if room.isEmpty() and self.rooms.get(room.name) is room:
+                    del self.rooms[room.name]
+            writer.close()
+
+
+class CoopClient(object):
+    """
+    A class to play in a co-op room, guessing where its own ship is between states.
+
+    INSTANCE ATTRIBUTES:
+        slot:     the index of the ship of this player [int >= 0]
+        tickRate: the number of steps per second of the server [float > 0]
+        rows:     the number of rows of aliens [int > 0]
+        cols:     the number of aliens per row [int > 0]
+        state:    the last state from the server, or None [dict, see decodeState]
+        shipX:    the predicted x coordinate of the ship of this player [float]
+        _seq:     the seq of the last input sent [int >= 0]
+        _pending: the inputs sent but not yet used by the server, as (seq, flags)
+                  pairs [deque]
+        _reader:  the messages from the server [asyncio.StreamReader]
+        _writer:  the connection to the server [asyncio.StreamWriter]
+    """
+
+    @classmethod
+    async def connect(cls, room, host='127.0.0.1', port=8765):
+        """
+        Returns a client that has joined the room on the server at host and port
+
+        This method raises a ConnectionError if the room is full.
+
+        Parameter room: the name of the room
+        Precondition: room is a string
+
+        Parameter host: the address of the server
+        Precondition: host is a string
+
+        Parameter port: the port of the server
+        Precondition: port is an int > 0
+        """
+        reader, writer = await asyncio.open_connection(host, port)
+        data = room.encode('utf-8')
+        writer.write(_LENGTH.pack(len(data) + 1) + b'J' + data)
+        try:
+            data = await _readMessage(reader)
+        except asyncio.IncompleteReadError:
+            writer.close()
+            raise ConnectionError('room %r is full' % room)
+        kind, slot, tickRate, rows, cols, ships = _WELCOME.unpack(data)
+        return cls(reader, writer, slot, tickRate, rows, cols)
+
+    def __init__(self, reader, writer, slot, tickRate, rows, cols):
+        """
+        Initializes a client on a connection that has joined a room.
+
+        Use connect instead of calling this directly.
+
+        Parameter reader: the messages from the server
+        Precondition: reader is an asyncio.StreamReader
+
+        Parameter writer: the connection to the server
+        Precondition: writer is an asyncio.StreamWriter
+
+        Parameter slot: the index of the ship of this player
+        Precondition: slot is an int, 0 <= slot < MAX_SHIPS
+
+        Parameter tickRate: the number of steps per second of the server
+        Precondition: tickRate is a float > 0
+
+        Parameter rows: the number of rows of aliens
+        Precondition: rows is an int > 0
+
+        Parameter cols: the number of aliens per row
+        Precondition: cols is an int > 0
+        """
+        self.slot = slot
+        self.tickRate = tickRate
+        self.rows = rows
+        self.cols = cols
+        self.state = None
+        self.shipX = GAME_WIDTH*(slot+1)/(MAX_SHIPS+1)
+        self._seq = 0
+        self._pending = deque()
+        self._reader = reader
+        self._writer = writer
+
+    def send(self, flags):
+        """
+        Sends the INPUT flags for the next step and moves the ship right away
+
+        Call this once per step, TICK_RATE times a second.
+
+        Parameter flags: the keys held down by the player
+        Precondition: flags is an int combining INPUT flags
+        """
+        self._seq += 1
+        self._writer.write(_LENGTH.pack(_INPUT.size) + _INPUT.pack(b'I', self._seq, flags))
+        self._pending.append((self._seq, flags))
+        if self.state is None or self.state['ships'][self.slot][1]:
+            self.shipX = moveShipX(self.shipX, flags)
+
+    async def receive(self):
+        """
+        Returns the next state from the server, or None if the server disconnected
+
+        The predicted ship is moved to where the server has it, then moved again
+        by every input that the server has not used yet.
+        """
+        try:
+            data = await _readMessage(self._reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+        state = decodeState(data, self.rows, self.cols)
+        while self._pending and self._pending[0][0] <= state['ack']:
+            self._pending.popleft()
+        x, alive = state['ships'][self.slot]
+        if alive:
+            for seq, flags in self._pending:
+                x = moveShipX(x, flags)
+        self.shipX = x
+        self.state = state
+        return state
+
+    def close(self):
+        """
+        Disconnects from the server
+        """
+        self._writer.close()
+
+
+async def _readMessage(reader):
+    """
+    Returns the next message from reader, without its length
+
+    Parameter reader: the connection to read from
+    Precondition: reader is an asyncio.StreamReader
+    """
+    size, = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    return await reader.readexactly(size)
+
+
+async def _main(port):
+    """
+    Serves rooms on port of localhost forever
+
+    Parameter port: the port to listen on
+    Precondition: port is an int > 0
+    """
+    server = CoopServer(port=port)
+    await server.start()
+    print('serving co-op rooms on port %d' % server.port)
+    await asyncio.Event().wait()
+
+
+if __name__ == '__main__':
+    import sys
+    try:
+        asyncio.run(_main(int(sys.argv[1]) if len(sys.argv) > 1 else 8765))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,1173 @@
+"""
+Simulation module for Alien Invaders
+
+This module contains the rules for a single wave of Alien Invaders with no dependency
+on Kivy or game2d.  The class WaveSim marches the aliens, fires and moves the laser
+bolts, checks for collisions and keeps track of the lives, the score and whether the
+wave is won or lost.  Everything is stored as plain numbers, so a wave can be stepped
+on a machine with no display, and its speed can be timed without any drawing cost.
+
+The aliens are stored in the class Formation as NumPy arrays instead of as one object
+per alien.  Each alien has a fixed slot in the grid, and the whole grid is moved by a
+single origin offset, so a march step changes two numbers no matter how many aliens
+there are.  The position of an alien on screen is its slot plus the origin.
+
+The class Wave in wave.py is a thin adapter over WaveSim.  It turns the keys held
+down in GInput into the INPUT flags in consts.py, steps the simulation, and moves the
+GObjects on screen to match.
+"""
+from consts import *
+import numpy as np
+import random
+import struct
+import math
+
+
+# The fixed part of a snapshot of a WaveSim (see WaveSim.snapshot)
+_SNAPSHOT = struct.Struct('<4sHHHQdiBidBBiiBBiiddHIIBd')
+_SNAPSHOT_MAGIC = b'AISN'
+_SNAPSHOT_VERSION = 3
+# The number of words in the state of the random number generator
+_MT_SIZE = 624
+
+
+class Formation(object):
+    """
+    A class to represent the grid of aliens as parallel arrays.
+
+    Rows are numbered from the top of the screen (row 0) to the bottom (row rows-1).
+    Every alien sits in a fixed slot of the grid, and the grid moves as one block by
+    the offset (ox, oy).  The center of the alien in row r and column c is at
+    (slotX[c]+ox, slotY[r]+oy).  A dead alien keeps its slot, but is marked False in
+    the alive array and ignored by every query.
+
+    The hidden attributes are an occupancy index that is only updated when an alien
+    dies.  It answers the questions asked every frame (where the outermost columns
+    are, which alien is lowest in a column, how many aliens are left) in O(1) time,
+    without scanning the grid.
+
+    INSTANCE ATTRIBUTES:
+        slotX: the x coordinate of each column when the offset is 0 [float array, cols]
+        slotY: the y coordinate of each row when the offset is 0 [float array, rows]
+        ox:    the horizontal offset of the whole grid [float]
+        oy:    the vertical offset of the whole grid [float]
+        alive: whether each alien is alive [bool array, rows x cols]
+        kind:  the index in ALIEN_IMAGES of the image for each row [int array, rows]
+        rows:  the number of rows [int > 0]
+        cols:  the number of aliens in each row [int > 0]
+        _slotX:     slotX as a list, for fast access to single values [list of float]
+        _slotY:     slotY as a list, for fast access to single values [list of float]
+        _live:      the number of live aliens [int >= 0]
+        _rowCount:  the number of live aliens in each row [list of int >= 0]
+        _colCount:  the number of live aliens in each column [list of int >= 0]
+        _colBottom: the lowest live row of each column, or -1 if it is empty [list of int]
+        _columns:   the columns with a live alien, in no order [list of int]
+        _colWhere:  the position of each column in _columns, or -1 [list of int]
+        _left:      the leftmost column with a live alien [int]
+        _right:     the rightmost column with a live alien [int]
+        _bottomRow: the lowest row with a live alien, or -1 if there are none [int]
+    """
+
+    def __init__(self, rows, cols):
+        """
+        Initializes a full formation of rows x cols aliens
+
+        The top row is ALIEN_CEILING pixels below the top of the window, and the
+        images in ALIEN_IMAGES go from the bottom row to the top, two rows each.
+        The slots start at these positions on screen, with an offset of (0, 0).
+
+        Parameter rows: the number of rows
+        Precondition: rows is an int > 0
+
+        Parameter cols: the number of aliens in each row
+        Precondition: cols is an int > 0
+        """
+        assert type(rows) == int and rows > 0
+        assert type(cols) == int and cols > 0
+        self.rows = rows
+        self.cols = cols
+        r = np.arange(rows)
+        c = np.arange(cols)
+        self.slotY = (GAME_HEIGHT - (ALIEN_CEILING + r*ALIEN_V_SEP +
+            r*ALIEN_HEIGHT)).astype(float)
+        self.slotX = ((c+2)*ALIEN_H_SEP + c*ALIEN_WIDTH).astype(float)
+        self.ox = 0.0
+        self.oy = 0.0
+        self.alive = np.ones((rows, cols), dtype=bool)
+        self.kind = ((rows-1-r) % (len(ALIEN_IMAGES)*2)) // 2
+        self._slotX = self.slotX.tolist()
+        self._slotY = self.slotY.tolist()
+        self._live = rows*cols
+        self._rowCount = [cols]*rows
+        self._colCount = [rows]*cols
+        self._colBottom = [rows-1]*cols
+        self._columns = list(range(cols))
+        self._colWhere = list(range(cols))
+        self._left = 0
+        self._right = cols-1
+        self._bottomRow = rows-1
+
+    def isAlive(self, r, c):
+        """
+        Returns whether the alien in row r and column c is alive
+
+        Parameter r: The row of the alien
+        Precondition: r is an int, 0 <= r < rows
+
+        Parameter c: The column of the alien
+        Precondition: c is an int, 0 <= c < cols
+        """
+        return bool(self.alive[r, c])
+
+    def getPos(self, r, c):
+        """
+        Returns the (x, y) center of the alien in row r and column c as floats
+
+        Parameter r: The row of the alien
+        Precondition: r is an int, 0 <= r < rows
+
+        Parameter c: The column of the alien
+        Precondition: c is an int, 0 <= c < cols
+        """
+        return (float(self.slotX[c]) + self.ox, float(self.slotY[r]) + self.oy)
+
+    def getSlot(self, r, c):
+        """
+        Returns the (x, y) slot of the alien in row r and column c as floats
+
+        The slot is the position of the alien relative to the offset of the grid.
+
+        Parameter r: The row of the alien
+        Precondition: r is an int, 0 <= r < rows
+
+        Parameter c: The column of the alien
+        Precondition: c is an int, 0 <= c < cols
+        """
+        return (float(self.slotX[c]), float(self.slotY[r]))
+
+    def getOrigin(self):
+        """
+        Returns the (ox, oy) offset of the whole grid
+        """
+        return (self.ox, self.oy)
+
+    def getImage(self, r):
+        """
+        Returns the image file for the aliens in row r
+
+        Parameter r: The row of the aliens
+        Precondition: r is an int, 0 <= r < rows
+        """
+        return ALIEN_IMAGES[self.kind[r]]
+
+    def count(self):
+        """
+        Returns the number of live aliens
+        """
+        return self._live
+
+    def shift(self, dx, dy):
+        """
+        Moves the whole formation by (dx, dy)
+
+        Only the offset changes; the slots stay where they are.
+
+        Parameter dx: the horizontal distance
+        Precondition: dx is an int or float
+
+        Parameter dy: the vertical distance
+        Precondition: dy is an int or float
+        """
+        self.ox += dx
+        self.oy += dy
+
+    def kill(self, r, c):
+        """
+        Marks the alien in row r and column c as dead
+
+        This is the only method that changes which aliens are alive, so it also
+        updates the occupancy index.  Every step of the index only moves toward
+        the empty side, so all the kills of a wave cost O(rows*cols) in total.
+
+        Parameter r: The row of the alien
+        Precondition: r is an int, 0 <= r < rows
+
+        Parameter c: The column of the alien
+        Precondition: c is an int, 0 <= c < cols
+        """
+        if not self.alive[r, c]:
+            return
+        self.alive[r, c] = False
+        self._live -= 1
+        self._rowCount[r] -= 1
+        self._colCount[c] -= 1
+        if self._colCount[c] == 0:
+            self._colBottom[c] = -1
+            k = self._colWhere[c]
+            last = self._columns.pop()
+            if last != c:
+                self._columns[k] = last
+                self._colWhere[last] = k
+            self._colWhere[c] = -1
+        elif self._colBottom[c] == r:
+            while not self.alive[r, c]:
+                r -= 1
+            self._colBottom[c] = r
+        while self._left <= self._right and self._colCount[self._left] == 0:
+            self._left += 1
+        while self._right >= self._left and self._colCount[self._right] == 0:
+            self._right -= 1
+        while self._bottomRow >= 0 and self._rowCount[self._bottomRow] == 0:
+            self._bottomRow -= 1
+
+    def edges(self):
+        """
+        Returns the pair (left, right) of x coordinates of the outermost live aliens
+
+        This method returns None if there are no live aliens.
+        """
+        if self._live == 0:
+            return None
+        return (self._slotX[self._left] + self.ox, self._slotX[self._right] + self.ox)
+
+    def columnBottom(self, c):
+        """
+        Returns the row of the lowest live alien in column c, or None if it is empty
+
+        Parameter c: The column being checked
+        Precondition: c is an int, 0 <= c < cols
+        """
+        r = self._colBottom[c]
+        return None if r < 0 else r
+
+    def randomColumn(self, rng):
+        """
+        Returns a column with at least one live alien, chosen uniformly at random
+
+        This method returns None if there are no live aliens.
+
+        Parameter rng: the random number generator to use
+        Precondition: rng is the random module or a random.Random object
+        """
+        if self._live == 0:
+            return None
+        return self._columns[rng.randrange(len(self._columns))]
+
+    def getColumns(self):
+        """
+        Returns the columns with a live alien, in the order randomColumn picks from
+
+        The list should not be modified.
+        """
+        return self._columns
+
+    def setState(self, alive, columns):
+        """
+        Sets which aliens are alive and rebuilds the occupancy index to match
+
+        The order of columns matters, since randomColumn picks a column by its
+        position in the list.  It should be the list returned by getColumns when
+        alive was saved.
+
+        Parameter alive: whether each alien is alive
+        Precondition: alive is a bool array of rows x cols
+
+        Parameter columns: the columns with a live alien, in the order to keep
+        Precondition: columns is a list of the columns with a live alien in alive
+        """
+        self.alive[:] = alive
+        rowCount = self.alive.sum(axis=1)
+        colCount = self.alive.sum(axis=0)
+        bottom = (self.rows - 1) - self.alive[::-1].argmax(axis=0)
+        bottom[colCount == 0] = -1
+        self._live = int(rowCount.sum())
+        self._rowCount = rowCount.tolist()
+        self._colCount = colCount.tolist()
+        self._colBottom = bottom.tolist()
+        self._columns = list(columns)
+        self._colWhere = [-1]*self.cols
+        for k in range(len(self._columns)):
+            self._colWhere[self._columns[k]] = k
+        if self._live == 0:
+            self._left, self._right, self._bottomRow = self.cols, self.cols-1, -1
+        else:
+            live = np.flatnonzero(colCount)
+            self._left, self._right = int(live[0]), int(live[-1])
+            self._bottomRow = int(np.flatnonzero(rowCount)[-1])
+
+    def bottomRow(self):
+        """
+        Returns the lowest row with a live alien, or None if there are none
+        """
+        return None if self._bottomRow < 0 else self._bottomRow
+
+    def bottom(self):
+        """
+        Returns the y coordinate of the lowest live alien, or None if there are none
+        """
+        if self._bottomRow < 0:
+            return None
+        return self._slotY[self._bottomRow] + self.oy
+
+    def hit(self, bx, by):
+        """
+        Returns the (row, column) of the first live alien hit by a bolt, or None
+
+        An alien is hit if a corner of the bolt is strictly inside the alien.  When
+        the bolt hits more than one alien, the one with the lowest row (and then the
+        lowest column) is returned.
+
+        Since the slots form a regular grid, each corner of the bolt can only be
+        inside the alien of one cell, which is found by dividing by the distance
+        between slots.  So at most two rows and two columns are checked exactly,
+        no matter how big the formation is.
+
+        Parameter bx: the x coordinate of the center of the bolt
+        Precondition: bx is an int or float
+
+        Parameter by: the y coordinate of the center of the bolt
+        Precondition: by is an int or float
+        """
+        pitchX = ALIEN_WIDTH + ALIEN_H_SEP
+        pitchY = ALIEN_HEIGHT + ALIEN_V_SEP
+        left = self._slotX[0] + self.ox - ALIEN_WIDTH/2
+        top = self._slotY[0] + self.oy + ALIEN_HEIGHT/2
+        cols = _cells((bx - BOLT_WIDTH/2 - left)/pitchX,
+            (bx + BOLT_WIDTH/2 - left)/pitchX, self.cols)
+        rows = _cells((top - by - BOLT_HEIGHT/2)/pitchY,
+            (top - by + BOLT_HEIGHT/2)/pitchY, self.rows)
+        for r in rows:
+            for c in cols:
+                if self.alive[r, c] and _overlaps(self._slotX[c] + self.ox,
+                    self._slotY[r] + self.oy, ALIEN_WIDTH, ALIEN_HEIGHT, bx, by):
+                    return (r, c)
+        return None
+
+
+class BoltBank(object):
+    """
+    A class to represent the laser bolts on screen as parallel arrays.
+
+    The bolts are stored in the first count entries of each array.  A bolt is
+    removed by moving the last bolt into its place, so removing any bolt takes O(1)
+    time, and the order of the bolts is not kept.  Moving the bolts and removing the
+    ones that have gone offscreen are each a single array operation, so thousands of
+    bolts can be on screen at once.
+
+    When the arrays are full, they are replaced by arrays twice as big.
+
+    INSTANCE ATTRIBUTES:
+        x:      the x coordinate of the center of each bolt [float array]
+        y:      the y coordinate of the center of each bolt [float array]
+        vy:     the velocity of each bolt in the y direction [float array]
+        py:     the y coordinate of each bolt before the last move [float array]
+        owner:  who fired each bolt, OWNER_ALIEN or OWNER_SHIP+i for ship i [int array]
+        alive:  whether each bolt is still in play [bool array]
+        count:  the number of bolts on screen [int >= 0]
+        _owned: the number of bolts on screen for each owner [dict of int to int]
+    """
+
+    def __init__(self, capacity=BOLT_CAPACITY):
+        """
+        Initializes an empty bank of bolts
+
+        Parameter capacity: the number of bolts to make room for
+        Precondition: capacity is an int > 0
+        """
+        assert type(capacity) == int and capacity > 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.py = np.zeros(capacity)
+        self.owner = np.zeros(capacity, dtype=np.int8)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.count = 0
+        self._owned = {}
+
+    def owned(self, owner):
+        """
+        Returns the number of bolts on screen fired by owner
+
+        Parameter owner: who fired the bolts
+        Precondition: owner is OWNER_ALIEN or OWNER_SHIP
+        """
+        return self._owned.get(owner, 0)
+
+    def find(self, owner):
+        """
+        Returns the array of the positions of the bolts fired by owner
+
+        Parameter owner: who fired the bolts
+        Precondition: owner is OWNER_ALIEN or OWNER_SHIP
+        """
+        if self._owned.get(owner, 0) == 0:
+            return np.zeros(0, dtype=int)
+        return np.flatnonzero(self.owner[:self.count] == owner)
+
+    def add(self, x, y, v, owner):
+        """
+        Adds a bolt at the end of the bank
+
+        Parameter x: the x coordinate of the center of the bolt
+        Precondition: x is an int or float
+
+        Parameter y: the y coordinate of the center of the bolt
+        Precondition: y is an int or float
+
+        Parameter v: the velocity of the bolt in the y direction
+        Precondition: v is an int or float
+
+        Parameter owner: who fired the bolt
+        Precondition: owner is OWNER_ALIEN or OWNER_SHIP
+        """
+        if self.count == len(self.x):
+            self._grow()
+        k = self.count
+        self.x[k] = x
+        self.y[k] = y
+        self.vy[k] = v
+        self.py[k] = y
+        self.owner[k] = owner
+        self.alive[k] = True
+        self.count += 1
+        self._owned[owner] = self._owned.get(owner, 0) + 1
+
+    def remove(self, k):
+        """
+        Removes the bolt at position k by moving the last bolt into its place
+
+        Parameter k: the position of the bolt
+        Precondition: k is an int, 0 <= k < count
+        """
+        owner = int(self.owner[k])
+        self._owned[owner] -= 1
+        last = self.count - 1
+        if k != last:
+            self.x[k] = self.x[last]
+            self.y[k] = self.y[last]
+            self.vy[k] = self.vy[last]
+            self.py[k] = self.py[last]
+            self.owner[k] = self.owner[last]
+            self.alive[k] = self.alive[last]
+        self.alive[last] = False
+        self.count = last
+
+    def setBolts(self, x, y, vy, py, owner):
+        """
+        Replaces the bolts in the bank with the given bolts
+
+        Parameter x: the x coordinate of the center of each bolt
+        Parameter y: the y coordinate of the center of each bolt
+        Parameter vy: the velocity of each bolt in the y direction
+        Parameter py: the y coordinate of each bolt before the last move
+        Precondition: x, y, vy and py are float arrays of the same length n
+
+        Parameter owner: who fired each bolt
+        Precondition: owner is an int array of length n of bolt owners
+        """
+        n = len(x)
+        while len(self.x) < n:
+            self._grow()
+        self.x[:n] = x
+        self.y[:n] = y
+        self.vy[:n] = vy
+        self.py[:n] = py
+        self.owner[:n] = owner
+        self.alive[:n] = True
+        self.alive[n:] = False
+        self.count = n
+        counts = np.bincount(self.owner[:n], minlength=OWNER_SHIP+MAX_SHIPS)
+        self._owned = dict(enumerate(counts.tolist()))
+
+    def move(self):
+        """
+        Moves every bolt by its velocity
+
+        The old positions are kept in py, so that a view can draw the bolts
+        part of the way between two steps.
+        """
+        n = self.count
+        self.py[:n] = self.y[:n]
+        self.y[:n] += self.vy[:n]
+
+    def cull(self, bottom, top):
+        """
+        Removes every bolt that is no longer alive or is outside of bottom..top
+
+        Parameter bottom: the lowest y coordinate a bolt may have
+        Precondition: bottom is an int or float
+
+        Parameter top: the highest y coordinate a bolt may have
+        Precondition: top is an int or float >= bottom
+        """
+        n = self.count
+        y = self.y[:n]
+        gone = np.flatnonzero(~self.alive[:n] | (y < bottom) | (y > top))
+        for k in gone[::-1]:
+            self.remove(int(k))
+
+    def overlap(self, x, y, w, h, owner):
+        """
+        Returns the position of a bolt fired by owner that overlaps a box, or -1
+
+        A bolt overlaps the box if one of its corners is strictly inside the w x h
+        box centered at (x, y).
+
+        Parameter x: the x coordinate of the center of the box
+        Precondition: x is an int or float
+
+        Parameter y: the y coordinate of the center of the box
+        Precondition: y is an int or float
+
+        Parameter w: the width of the box
+        Precondition: w is an int or float > 0
+
+        Parameter h: the height of the box
+        Precondition: h is an int or float > 0
+
+        Parameter owner: who fired the bolts to check
+        Precondition: owner is OWNER_ALIEN or OWNER_SHIP
+        """
+        if self._owned.get(owner, 0) == 0:
+            return -1
+        n = self.count
+        dx = np.abs(self.x[:n] - x)
+        dy = np.abs(self.y[:n] - y)
+        hit = (self.owner[:n] == owner) & \
+            ((np.abs(dx - BOLT_WIDTH/2) < w/2) | (dx + BOLT_WIDTH/2 < w/2)) & \
+            ((np.abs(dy - BOLT_HEIGHT/2) < h/2) | (dy + BOLT_HEIGHT/2 < h/2))
+        found = np.flatnonzero(hit)
+        return int(found[0]) if len(found) > 0 else -1
+
+    def _grow(self):
+        """
+        Replaces the arrays with arrays twice as big, keeping the bolts
+        """
+        size = 2*len(self.x)
+        for name in ('x', 'y', 'vy', 'py', 'owner', 'alive'):
+            old = getattr(self, name)
+            new = np.zeros(size, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+
+class WaveSim(object):
+    """
+    This class holds the rules of a single wave of Alien Invaders.
+
+    The simulation is advanced with the method step, which takes the input flags
+    (INPUT_LEFT, INPUT_RIGHT and INPUT_FIRE from consts.py) held down by the player
+    and the time since the last step.  The ship and the bolts move a fixed distance
+    every step, so the game only plays at the same speed everywhere if every step
+    is the same length.  Wave takes care of that by always stepping 1/TICK_RATE
+    seconds at a time. After each step, the attribute events holds the
+    EVENT flags for anything that happened in that step, so that a view can play
+    the matching sounds.
+
+    The size of the formation, the time between alien steps and the most alien steps
+    between alien bolts default to ALIEN_ROWS, ALIENS_IN_ROW, ALIEN_SPEED and BOLT_RATE
+    in consts.py, but can be given to each wave, so that many waves with different
+    settings can be played in one process (see batch.py).  Rows of aliens are numbered
+    from the top of the screen (row 0) to the bottom (row rows-1).
+
+    A wave can have up to MAX_SHIPS ships, one for each player, which share the lives
+    and the score.  The INPUT flags of ship i are shifted left by i*INPUT_BITS in the
+    inputs given to step, and its bolts are owned by OWNER_SHIP+i.  The methods
+    about a ship take the index of the ship, which is 0 for the only ship of a wave
+    with one player.
+
+    INSTANCE ATTRIBUTES:
+        _shipX:     the x coordinate of the center of each ship [list of float]
+        _prevShipX: the x coordinate of the center of each ship before the last step
+                    [list of float]
+        _shipAlive: whether each ship is on screen [list of bool]
+        _aliens:    the grid of aliens [Formation]
+        _bolts:     the laser bolts currently on screen [BoltBank]
+        _lives:     the number of lives left [int >= 0]
+        _time:      the amount of time since the last alien step [number >= 0]
+        rt:         whether the aliens are moving right [bool]
+        dn:         whether the aliens moved down during the last step [0 <= int <= 2]
+        boltFire:   the number of alien steps before the next alien bolt
+                    [0 <= int <= boltRate]
+        alienSteps: the number of alien steps since the last alien bolt
+                    [0 <= int <= boltRate]
+        isWin:      whether the player has won [bool]
+        isFinish:   whether the wave is finished [bool]
+        score:      the score of the player [int >= 0]
+        events:     the EVENT flags raised by the last step [int >= 0]
+        _seed:      the seed the wave was started with [int >= 0]
+        _rng:       the random number generator of the wave [random.Random]
+        _speed:     the number of seconds between alien steps [float > 0]
+        _boltRate:  the most alien steps between alien bolts [int > 0]
+    """
+
+    def getSeed(self):
+        """
+        Returns the seed the wave was started with
+        """
+        return self._seed
+
+    def getSettings(self):
+        """
+        Returns the settings of the wave as a tuple (rows, perrow, speed, boltRate)
+        """
+        return (self._aliens.rows, self._aliens.cols, self._speed, self._boltRate)
+
+    def getShips(self):
+        """
+        Returns the number of ships in the wave
+        """
+        return len(self._shipX)
+
+    def getShipX(self, i=0):
+        """
+        Returns the x coordinate of the center of ship i
+
+        Parameter i: the index of the ship
+        Precondition: i is an int, 0 <= i < getShips()
+        """
+        return self._shipX[i]
+
+    def getPrevShipX(self, i=0):
+        """
+        Returns the x coordinate of the center of ship i before the last step
+
+        Parameter i: the index of the ship
+        Precondition: i is an int, 0 <= i < getShips()
+        """
+        return self._prevShipX[i]
+
+    def hasShip(self, i=0):
+        """
+        Returns whether ship i is on screen
+
+        This method returns False after the ship is hit by a bolt or removed with
+        removeShip, and until createShip is called.
+
+        Parameter i: the index of the ship
+        Precondition: i is an int, 0 <= i < getShips()
+        """
+        return self._shipAlive[i]
+
+    def getAliens(self):
+        """
+        Returns the grid of aliens
+
+        The Formation should not be modified.
+        """
+        return self._aliens
+
+    def getBolts(self):
+        """
+        Returns the bolts on screen
+
+        The BoltBank should not be modified.
+        """
+        return self._bolts
+
+    def getLives(self):
+        """
+        Returns the amount of lives the player has left
+        """
+        return self._lives
+
+    def getScore(self):
+        """
+        Returns the score
+        """
+        return self.score
+
+    def getFinish(self):
+        """
+        Returns whether the wave has finished or not
+        """
+        return self.isFinish
+
+    def getWin(self):
+        """
+        Returns whether the player had won the wave or not
+        """
+        return self.isWin
+
+    def __init__(self, seed=None, rows=ALIEN_ROWS, perrow=ALIENS_IN_ROW,
+        speed=ALIEN_SPEED, boltRate=BOLT_RATE, ships=1):
+        """
+        Initializes the ship, the aliens and the bolts of a new wave.
+
+        All of the random choices in the wave come from a random number generator
+        owned by the wave, so two waves with the same seed, settings and inputs play
+        exactly the same way.  If no seed is given, a new one is picked at random.
+
+        Parameter seed: the seed for the random number generator of the wave
+        Precondition: seed is an int, 0 <= seed < 2**64, or None
+
+        Parameter rows: the number of rows of aliens
+        Precondition: rows is an int > 0
+
+        Parameter perrow: the number of aliens per row
+        Precondition: perrow is an int > 0
+
+        Parameter speed: the number of seconds between alien steps
+        Precondition: speed is an int or float > 0
+
+        Parameter boltRate: the most alien steps between alien bolts
+        Precondition: boltRate is an int > 0
+
+        Parameter ships: the number of ships
+        Precondition: ships is an int, 1 <= ships <= MAX_SHIPS
+        """
+        assert seed is None or (type(seed) == int and 0 <= seed < 2**64)
+        assert (type(speed) == int or type(speed) == float) and speed > 0
+        assert type(boltRate) == int and boltRate > 0
+        assert type(ships) == int and 1 <= ships <= MAX_SHIPS
+        if seed is None:
+            seed = random.randrange(SEED_RANGE)
+        self._seed = seed
+        self._rng = random.Random(seed)
+        self._lives = SHIP_LIVES
+        self._speed = float(speed)
+        self._boltRate = boltRate
+        self._aliens = Formation(rows, perrow)
+        self._shipX = [0.0]*ships
+        self._prevShipX = [0.0]*ships
+        self._shipAlive = [False]*ships
+        for i in range(ships):
+            self.createShip(i)
+        self._bolts = BoltBank()
+        self._time = 0
+        self.rt = True
+        self.dn = 0
+        self.boltFire = 0
+        self.alienSteps = 0
+        self.isWin = False
+        self.isFinish = False
+        self.score = 0
+        self.events = 0
+
+    def step(self, inputs, t):
+        """
+        Advances the wave by one update
+
+        This method moves the ship, marches the aliens, fires and moves the bolts,
+        checks for collisions, removes the bolts that are offscreen, and checks
+        whether the wave is won or lost.
+
+        Parameter inputs: the keys held down by the players
+        Precondition: inputs is an int combining INPUT_LEFT, INPUT_RIGHT, INPUT_FIRE,
+        shifted left by i*INPUT_BITS for ship i
+
+        Parameter t: the time since the last step
+        Precondition: t is an int or float >= 0
+        """
+        assert type(t) == int or type(t) == float
+        self.events = 0
+        if self.boltFire == 0:
+            self.boltFire = self._rng.randint(1,self._boltRate)
+        self._moveShip(inputs)
+        self._time += t
+        self._moveAliens()
+        self._fireShip(inputs)
+        self._fireAlien()
+        self._moveBolts()
+        self._collideBoltAlien()
+        self._collideBoltShip()
+        self._delBolts()
+        self._checkWin()
+        self._checkPass()
+
+    def createShip(self, i=0):
+        """
+        Places a new ship i at the bottom of the screen
+
+        The ships start spread evenly across the screen, so a single ship starts in
+        the middle.
+
+        Parameter i: the index of the ship
+        Precondition: i is an int, 0 <= i < getShips()
+        """
+        self._shipX[i] = GAME_WIDTH*(i+1)/(len(self._shipX)+1)
+        self._prevShipX[i] = self._shipX[i]
+        self._shipAlive[i] = True
+
+    def removeShip(self, i=0):
+        """
+        Takes ship i off the screen without costing a life
+
+        Use this method for a ship with no player, so that it is not hit by bolts.
+
+        Parameter i: the index of the ship
+        Precondition: i is an int, 0 <= i < getShips()
+        """
+        self._shipAlive[i] = False
+
+    def snapshotSize(self):
+        """
+        Returns the number of bytes in a snapshot of this wave as it is now
+
+        The size depends on the number of rows and aliens per row, and grows by 33
+        bytes for each bolt on screen.
+        """
+        return _snapshotLayout(self._aliens.rows, self._aliens.cols, self._bolts.count)[-1]
+
+    def snapshot(self, out=None):
+        """
+        Returns the whole state of the wave packed into a bytearray
+
+        The snapshot holds the ships, the aliens, the bolts, the timers, the lives,
+        the score and the state of the random number generator, so restore puts
+        the wave back exactly as it was and the wave plays on the same way.  The
+        layout is the numbers in _SNAPSHOT, then the random number generator, the
+        ships (MAX_SHIPS of them), the order of the live columns (see
+        Formation.setState), the alive array and last the bolts, as many as there
+        are on screen.  Passing out reuses a bytearray from an earlier snapshot
+        instead of making a new one; it is resized if the number of bolts changed.
+
+        Parameter out: the bytearray to pack the snapshot into, or None
+        Precondition: out is a bytearray, or None
+        """
+        aliens = self._aliens
+        bolts = self._bolts
+        rows, cols = aliens.rows, aliens.cols
+        n = bolts.count
+        mt, sh, cl, al, at, own, size = _snapshotLayout(rows, cols, n)
+        if out is None:
+            out = bytearray(size)
+        elif len(out) > size:
+            del out[size:]
+        elif len(out) < size:
+            out.extend(bytes(size - len(out)))
+        version, state, gauss = self._rng.getstate()
+        columns = aliens.getColumns()
+        _SNAPSHOT.pack_into(out, 0, _SNAPSHOT_MAGIC, _SNAPSHOT_VERSION, rows, cols,
+            self._seed, self._speed, self._boltRate,
+            len(self._shipX), self._lives, self._time, self.rt,
+            self.dn, self.boltFire, self.alienSteps, self.isWin, self.isFinish,
+            self.score, self.events, aliens.ox, aliens.oy, len(columns), bolts.count,
+            state[_MT_SIZE], not gauss is None, 0.0 if gauss is None else gauss)
+        struct.pack_into('<%dI' % _MT_SIZE, out, mt, *state[:_MT_SIZE])
+        ships = len(self._shipX)
+        where = np.frombuffer(out, np.float64, 2*MAX_SHIPS, sh)
+        where[:ships] = self._shipX
+        where[MAX_SHIPS:MAX_SHIPS+ships] = self._prevShipX
+        np.frombuffer(out, bool, MAX_SHIPS, sh + 16*MAX_SHIPS)[:ships] = self._shipAlive
+        np.frombuffer(out, np.int16, len(columns), cl)[:] = columns
+        np.frombuffer(out, bool, rows*cols, al)[:] = aliens.alive.reshape(-1)
+        arrays = np.frombuffer(out, np.float64, 4*n, at).reshape(4, n)
+        arrays[0] = bolts.x[:n]
+        arrays[1] = bolts.y[:n]
+        arrays[2] = bolts.vy[:n]
+        arrays[3] = bolts.py[:n]
+        np.frombuffer(out, np.int8, n, own)[:] = bolts.owner[:n]
+        return out
+
+    def restore(self, data):
+        """
+        Puts the wave back in the state saved by snapshot
+
+        The arrays of the wave are reused, so nothing is made again.  This method
+        raises a ValueError if data is not a snapshot of a wave with the same
+        number of rows and aliens per row.
+
+        Parameter data: a snapshot of a wave
+        Precondition: data is a bytes-like object returned by snapshot
+        """
+        aliens = self._aliens
+        rows, cols = aliens.rows, aliens.cols
+        ships = len(self._shipX)
+        if len(data) < _SNAPSHOT.size:
+            raise ValueError('data is not a snapshot of a %d x %d wave' % (rows, cols))
+        fields = _SNAPSHOT.unpack_from(data, 0)
+        mt, sh, cl, al, at, own, size = _snapshotLayout(rows, cols, fields[21])
+        if (fields[:4] != (_SNAPSHOT_MAGIC, _SNAPSHOT_VERSION, rows, cols)
+            or fields[7] != ships or len(data) != size):
+            raise ValueError('data is not a snapshot of a %d x %d wave' % (rows, cols))
+        (self._seed, self._speed, self._boltRate, ships, self._lives, self._time, rt,
+            self.dn, self.boltFire, self.alienSteps, isWin, isFinish, self.score,
+            self.events, ox, oy, ncolumns, n, index, hasGauss, gauss) = fields[4:]
+        where = np.frombuffer(data, np.float64, 2*MAX_SHIPS, sh)
+        self._shipX[:] = where[:ships].tolist()
+        self._prevShipX[:] = where[MAX_SHIPS:MAX_SHIPS+ships].tolist()
+        self._shipAlive[:] = np.frombuffer(data, bool, ships, sh + 16*MAX_SHIPS).tolist()
+        self.rt = bool(rt)
+        self.isWin = bool(isWin)
+        self.isFinish = bool(isFinish)
+        state = struct.unpack_from('<%dI' % _MT_SIZE, data, mt) + (index,)
+        self._rng.setstate((random.Random.VERSION, state, gauss if hasGauss else None))
+        aliens.ox = ox
+        aliens.oy = oy
+        alive = np.frombuffer(data, bool, rows*cols, al).reshape(rows, cols)
+        columns = np.frombuffer(data, np.int16, ncolumns, cl).tolist()
+        if columns != aliens.getColumns() or not np.array_equal(alive, aliens.alive):
+            aliens.setState(alive, columns)
+        arrays = np.frombuffer(data, np.float64, 4*n, at).reshape(4, n)
+        self._bolts.setBolts(arrays[0], arrays[1], arrays[2], arrays[3],
+            np.frombuffer(data, np.int8, n, own))
+
+    def _moveShip(self, inputs):
+        """
+        Moves each ship left or right, but never offscreen
+
+        Parameter inputs: the keys held down by the players
+        Precondition: inputs is an int combining INPUT flags for each ship
+        """
+        for i in range(len(self._shipX)):
+            self._prevShipX[i] = self._shipX[i]
+            if self._shipAlive[i]:
+                self._shipX[i] = moveShipX(self._shipX[i], inputs >> (i*INPUT_BITS))
+
+    def _moveAliens(self):
+        """
+        Marches the aliens one step once self._speed seconds have passed
+
+        The aliens move down when the rightmost alien reaches the right edge while
+        moving right, or the leftmost alien reaches the left edge while moving left.
+        Otherwise they move left or right depending on self.rt.  Any time left over
+        past self._speed counts toward the next step, so the steps do not drift.
+        """
+        if self._time <= self._speed:
+            return
+        edges = self._aliens.edges()
+        if edges is None:
+            return
+        left, right = edges
+        if right > (GAME_WIDTH - ALIEN_H_SEP - ALIEN_WIDTH/2) and self.dn == 0:
+            self._aliens.shift(0, -ALIEN_V_WALK)
+            self.rt = not self.rt
+            self.dn = 1
+        elif left < (ALIEN_H_SEP + ALIEN_WIDTH/2) and self.dn == 2:
+            self._aliens.shift(0, -ALIEN_V_WALK)
+            self.rt = not self.rt
+            self.dn = 1
+        elif self.rt:
+            self._aliens.shift(ALIEN_H_WALK, 0)
+            self.dn = 0
+        else:
+            self._aliens.shift(-ALIEN_H_WALK, 0)
+            self.dn = 2
+        self._time -= self._speed
+        self.alienSteps += 1
+        self.events |= EVENT_MARCH
+
+    def _fireShip(self, inputs):
+        """
+        Fires a bolt from each ship with INPUT_FIRE held down
+
+        Each ship can only have one bolt on screen at a time.
+
+        Parameter inputs: the keys held down by the players
+        Precondition: inputs is an int combining INPUT flags for each ship
+        """
+        for i in range(len(self._shipX)):
+            if not ((inputs >> (i*INPUT_BITS)) & INPUT_FIRE) or not self._shipAlive[i]:
+                continue
+            if self._bolts.owned(OWNER_SHIP+i) > 0:
+                continue
+            self._bolts.add(self._shipX[i], SHIP_BOTTOM + SHIP_HEIGHT/2, BOLT_SPEED,
+                OWNER_SHIP+i)
+            self.events |= EVENT_SHIP_FIRE
+
+    def _fireAlien(self):
+        """
+        Fires a bolt from the bottom alien of a random column
+
+        A bolt is fired when the aliens have taken self.boltFire steps since the
+        last alien bolt.
+        """
+        if self.alienSteps != self.boltFire:
+            return
+        c = self._aliens.randomColumn(self._rng)
+        if c is None:
+            return
+        r = self._aliens.columnBottom(c)
+        x, y = self._aliens.getPos(r, c)
+        self._bolts.add(x, y, -BOLT_SPEED, OWNER_ALIEN)
+        self.alienSteps = 0
+        self.boltFire = 0
+        self.events |= EVENT_ALIEN_FIRE
+
+    def _moveBolts(self):
+        """
+        Moves all the bolts depending on their velocity
+        """
+        self._bolts.move()
+
+    def _delBolts(self):
+        """
+        Removes the bolts that have gone offscreen
+        """
+        self._bolts.cull(-BOLT_HEIGHT/2, GAME_HEIGHT + BOLT_HEIGHT/2)
+
+    def _collideBoltAlien(self):
+        """
+        Checks whether a player bolt hit an alien
+
+        The alien hit is removed along with the bolt.  An alien in the top two rows
+        is worth 20 points, and any other alien is worth 10.  At most one alien is
+        hit per step.
+        """
+        bolts = self._bolts
+        for i in range(len(self._shipX)):
+            for k in bolts.find(OWNER_SHIP+i):
+                cell = self._aliens.hit(float(bolts.x[k]), float(bolts.y[k]))
+                if cell is None:
+                    continue
+                r, c = cell
+                rows = self._aliens.rows
+                if rows/(r+1) >= rows/2:
+                    self.score += 20
+                else:
+                    self.score += 10
+                self._aliens.kill(r, c)
+                bolts.remove(int(k))
+                self.events |= EVENT_ALIEN_HIT
+                return
+
+    def _collideBoltShip(self):
+        """
+        Checks whether an alien bolt hit a ship
+
+        The ship is removed along with the bolt, and the players lose a life. The
+        wave is finished when there are no lives left.
+        """
+        for i in range(len(self._shipX)):
+            if not self._shipAlive[i] or self._lives == 0:
+                continue
+            k = self._bolts.overlap(self._shipX[i], SHIP_BOTTOM, SHIP_WIDTH,
+                SHIP_HEIGHT, OWNER_ALIEN)
+            if k < 0:
+                continue
+            self._shipAlive[i] = False
+            self._bolts.remove(k)
+            self._lives -= 1
+            if self._lives == 0:
+                self.isFinish = True
+            self.events |= EVENT_SHIP_HIT
+
+    def _checkWin(self):
+        """
+        Finishes the wave as a win if there are no aliens left
+        """
+        if self._aliens.count() > 0:
+            return
+        self.isFinish = True
+        self.isWin = True
+
+    def _checkPass(self):
+        """
+        Finishes the wave if the bottom of any alien reaches the defense line
+        """
+        y = self._aliens.bottom()
+        if not y is None and y - ALIEN_HEIGHT/2 <= DEFENSE_LINE:
+            self.isFinish = True
+
+
+def moveShipX(x, inputs):
+    """
+    Returns the x coordinate of a ship at x after one step with the given input
+
+    The ship moves SHIP_MOVEMENT pixels left or right, but never offscreen.  This is
+    the rule used by WaveSim, so a client can use it to guess where its ship is
+    before the server says so.
+
+    Parameter x: the x coordinate of the center of the ship
+    Precondition: x is an int or float
+
+    Parameter inputs: the keys held down for the ship
+    Precondition: inputs is an int combining INPUT flags
+    """
+    new = x
+    if inputs & INPUT_LEFT:
+        new -= SHIP_MOVEMENT
+    if inputs & INPUT_RIGHT:
+        new += SHIP_MOVEMENT
+    if new > (GAME_WIDTH - (SHIP_WIDTH/2)) or new < SHIP_WIDTH/2:
+        return x
+    return new
+
+
+def _overlaps(x, y, w, h, bx, by):
+    """
+    Returns True if a corner of the bolt at (bx, by) is strictly inside a box
+
+    The box is w x h and centered at (x, y).
+
+    Parameter x: the x coordinate of the center of the box
+    Precondition: x is an int or float
+
+    Parameter y: the y coordinate of the center of the box
+    Precondition: y is an int or float
+
+    Parameter w: the width of the box
+    Precondition: w is an int or float > 0
+
+    Parameter h: the height of the box
+    Precondition: h is an int or float > 0
+
+    Parameter bx: the x coordinate of the center of the bolt
+    Precondition: bx is an int or float
+
+    Parameter by: the y coordinate of the center of the bolt
+    Precondition: by is an int or float
+    """
+    for px in (bx - BOLT_WIDTH/2, bx + BOLT_WIDTH/2):
+        for py in (by - BOLT_HEIGHT/2, by + BOLT_HEIGHT/2):
+            if abs(px - x) < w/2 and abs(py - y) < h/2:
+                return True
+    return False
+
+
+def _snapshotLayout(rows, cols, bolts):
+    """
+    Returns the offsets of the parts of a snapshot and its size in bytes
+
+    The result is the tuple (random number generator, ships, live columns, alive
+    array, bolt positions, bolt owners, size).  Each part starts on a multiple of 8
+    bytes.
+
+    Parameter rows: the number of rows of aliens
+    Precondition: rows is an int > 0
+
+    Parameter cols: the number of aliens per row
+    Precondition: cols is an int > 0
+
+    Parameter bolts: the number of bolts on screen
+    Precondition: bolts is an int >= 0
+    """
+    mt = _align(_SNAPSHOT.size)
+    sh = _align(mt + 4*_MT_SIZE)
+    cl = _align(sh + 17*MAX_SHIPS)
+    al = _align(cl + 2*cols)
+    at = _align(al + rows*cols)
+    own = at + 8*4*bolts
+    return (mt, sh, cl, al, at, own, _align(own + bolts))
+
+
+def _align(n):
+    """
+    Returns the smallest multiple of 8 that is at least n
+
+    Parameter n: a number of bytes
+    Precondition: n is an int >= 0
+    """
+    return (n + 7)//8*8
+
+
+def _cells(lo, hi, n):
+    """
+    Returns the grid cells, in order, that contain the grid coordinates lo and hi
+
+    A grid coordinate is a position divided by the distance between slots, so its
+    whole part is the cell it falls in.  Cells outside of 0..n-1 are left out.
+
+    Parameter lo: the smaller grid coordinate
+    Precondition: lo is an int or float
+
+    Parameter hi: the larger grid coordinate
+    Precondition: hi is an int or float >= lo
+
+    Parameter n: the number of cells
+    Precondition: n is an int > 0
+    """
+    a = math.floor(lo)
+    b = math.floor(hi)
+    return [k for k in ((a,) if a == b else (a, b)) if 0 <= k < n]
@@ -0,0 +1,432 @@
+"""
+Spectator stream module for Alien Invaders
+
+This module turns a wave into a stream of small frames for spectators.  Most of the
+state of a wave does not change from one step to the next: the formation only moves
+when the aliens march, at most one alien dies, and the score and lives rarely
+change.  So most frames are deltas, which only hold the fields that differ from the
+last keyframe.  A keyframe, with the whole state, is sent every keyEvery frames.
+
+Since a delta is taken against the last keyframe and not the frame before it, a
+spectator only needs the last keyframe and the latest delta.  One that joins late
+or loses a delta is right again at the next frame it gets.  Each delta names the
+keyframe it was taken against, so one that loses a keyframe gets no state from the
+deltas after it, instead of a wrong one, until the next keyframe comes.
+
+A keyframe is 'K' and the fields of _KEY, then the ships, the alive array as bits
+and the bolts.  A delta is 'D', the frame number, the frame number of its keyframe
+and a set of CHANGED bits, then the new value of each field whose bit is set:
+
+    CHANGED_SCORE    the score                 [int32]
+    CHANGED_LIVES    the lives left            [uint8]
+    CHANGED_FLAGS    whether won and finished  [uint8]
+    CHANGED_ORIGIN   the offset of the formation  [2 float64]
+    CHANGED_SHIPS    the x and alive of each ship [float32, uint8 each]
+    CHANGED_ALIVE    the aliens that changed since the keyframe [uint8 count,
+                     then a uint16 index into the alive array for each]
+    CHANGED_BOLTS    the bolts [uint8 count, then int16 x, int16 y, int8 owner each]
+
+The function benchmark plays a wave and compares the stream with sending the whole
+state every step.  The module can also be run as a script to print the comparison.
+The stream is less than half the bytes, and takes no more CPU time per step.
+"""
+from consts import *
+from sim import *
+import numpy as np
+import struct
+import time
+
+
+# The number of frames from one keyframe to the next
+KEYFRAME_EVERY = TICK_RATE
+
+# The bits of a delta for the fields that changed
+CHANGED_SCORE = 1
+CHANGED_LIVES = 2
+CHANGED_FLAGS = 4
+CHANGED_ORIGIN = 8
+CHANGED_SHIPS = 16
+CHANGED_ALIVE = 32
+CHANGED_BOLTS = 64
+
+# The layout of one bolt in a frame, also used by the states of server.py
+BOLT_LAYOUT = np.dtype([('x', '<i2'), ('y', '<i2'), ('owner', 'i1')])
+
+# The layouts of the parts of a frame (see the module docstring)
+_KEY = struct.Struct('<cIHHiBBddBB')
+_DELTA = struct.Struct('<cIIB')
+_SCORE = struct.Struct('<i')
+_BYTE = struct.Struct('<B')
+_ORIGIN = struct.Struct('<dd')
+_SHIP = np.dtype([('x', '<f4'), ('alive', 'u1')])
+_SHIP_PACK = struct.Struct('<fB')
+# The bits of the flags field
+_FLAG_WIN = 1
+_FLAG_FINISH = 2
+# The most bolts and changed aliens in a frame, so that a count fits in a byte
+_MAX_COUNT = 255
+
+
+def packBolts(bank, n):
+    """
+    Returns the first n bolts of bank packed as BOLT_LAYOUT, as bytes
+
+    The positions are rounded to whole pixels.
+
+    Parameter bank: the bolts
+    Precondition: bank is a BoltBank
+
+    Parameter n: the number of bolts to pack
+    Precondition: n is an int, 0 <= n <= bank.count
+    """
+    bolts = np.empty(n, dtype=BOLT_LAYOUT)
+    bolts['x'] = np.rint(bank.x[:n])
+    bolts['y'] = np.rint(bank.y[:n])
+    bolts['owner'] = bank.owner[:n]
+    return bolts.tobytes()
+
+
+def unpackBolts(data, pos, n):
+    """
+    Returns the n bolts packed in data at pos, as a list of (x, y, owner) tuples
+
+    Parameter data: a message with bolts made by packBolts
+    Precondition: data is a bytes-like object
+
+    Parameter pos: where the bolts start
+    Precondition: pos is an int >= 0
+
+    Parameter n: the number of bolts
+    Precondition: n is an int >= 0
+    """
+    return np.frombuffer(data, BOLT_LAYOUT, n, pos).tolist()
+
+
+class StreamEncoder(object):
+    """
+    A class to turn the steps of a wave into keyframes and deltas.
+
+    Call encode once per step.  The state of the last keyframe is kept as plain
+    values and bytes, so a delta is made by comparing a few numbers and strings of
+    bytes.
+
+    INSTANCE ATTRIBUTES:
+        keyEvery: the number of frames from one keyframe to the next [int > 0]
+        frame:    the number of frames encoded so far [int >= 0]
+        _key:     the fields of the last keyframe, or None if there is none yet
+                  [tuple (score, lives, flags, origin, ships, alive, bolts)]
+        _keyAt:   the frame number of the last keyframe [int >= 0]
+        _alive:   the alive array of the last delta and its CHANGED_ALIVE part, since
+                  the aliens rarely change from one frame to the next
+                  [tuple (bytes, bytes or None)]
+    """
+
+    def __init__(self, keyEvery=KEYFRAME_EVERY):
+        """
+        Initializes an encoder whose first frame is a keyframe.
+
+        Parameter keyEvery: the number of frames from one keyframe to the next
+        Precondition: keyEvery is an int > 0
+        """
+        assert type(keyEvery) == int and keyEvery > 0
+        self.keyEvery = keyEvery
+        self.frame = 0
+        self._key = None
+        self._keyAt = 0
+        self._alive = (None, None)
+
+    def encode(self, sim, key=False):
+        """
+        Returns the next frame for the wave sim, as bytes
+
+        The frame is a keyframe every keyEvery frames, or if key is True.
+
+        Parameter sim: the wave to send
+        Precondition: sim is a WaveSim
+
+        Parameter key: whether to send a keyframe now
+        Precondition: key is a bool
+        """
+        fields = _fields(sim)
+        frame = self.frame
+        self.frame += 1
+        if key or self._key is None or frame % self.keyEvery == 0:
+            self._key = fields
+            self._keyAt = frame
+            self._alive = (None, None)
+            return encodeKeyframe(frame, sim.getAliens(), fields)
+        score, lives, flags, origin, ships, alive, bolts = fields
+        kscore, klives, kflags, korigin, kships, kalive, kbolts = self._key
+        changed = 0
+        parts = []
+        if score != kscore:
+            changed |= CHANGED_SCORE
+            parts.append(_SCORE.pack(score))
+        if lives != klives:
+            changed |= CHANGED_LIVES
+            parts.append(_BYTE.pack(lives))
+        if flags != kflags:
+            changed |= CHANGED_FLAGS
+            parts.append(_BYTE.pack(flags))
+        if origin != korigin:
+            changed |= CHANGED_ORIGIN
+            parts.append(_ORIGIN.pack(*origin))
+        if ships != kships:
+            changed |= CHANGED_SHIPS
+            parts.append(ships)
+        if alive != kalive:
+            if alive != self._alive[0]:
+                self._alive = (alive, _flipped(alive, kalive))
+            if self._alive[1] is None:
+                self._key = fields
+                self._keyAt = frame
+                self._alive = (None, None)
+                return encodeKeyframe(frame, sim.getAliens(), fields)
+            changed |= CHANGED_ALIVE
+            parts.append(self._alive[1])
+        if bolts != kbolts:
+            changed |= CHANGED_BOLTS
+            parts.append(_BYTE.pack(len(bolts)//BOLT_LAYOUT.itemsize) + bolts)
+        return _DELTA.pack(b'D', frame, self._keyAt, changed) + b''.join(parts)
+
+
+class StreamDecoder(object):
+    """
+    A class to turn keyframes and deltas back into the state of a wave.
+
+    INSTANCE ATTRIBUTES:
+        state:  the state of the last frame decoded, or None [dict, see decode]
+        _key:   the state of the last keyframe, or None if there is none yet [dict]
+        _alive: the CHANGED_ALIVE part of the last delta and its alive array
+                [tuple (bytes, bool array) or (None, None)]
+    """
+
+    def __init__(self):
+        """
+        Initializes a decoder that waits for a keyframe.
+        """
+        self.state = None
+        self._key = None
+        self._alive = (None, None)
+
+    def decode(self, data):
+        """
+        Returns the state in the frame data, or None if it is a delta whose keyframe
+        has not come
+
+        The state is a dictionary with the keys frame, rows, cols, score, lives,
+        win, finish, origin (a pair of floats), ships (a list of (x, alive) pairs),
+        alive (a bool array of rows x cols) and bolts (a list of (x, y, owner)
+        tuples).  The dictionary should not be modified.
+
+        Parameter data: a frame made by StreamEncoder
+        Precondition: data is a bytes-like object
+        """
+        kind = data[:1]
+        if kind == b'K':
+            self._key = decodeKeyframe(data)
+            self._alive = (None, None)
+            self.state = self._key
+            return self.state
+        if kind != b'D':
+            raise ValueError('data is not a stream frame')
+        kind, frame, keyAt, changed = _DELTA.unpack_from(data, 0)
+        if self._key is None or self._key['frame'] != keyAt:
+            return None
+        state = dict(self._key)
+        state['frame'] = frame
+        pos = _DELTA.size
+        if changed & CHANGED_SCORE:
+            state['score'], = _SCORE.unpack_from(data, pos)
+            pos += _SCORE.size
+        if changed & CHANGED_LIVES:
+            state['lives'], = _BYTE.unpack_from(data, pos)
+            pos += _BYTE.size
+        if changed & CHANGED_FLAGS:
+            flags, = _BYTE.unpack_from(data, pos)
+            state['win'] = bool(flags & _FLAG_WIN)
+            state['finish'] = bool(flags & _FLAG_FINISH)
+            pos += _BYTE.size
+        if changed & CHANGED_ORIGIN:
+            state['origin'] = _ORIGIN.unpack_from(data, pos)
+            pos += _ORIGIN.size
+        if changed & CHANGED_SHIPS:
+            n = len(self._key['ships'])
+            state['ships'] = _ships(data, pos, n)
+            pos += n*_SHIP.itemsize
+        if changed & CHANGED_ALIVE:
+            n, = _BYTE.unpack_from(data, pos)
+            part = bytes(data[pos:pos + 1 + 2*n])
+            if part != self._alive[0]:
+                alive = self._key['alive'].copy()
+                alive.reshape(-1)[np.frombuffer(part, '<u2', n, 1)] ^= True
+                self._alive = (part, alive)
+            state['alive'] = self._alive[1]
+            pos += 1 + 2*n
+        if changed & CHANGED_BOLTS:
+            n, = _BYTE.unpack_from(data, pos)
+            state['bolts'] = unpackBolts(data, pos + 1, n)
+            pos += 1 + n*BOLT_LAYOUT.itemsize
+        self.state = state
+        return state
+
+
+def encodeKeyframe(frame, aliens, fields):
+    """
+    Returns a keyframe with the given fields, as bytes
+
+    Parameter frame: the number of the frame
+    Precondition: frame is an int >= 0
+
+    Parameter aliens: the formation of the wave
+    Precondition: aliens is a Formation
+
+    Parameter fields: the state of the wave, made by _fields
+    Precondition: fields is a tuple (score, lives, flags, origin, ships, alive, bolts)
+    """
+    score, lives, flags, origin, ships, alive, bolts = fields
+    return (_KEY.pack(b'K', frame, aliens.rows, aliens.cols, score, lives, flags,
+        origin[0], origin[1], len(ships)//_SHIP.itemsize,
+        len(bolts)//BOLT_LAYOUT.itemsize) +
+        ships + np.packbits(np.frombuffer(alive, bool)).tobytes() + bolts)
+
+
+def decodeKeyframe(data):
+    """
+    Returns the state in the keyframe data (see StreamDecoder.decode)
+
+    Parameter data: a keyframe
+    Precondition: data is a bytes-like object made by encodeKeyframe
+    """
+    kind, frame, rows, cols, score, lives, flags, ox, oy, ships, n = \
+        _KEY.unpack_from(data, 0)
+    pos = _KEY.size
+    shipList = _ships(data, pos, ships)
+    pos += ships*_SHIP.itemsize
+    size = (rows*cols + 7)//8
+    bits = np.frombuffer(data, np.uint8, size, pos)
+    alive = np.unpackbits(bits)[:rows*cols].astype(bool).reshape(rows, cols)
+    pos += size
+    return {'frame': frame, 'rows': rows, 'cols': cols, 'score': score,
+        'lives': lives, 'win': bool(flags & _FLAG_WIN),
+        'finish': bool(flags & _FLAG_FINISH), 'origin': (ox, oy), 'ships': shipList,
+        'alive': alive, 'bolts': unpackBolts(data, pos, n)}
+
+
+def benchmark(ticks=60*TICK_RATE, seed=0, keyEvery=KEYFRAME_EVERY):
+    """
+    Returns a comparison of the stream with sending a keyframe every step
+
+    A wave is played by the tracker bot of batch.py for the given number of steps
+    (or until it is finished), and each step is encoded both ways and decoded.  The
+    result is a dictionary with the keys
+
+        ticks, streamBytes, fullBytes, streamRate, fullRate, streamCPU, fullCPU
+
+    where the rates are bytes per second of play and the CPU times are the seconds
+    spent encoding and decoding one step.
+
+    Parameter ticks: the most steps to play
+    Precondition: ticks is an int > 0
+
+    Parameter seed: the seed of the wave
+    Precondition: seed is an int >= 0
+
+    Parameter keyEvery: the number of frames from one keyframe to the next
+    Precondition: keyEvery is an int > 0
+    """
+    import batch
+    import random
+    sim = WaveSim(seed)
+    rng = random.Random(seed)
+    stream = StreamEncoder(keyEvery)
+    full = StreamEncoder(1)
+    streamIn = StreamDecoder()
+    fullIn = StreamDecoder()
+    streamBytes = fullBytes = 0
+    streamCPU = fullCPU = 0.0
+    flags = 0
+    n = 0
+    while n < ticks and not sim.getFinish():
+        if not sim.hasShip():
+            sim.createShip()
+        flags = batch.trackerBot(sim, rng, flags)
+        sim.step(flags, 1.0/TICK_RATE)
+        n += 1
+        start = time.perf_counter()
+        data = stream.encode(sim)
+        streamIn.decode(data)
+        middle = time.perf_counter()
+        key = full.encode(sim)
+        fullIn.decode(key)
+        end = time.perf_counter()
+        streamBytes += len(data)
+        fullBytes += len(key)
+        streamCPU += middle - start
+        fullCPU += end - middle
+    seconds = n/TICK_RATE
+    return {'ticks': n, 'streamBytes': streamBytes, 'fullBytes': fullBytes,
+        'streamRate': streamBytes/seconds, 'fullRate': fullBytes/seconds,
+        'streamCPU': streamCPU/n, 'fullCPU': fullCPU/n}
+
+
+def _fields(sim):
+    """
+    Returns the state of the wave sim as the tuple of fields kept by StreamEncoder
+
+    The tuple is (score, lives, flags, origin, ships, alive, bolts), where ships,
+    alive and bolts are already packed as bytes, so that comparing them is cheap.
+    At most 255 bolts are kept.
+
+    Parameter sim: the wave
+    Precondition: sim is a WaveSim
+    """
+    aliens = sim.getAliens()
+    flags = (_FLAG_WIN if sim.getWin() else 0) | (_FLAG_FINISH if sim.getFinish() else 0)
+    ships = b''.join([_SHIP_PACK.pack(sim.getShipX(i), sim.hasShip(i))
+        for i in range(sim.getShips())])
+    bank = sim.getBolts()
+    return (sim.getScore(), sim.getLives(), flags, aliens.getOrigin(),
+        ships, aliens.alive.tobytes(), packBolts(bank, min(bank.count, _MAX_COUNT)))
+
+
+def _flipped(alive, kalive):
+    """
+    Returns the CHANGED_ALIVE part of a delta, or None if too many aliens changed
+
+    Parameter alive: the alive array of the frame
+    Precondition: alive is the bytes of a flattened bool array
+
+    Parameter kalive: the alive array of the keyframe
+    Precondition: kalive is the bytes of a flattened bool array the size of alive
+    """
+    where = np.flatnonzero(np.frombuffer(alive, bool) != np.frombuffer(kalive, bool))
+    if len(where) > _MAX_COUNT:
+        return None
+    return _BYTE.pack(len(where)) + where.astype('<u2').tobytes()
+
+
+def _ships(data, pos, n):
+    """
+    Returns the n ships packed in data at pos, as a list of (x, alive) pairs
+
+    Parameter data: a frame
+    Precondition: data is a bytes-like object
+
+    Parameter pos: where the ships start
+    Precondition: pos is an int >= 0
+
+    Parameter n: the number of ships
+    Precondition: n is an int >= 0
+    """
+    ships = np.frombuffer(data, _SHIP, n, pos)
+    return [(x, bool(alive)) for x, alive in ships.tolist()]
+
+
+if __name__ == '__main__':
+    result = benchmark()
+    print('%d steps' % result['ticks'])
+    print('stream: %8.0f bytes per second, %6.1f us per step' % (result['streamRate'],
+        result['streamCPU']*1e6))
+    print('full:   %8.0f bytes per second, %6.1f us per step' % (result['fullRate'],
+        result['fullCPU']*1e6))
@@ -0,0 +1,13 @@
+"""
+Test configuration for Alien Invaders
+
+The modules of the game live at the top of the repository and import each other by
+name, so the repository is put first on the path.  consts.py reads the command line
+to change the size of the formation, so the arguments given to pytest are hidden
+from it.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.argv = sys.argv[:1]
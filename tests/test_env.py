@@ -0,0 +1,82 @@
+"""
+Tests for the vectorized environment of env.py
+
+Every wave of a VecWaveEnv must play exactly like a WaveSim with the same seed,
+settings and inputs, so the environment is checked against WaveSim objects stepped
+one at a time in the same way.
+"""
+from consts import *
+from sim import WaveSim
+from env import VecWaveEnv
+import numpy as np
+import random
+
+
+def checkWave(obs, k, sim):
+    """
+    Checks that row k of the observation arrays matches the state of sim
+    """
+    aliens = sim.getAliens()
+    assert tuple(obs['ship'][k]) == (np.float32(sim.getShipX()), sim.hasShip())
+    assert obs['lives'][k] == sim.getLives()
+    assert tuple(obs['origin'][k]) == tuple(np.float32(aliens.getOrigin()))
+    assert (obs['alive'][k] == aliens.alive).all()
+    bank = sim.getBolts()
+    n = min(bank.count, obs['bolts'].shape[1])
+    assert obs['nbolts'][k] == n
+    assert (obs['bolts'][k, n:] == 0).all()
+    want = np.stack([bank.x[:n], bank.y[:n], bank.vy[:n], bank.owner[:n]], axis=1)
+    assert (obs['bolts'][k, :n] == want.astype(np.float32)).all()
+
+
+def playAlong(env, settings, seed, steps, actions):
+    """
+    Steps env and a WaveSim for each of its waves with the same random actions
+
+    The WaveSim objects are stepped the way the environment describes, and each
+    step is checked against them.  This function returns the number of waves
+    finished.
+    """
+    obs = env.reset(seed)
+    sims = [WaveSim(s, *settings) for s in env.getSeeds()]
+    for k in range(env.num):
+        checkWave(obs, k, sims[k])
+    rng = random.Random(seed)
+    finished = 0
+    for t in range(steps):
+        flags = [rng.choice(actions) for k in range(env.num)]
+        obs, rewards, dones, infos = env.step(flags)
+        for k in range(env.num):
+            sim = sims[k]
+            score = sim.getScore()
+            lives = sim.getLives()
+            n = 0
+            while n < env.repeat and not sim.getFinish():
+                if not sim.hasShip():
+                    sim.createShip()
+                sim.step(flags[k], 1.0/TICK_RATE)
+                n += 1
+            reward = (sim.getScore() - score) - env.lifePenalty*(lives - sim.getLives())
+            assert rewards[k] == reward
+            assert dones[k] == sim.getFinish()
+            if dones[k]:
+                assert infos[k]['win'] == sim.getWin()
+                assert infos[k]['score'] == sim.getScore()
+                sims[k] = WaveSim(env.getSeeds()[k], *settings)
+                finished += 1
+            checkWave(obs, k, sims[k])
+    return finished
+
+
+def test_env_matches_wavesim():
+    settings = (4, 8, 0.05, 2)
+    env = VecWaveEnv(12, *settings, repeat=2)
+    assert playAlong(env, settings, 7, 800, range(8)) > 0
+
+
+def test_bolt_slots_grow():
+    settings = (2, 4, 0.01, 1)
+    env = VecWaveEnv(3, *settings, maxBolts=8)
+    assert playAlong(env, settings, 1, 300, [INPUT_FIRE, INPUT_LEFT, INPUT_RIGHT]) > 0
+    assert env.getObservation()['nbolts'].max() == 8
+    assert env._used.shape[1] > 8
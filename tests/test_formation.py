@@ -0,0 +1,86 @@
+"""
+Tests for the Formation class of sim.py
+
+The occupancy index and the grid arithmetic of hit are checked against a brute-force
+scan of every alien, over random kills, shifts and bolts.
+"""
+from consts import *
+from sim import Formation, _overlaps
+import random
+
+
+def bruteHit(aliens, bx, by):
+    """
+    Returns the (row, column) of the first live alien hit by the bolt, or None
+
+    Every alien is checked, in order of row and then column.
+    """
+    for r in range(aliens.rows):
+        for c in range(aliens.cols):
+            if aliens.alive[r, c]:
+                x, y = aliens.getPos(r, c)
+                if _overlaps(x, y, ALIEN_WIDTH, ALIEN_HEIGHT, bx, by):
+                    return (r, c)
+    return None
+
+
+def checkIndex(aliens):
+    """
+    Checks count, edges, columnBottom, bottomRow and getColumns against a scan
+    """
+    live = [(r, c) for r in range(aliens.rows) for c in range(aliens.cols)
+        if aliens.alive[r, c]]
+    assert aliens.count() == len(live)
+    if not live:
+        assert aliens.edges() is None
+        assert aliens.bottomRow() is None
+    else:
+        cols = [c for r, c in live]
+        assert aliens.edges() == (aliens.getPos(0, min(cols))[0],
+            aliens.getPos(0, max(cols))[0])
+        assert aliens.bottomRow() == max(r for r, c in live)
+    for c in range(aliens.cols):
+        rows = [r for r, k in live if k == c]
+        assert aliens.columnBottom(c) == (max(rows) if rows else None)
+    assert sorted(aliens.getColumns()) == sorted(set(c for r, c in live))
+
+
+def test_hit_matches_scan():
+    rng = random.Random(5)
+    for trial in range(40):
+        aliens = Formation(rng.randint(1, 8), rng.randint(1, 15))
+        aliens.shift(rng.uniform(-50, 50), rng.uniform(-200, 50))
+        for k in range(aliens.rows*aliens.cols):
+            if rng.random() < 0.3:
+                aliens.kill(rng.randrange(aliens.rows), rng.randrange(aliens.cols))
+            left, top = aliens.getPos(0, 0)
+            right, bottom = aliens.getPos(aliens.rows-1, aliens.cols-1)
+            for b in range(20):
+                bx = rng.uniform(left - ALIEN_WIDTH, right + ALIEN_WIDTH)
+                by = rng.uniform(bottom - ALIEN_HEIGHT, top + ALIEN_HEIGHT)
+                assert aliens.hit(bx, by) == bruteHit(aliens, bx, by)
+
+
+def test_index_matches_scan():
+    rng = random.Random(7)
+    for trial in range(40):
+        aliens = Formation(rng.randint(1, 8), rng.randint(1, 15))
+        checkIndex(aliens)
+        cells = [(r, c) for r in range(aliens.rows) for c in range(aliens.cols)]
+        rng.shuffle(cells)
+        for r, c in cells:
+            aliens.kill(r, c)
+            aliens.kill(r, c)
+            checkIndex(aliens)
+
+
+def test_setState_rebuilds_index():
+    rng = random.Random(9)
+    for trial in range(40):
+        aliens = Formation(rng.randint(1, 8), rng.randint(1, 15))
+        for k in range(rng.randrange(aliens.rows*aliens.cols + 1)):
+            aliens.kill(rng.randrange(aliens.rows), rng.randrange(aliens.cols))
+        copy = Formation(aliens.rows, aliens.cols)
+        copy.setState(aliens.alive.copy(), aliens.getColumns())
+        checkIndex(copy)
+        assert copy.getColumns() == aliens.getColumns()
@@ -0,0 +1,92 @@
+"""
+Tests for the rasterizer of raster.py
+
+The frames drawn with index arrays must match frames drawn the plain way, one
+object at a time with a slice of the frame for each.
+"""
+from consts import *
+from sim import WaveSim
+from raster import Rasterizer, loadImage, LINE_WIDTH
+import numpy as np
+import random
+
+
+def scaled(name, width, height):
+    """
+    Returns the image name scaled to width x height as uint16, nearest pixel
+    """
+    pixels = loadImage(name)
+    rows = (np.arange(height)*pixels.shape[0])//height
+    cols = (np.arange(width)*pixels.shape[1])//width
+    return pixels[rows][:, cols].astype(np.uint16)
+
+
+def blit(frame, image, left, top):
+    """
+    Blends image into frame with its top left corner at (left, top)
+    """
+    h, w = image.shape[:2]
+    x0, y0 = max(left, 0), max(top, 0)
+    x1, y1 = min(left + w, frame.shape[1]), min(top + h, frame.shape[0])
+    if x0 >= x1 or y0 >= y1:
+        return
+    part = image[y0-top:y1-top, x0-left:x1-left]
+    alpha = part[:, :, 3:]
+    dst = frame[y0:y1, x0:x1]
+    dst[:] = (dst*(255 - alpha) + part[:, :, :3]*alpha + 127)//255
+
+
+def drawPlain(scale, sim):
+    """
+    Returns the frame of sim at the given scale, drawn one object at a time
+    """
+    size = lambda n: max(1, int(round(n/scale)))
+    col = lambda x: int(round(x/scale))
+    row = lambda y: int(round((GAME_HEIGHT - y)/scale))
+    frame = np.full((GAME_HEIGHT//scale, GAME_WIDTH//scale, 3), 255, dtype=np.uint8)
+    top = row(DEFENSE_LINE + LINE_WIDTH/2)
+    frame[top:top + max(1, LINE_WIDTH//scale)] = 0
+    aliens = sim.getAliens()
+    for r, c in zip(*np.nonzero(aliens.alive)):
+        image = scaled(aliens.getImage(r), size(ALIEN_WIDTH), size(ALIEN_HEIGHT))
+        x, y = aliens.getPos(r, c)
+        blit(frame, image, col(x) - image.shape[1]//2, row(y) - image.shape[0]//2)
+    for i in range(sim.getShips()):
+        if sim.hasShip(i):
+            image = scaled(SHIP_IMAGE, size(SHIP_WIDTH), size(SHIP_HEIGHT))
+            blit(frame, image, col(sim.getShipX(i)) - image.shape[1]//2,
+                row(SHIP_BOTTOM) - image.shape[0]//2)
+    bank = sim.getBolts()
+    w, h = size(BOLT_WIDTH), size(BOLT_HEIGHT)
+    for x, y in zip(bank.x[:bank.count], bank.y[:bank.count]):
+        left, top = col(x - BOLT_WIDTH/2), row(y + BOLT_HEIGHT/2)
+        frame[max(top, 0):max(top + h, 0), max(left, 0):max(left + w, 0)] = 0
+    return frame
+
+
+def play(seed, ticks):
+    """
+    Returns a wave played with random input for ticks steps
+    """
+    ships = 1 + seed % 2
+    sim = WaveSim(seed, 3 + seed % 4, 4 + seed % 9, 0.02, 1, ships=ships)
+    rng = random.Random(seed)
+    for t in range(ticks):
+        if sim.getFinish():
+            break
+        for i in range(ships):
+            if not sim.hasShip(i):
+                sim.createShip(i)
+        sim.step(rng.randrange(1 << (INPUT_BITS*ships)), 1.0/TICK_RATE)
+    return sim
+
+
+def test_batch_matches_plain():
+    sims = [play(seed, seed*61 % 700) for seed in range(8)]
+    for scale in (1, 3, 60):
+        raster = Rasterizer(scale)
+        frames = raster.renderBatch(sims)
+        for k in range(len(sims)):
+            plain = drawPlain(scale, sims[k])
+            assert (frames[k] == plain).all()
+            assert (raster.render(sims[k]) == plain).all()
@@ -0,0 +1,47 @@
+"""
+Tests for the recording and replay of replay.py
+
+A wave played with random input is recorded, saved, loaded and played back, and
+must end in exactly the same state.
+"""
+from consts import *
+from sim import WaveSim
+from replay import Recorder, Recording, replay
+import random
+
+
+def playRecorded(seed, ticks):
+    """
+    Returns (sim, recorder) for a wave played with random input for ticks steps
+
+    A lost ship is placed again on the next step, as Wave does.
+    """
+    rng = random.Random(seed)
+    sim = WaveSim(seed)
+    recorder = Recorder(sim.getSeed(), TICK_RATE, *sim.getSettings())
+    flags = 0
+    for k in range(ticks):
+        if sim.getFinish():
+            break
+        respawn = 0
+        if not sim.hasShip():
+            sim.createShip()
+            respawn = INPUT_RESPAWN
+        if rng.random() < 0.1:
+            flags = rng.choice([0, INPUT_LEFT, INPUT_RIGHT, INPUT_FIRE,
+                INPUT_LEFT | INPUT_FIRE, INPUT_RIGHT | INPUT_FIRE])
+        recorder.record(flags | respawn)
+        sim.step(flags, 1.0/TICK_RATE)
+    return sim, recorder
+
+
+def test_replay_matches_play(tmp_path):
+    for seed in range(5):
+        sim, recorder = playRecorded(seed, 3000)
+        path = str(tmp_path / ('wave%d.rec' % seed))
+        recorder.save(path)
+        recording = Recording.load(path)
+        assert recording.runs == recorder.getRecording().runs
+        assert recording.getTicks() == recorder.getRecording().getTicks()
+        again = replay(recording)
+        assert again.snapshot() == sim.snapshot()
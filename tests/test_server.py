@@ -0,0 +1,55 @@
+"""
+Tests for the co-op server of server.py
+
+A client that sends inputs faster than the server steps must have the oldest ones
+dropped, be told so, and still predict its ship at the position the server has.
+"""
+from consts import *
+from sim import WaveSim
+from server import *
+import asyncio
+
+
+def test_push_drops_oldest():
+    player = Player(None)
+    for seq in range(1, MAX_PENDING + 4):
+        player.push(seq, INPUT_LEFT)
+    assert len(player.pending) == MAX_PENDING
+    assert player.pending[0][0] == 4
+    assert player.ack == 3
+    assert player.dropped == 3
+
+
+def test_state_round_trip():
+    sim = WaveSim(3, ships=MAX_SHIPS)
+    for t in range(400):
+        if not sim.hasShip():
+            sim.createShip()
+        sim.step(INPUT_FIRE, 1.0/TICK_RATE)
+    data = encodeState(sim, 400, 17, 5)
+    assert len(data) <= stateSize(*sim.getSettings()[:2])
+    state = decodeState(data, *sim.getSettings()[:2])
+    bank = sim.getBolts()
+    assert (state['tick'], state['ack'], state['dropped']) == (400, 17, 5)
+    assert (state['alive'] == sim.getAliens().alive).all()
+    assert state['bolts'] == [(round(bank.x[k]), round(bank.y[k]), bank.owner[k])
+        for k in range(min(bank.count, MAX_SENT_BOLTS))]
+
+
+def test_flooding_client_resyncs():
+    async def play():
+        server = CoopServer()
+        await server.start()
+        client = await CoopClient.connect('flood', port=server.port)
+        sent = 4*MAX_PENDING
+        for k in range(sent):
+            client.send(INPUT_RIGHT)
+        state = await client.receive()
+        while state['ack'] < sent:
+            state = await client.receive()
+        client.close()
+        await server.close()
+        return state, client
+    state, client = asyncio.run(play())
+    assert state['dropped'] > 0
+    assert client.shipX == state['ships'][client.slot][0]
@@ -0,0 +1,66 @@
+"""
+Tests for WaveSim.snapshot and WaveSim.restore
+
+A wave restored from a snapshot must play on exactly like the wave it was taken from,
+whatever the number of bolts on screen.
+"""
+from consts import *
+from sim import WaveSim
+import random
+import pytest
+
+
+def play(sim, rng, ticks):
+    """
+    Steps sim with random input for ticks steps, placing a lost ship again
+    """
+    for k in range(ticks):
+        if sim.getFinish():
+            return
+        if not sim.hasShip():
+            sim.createShip()
+        sim.step(rng.randrange(8), 1.0/TICK_RATE)
+
+
+def test_restore_plays_on_the_same():
+    for seed in range(5):
+        sim = WaveSim(seed)
+        play(sim, random.Random(seed), 600)
+        data = sim.snapshot()
+        assert len(data) == sim.snapshotSize()
+        other = WaveSim(seed + 100)
+        other.restore(bytes(data))
+        assert other.snapshot() == data
+        play(sim, random.Random(1), 1500)
+        play(other, random.Random(1), 1500)
+        assert other.snapshot() == sim.snapshot()
+
+
+def test_snapshot_holds_many_bolts():
+    sim = WaveSim(3)
+    for k in range(3000):
+        sim.getBolts().add(50 + k % 700, 100 + k % 500, BOLT_SPEED, OWNER_ALIEN)
+    out = bytearray(8)
+    data = sim.snapshot(out)
+    assert data is out and len(data) == sim.snapshotSize()
+    other = WaveSim(4)
+    other.restore(data)
+    assert other.getBolts().count == sim.getBolts().count
+    assert other.snapshot() == data
+
+
+def test_restore_rejects_other_waves():
+    data = WaveSim(1).snapshot()
+    with pytest.raises(ValueError):
+        WaveSim(1, rows=ALIEN_ROWS + 1).restore(data)
+    with pytest.raises(ValueError):
+        WaveSim(1).restore(data[:-1])
+
+
+def test_largest_seed():
+    sim = WaveSim(2**64 - 1)
+    other = WaveSim(0)
+    other.restore(sim.snapshot())
+    assert other.getSeed() == 2**64 - 1
+    with pytest.raises(AssertionError):
+        WaveSim(2**64)
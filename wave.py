@@ -6,7 +6,10 @@ Invaders game.  Instances of Wave represent a single wave.  Whenever you move to
 new level, you are expected to make a new instance of the class.
 
 The subcontroller Wave manages the ship, the aliens and any laser bolts on screen.
-These are model objects.  Their classes are defined in models.py.
+These are model objects.  Their classes are defined in models.py.  The rules of the
+wave (marching, firing, collisions, lives and score) live in the class WaveSim in
+sim.py, which does not need Kivy.  Wave steps a WaveSim and moves the model objects
+to match it.
 
 Most of your work on this assignment will be in either this module or models.py.
 Whether a helper method belongs in this module or models.py is often a complicated
@@ -18,7 +21,9 @@ Date 12/2/2018
 from game2d import *
 from consts import *
 from models import *
-import random
+from sim import *
+from replay import Recorder
+import time
 
 
 class Wave(object):
@@ -36,14 +41,25 @@ class Wave(object):
     See subcontrollers.py from Lecture 24 for an example.  This class will be similar
     to than one in how it interacts with the main class Invaders.
 
-    #UPDATE ME LATER
     INSTANCE ATTRIBUTES:
-        _ship:   the player ship to control [Ship]
-        _aliens: the 2d list of aliens in the wave [rectangular 2d list of Alien or None]
+        _sim:    the rules of the wave [WaveSim]
+        _ship:   the player ship to control [Ship, or None if the ship was hit]
+        _block:  the aliens drawn as one mesh, at their grid slots in row-major order,
+                 with the dead ones hidden so that a restored wave can bring them
+                 back, moved together by the offset of the formation [GBatch]
+        _shipModel: the ship object, kept while the ship is gone so that it can be
+                    reused by a new ship [Ship]
         _bolts:  the laser bolts currently on screen [list of Bolt, possibly empty]
+        _pool:   the bolts that can be reused when a new bolt is fired [BoltPool]
         _dline:  the defensive line being protected [GPath]
-        _lives:  the number of lives left  [int >= 0]
-        _time:   The amount of time since the last Alien "step" [number >= 0]
+        _tick:   the length of one simulation step in seconds [float > 0]
+        _acc:    the time not yet simulated [0 <= float < _tick, after update]
+        _recorder: the input of every simulation step so far [Recorder]
+        _respawn:  INPUT_RESPAWN if the next step starts with a new ship, or 0 [int]
+        _steps:    the rest of the work of making the objects of the wave, or None
+                   if they are all made [generator, or None]
+        _sounds:   the sounds of the wave, with the file names as keys, shared with
+                   the other waves so that each file is only loaded once [SoundBank]
 
     As you can see, all of these attributes are hidden.  You may find that you want to
     access an attribute in class Invaders. It is okay if you do, but you MAY NOT ACCESS
@@ -51,84 +67,81 @@ class Wave(object):
     you need to access in Invaders.  Only add the getters and setters that you need for
     Invaders. You can keep everything else hidden.
 
-    You may change any of the attributes above as you see fit. For example, may want to
-    keep track of the score.  You also might want some label objects to display the score
-    and number of lives. If you make changes, please list the changes with the invariants.
-
     LIST MORE ATTRIBUTES (AND THEIR INVARIANTS) HERE IF NECESSARY
-        rt:         Whether the alien is moving right [bool]
-        dn:         Whether the alien had moved down during the last time interval
-                    [0 <= int <= 2]
-        boltFire:   Rate at which a bolt is fired from the alien [0 <= int <= BOLT_RATE]
-        alienSteps: Number of steps taken by the alien before an alien shoots a bolt
-                    [0 <= int <= BOLT_RATE]
-        isWin:      Whether the player has won [bool]
-        isFinish:   Whether the wave is finished [bool]
-        score:      How many aliens you hit [int >= 0]
-        pewShip:    Sound that the Ship makes when it shoots a bolt[Sound object]
-        pewAlien:   Sound that an Alien makes when it shoots a bolt[Sound object]
-        BlastShip:  Sound that the Ship makes when it gets hit by a bolt[Sound object]
-        BlastAlien: Sound that an Alien makes when it gets hit by a bolt[Sound object]
-
     """
 
-    def addTime(self,t):
+    def getSim(self):
         """
-        Adds t to time
+        Returns the simulation that holds the rules of this wave
 
-        This is a helper method to keep track of time.
+        This method returns the WaveSim stepped by this wave.
+        """
+        return self._sim
 
-        Parameter t: The time being added
-        Preconditon: t is an int
+    def getSeed(self):
         """
-        assert type(t) == int or type(t) == float
-        self._time += t
+        Returns the seed of the random choices of this wave
 
-    def getRt(self):
+        A new Wave with this seed, given the same inputs, plays the same way.
         """
-        Returns whether the ship is moving to the right
+        return self._sim.getSeed()
 
-        A getter method that returns self.rt, to tell whether the player is
-        moving to the right(True) or left(False)
+    def getRecorder(self):
         """
-        return self.rt
+        Returns the recorder of the input of this wave
 
-    def setRt(self, t):
+        Use this method to save the wave so that it can be played back with
+        replay.py.
         """
-        Sets self.rt to a boolean
+        return self._recorder
 
-        Sets self.rt to a boolean to see whether the wave is moving to the
-        left(False) or to the right(True)
+    def getPool(self):
+        """
+        Returns the pool of bolts of this wave
 
-        Parameter t: The indicator whether the wave is moving to the left or right
-        Precondition: t is a boolean
+        Use this method to read the allocation counters of the pool.
         """
-        assert type(t) == bool
-        self.rt = t
+        return self._pool
 
-    def getDn(self):
+    def snapshot(self, out=None):
         """
-        Returns whether the ship moved down during the last update
+        Returns the state of this wave packed into a bytearray
+
+        See WaveSim.snapshot.  The time between steps that has not been simulated
+        yet is not saved.
 
-        A getter method that returns self.dn, to tell whether the wave has moved
-        down during the last update. If self.dn == 0, then the wave is moving
-        to the right. If self.dn == 1, then the wave had just moved down. If
-        self.dn == 2, then the wave is moving to the left.
+        Parameter out: the bytearray to pack the snapshot into, or None
+        Precondition: out is a bytearray, or None
         """
-        return self.dn
+        return self._sim.snapshot(out)
 
-    def setDn(self,t):
+    def restore(self, data):
         """
-        Sets self.dn to an int
+        Puts this wave back in the state saved by snapshot
 
-        Sets self.dn to an int of whether the wave has moved down. See self.getDn()
-        for more information
+        The ship, aliens and bolts already made are moved, shown or hidden to match,
+        and nothing is made again.  The recorder is not rewound, so the recording
+        of a wave that has been restored no longer plays it back.
+
+        Parameter data: a snapshot of a wave with the same settings
+        Precondition: data is a bytes-like object returned by snapshot
+        """
+        self._sim.restore(data)
+        self._acc = 0.0
+        self._respawn = 0
+        self._ship = self._shipModel if self._sim.hasShip() else None
+        self._syncShip(0.0)
+        self._block.x, self._block.y = self._sim.getAliens().getOrigin()
+        self._syncAliens()
+        self._syncBolts(0.0)
 
-        Parameter t: The indicator of whether the wave has moved down
-        Precondition: t is 0 <= int <= 2
+    def isReady(self):
         """
-        assert type(t) == int and t >= 0 and t <= 2
-        self.dn = t
+        Returns True if every object of the wave has been made
+
+        A wave made with lazy=True is not ready until prepare returns True.
+        """
+        return self._steps is None
 
     def getShip(self):
         """
@@ -146,7 +159,7 @@ class Wave(object):
         This method return the number of lives the player has left before the
         player gets a Game Over
         """
-        return self._lives
+        return self._sim.getLives()
 
     def getFinish(self):
         """
@@ -155,7 +168,7 @@ class Wave(object):
         This method returns a boolean of whether the game is finished(True) or
         not finished(False)
         """
-        return self.isFinish
+        return self._sim.getFinish()
 
     def getWin(self):
         """
@@ -164,7 +177,7 @@ class Wave(object):
         This method returns true is the player has won the game, and returns
         false if the player has lost the game.
         """
-        return self.isWin
+        return self._sim.getWin()
 
     def getScore(self):
         """
@@ -172,403 +185,276 @@ class Wave(object):
 
         This method returns the score that the player has in the game
         """
-        return self.score
+        return self._sim.getScore()
 
-    def __init__(self):
+    def __init__(self, tickRate=TICK_RATE, seed=None, lazy=False, sounds=None):
         """
         Initializes the ship and the aliens in the wave.
 
-        This method, creates the ship, the aliens and the defense line, initializes
-        the bolt list, time, boltFire, alienSteps, dn, lives, score and the sounds. It
-        also sets rt to True, isWin to False, and isFinish to False.
+        This method creates the simulation, the ship, the aliens and the defense line,
+        initializes the bolt list and the sounds.
+
+        Making the objects of a wave (the aliens above all) takes long enough to
+        skip a frame.  With lazy=True, only the simulation is made here, and the
+        objects are made by calls to prepare, a little at a time.  This way the next
+        wave can be made during the frames when the game is waiting for the player.
+
+        Parameter tickRate: the number of simulation steps per second
+        Precondition: tickRate is an int or float > 0
+
+        Parameter seed: the seed for the random choices of the wave, or None to
+        pick one at random (see WaveSim)
+        Precondition: seed is an int >= 0, or None
+
+        Parameter lazy: whether to wait for prepare to make the objects
+        Precondition: lazy is a bool
+
+        Parameter sounds: the bank to play the sounds of the wave from, or None for
+        the bank shared by the whole game (see SoundBank.shared)
+        Precondition: sounds is a SoundBank, or None
         """
-        self._lives = SHIP_LIVES
-        self._createAliens()
-        self.createShip()
+        assert (type(tickRate) == int or type(tickRate) == float) and tickRate > 0
+        self._tick = 1.0/tickRate
+        self._acc = 0.0
+        self._sim = WaveSim(seed)
+        self._recorder = Recorder(self._sim.getSeed(), tickRate, *self._sim.getSettings())
+        self._respawn = 0
         self._bolts = []
-        self._dline = GPath(points =[0, DEFENSE_LINE, GAME_WIDTH, DEFENSE_LINE]\
-            ,linewidth = 2, linecolor = 'black')
-        self._time = 0
-        self.rt = True
-        self.dn = 0
-        self.boltFire = 0
-        self.alienSteps = 0
-        self.isWin = False
-        self.isFinish = False
-        self.score = 0
-        self.pewShip = Sound('pew1.wav')
-        self.pewAlien = Sound('pew2.wav')
-        self.blastShip = Sound('blast1.wav')
-        self.blastAlien = Sound('blast2.wav')
+        self._pool = BoltPool()
+        self._sounds = SoundBank.shared() if sounds is None else sounds
+        self._steps = self._build()
+        if not lazy:
+            self.prepare()
+
+    def prepare(self, budget=None):
+        """
+        Makes the objects of the wave that are not made yet, for at most budget seconds
+
+        This method returns True if every object has been made.  The work is done
+        one object at a time, so it may run a little past budget.
+
+        Parameter budget: the most time to spend, or None to make every object
+        Precondition: budget is an int or float >= 0, or None
+        """
+        if self._steps is None:
+            return True
+        start = time.perf_counter()
+        for step in self._steps:
+            if not budget is None and time.perf_counter() - start >= budget:
+                return False
+        self._steps = None
+        return True
 
     def update(self,input,t):
         """
         Updates the ship, aliens, and laser bolts to move
 
-        This method updates the aliens movement, the ship movement, adds time,
-        creates the bolt for the alien and the ship, checks for collisions, deletes
-        bolts that are offscreen, and checks for whether there are anymore aliens
-        in the wave and whether the aliens have passed the defense line.
-        It also sets self.boltFire for how many steps the Aliens should travel before
-        shooting a bolt.
+        This method reads the keys held down by the player, steps the simulation,
+        plays the sounds for anything that happened during the steps, and moves the
+        ship, the aliens and the bolts to match the simulation.
+
+        The simulation always steps 1/tickRate seconds at a time, as many times as
+        fit in the time since the last frame.  The time left over is kept for the
+        next frame, and the ship and bolts are drawn that far between the last two
+        steps.  So the game plays at the same speed at any frame rate.
 
         Parameter input: indicates which keyi is being pressed by the user
         Preconditon: input is an instance of GInput
 
         Parameter t: the time being added
-        Preconditon: t is an int or float (asserted in addTime())
-        """
-        if self.boltFire == 0:
-            self.boltFire = random.randint(1,BOLT_RATE)
-        self.moveShip(input)
-        self.addTime(t)
-        self.moveAlien()
-        self.createBolt(input)
-        self.createAlienBolt()
-        self.moveBolts()
-        self.collideBoltAlien()
-        self.collideBoltPlayer()
-        self.delBolts()
-        self.isThereAlien()
-        self.didAlienPass()
+        Preconditon: t is an int or float
+        """
+        assert isinstance(input, GInput) == True
+        assert type(t) == int or type(t) == float
+        inputs = self.readInput(input)
+        self._acc += t
+        ticks = 0
+        events = 0
+        while self._acc >= self._tick and ticks < MAX_TICKS:
+            self._recorder.record(inputs | self._respawn)
+            self._respawn = 0
+            self._sim.step(inputs, self._tick)
+            events |= self._sim.events
+            self._acc -= self._tick
+            ticks += 1
+            if self._sim.getFinish() or not self._sim.hasShip():
+                self._acc = 0.0
+        if self._acc >= self._tick:
+            self._acc = 0.0
+        alpha = self._acc/self._tick
+        self._playSounds(events)
+        self._syncShip(alpha)
+        if events & EVENT_MARCH:
+            self._block.x, self._block.y = self._sim.getAliens().getOrigin()
+        if events & EVENT_ALIEN_HIT:
+            self._syncAliens()
+        self._syncBolts(alpha)
 
     def draw(self,view):
         """
-        Draws the ship, aliens, defensive line and bolts
+        Draws the ship and bolts
 
-        This method draws the ship, aliens, defensive line and bolts. If the aliens
-        are None the method does not draw that alien. If the ship is hit by an alien
+        This method draws the ship and bolts. If the ship is hit by an alien
         bolt and is None, then the ship is not drawn. The bolts are drawn for
-        the aliens and the ship.
+        the aliens and the ship.  The aliens and the defensive line are always on
+        screen, so they are not drawn here; attach them to the view once instead.
         """
-        for q in range(len(self._aliens)):
-            for w in range(len(self._aliens[q])):
-                if self._aliens[q][w] is None:
-                    continue
-                self._aliens[q][w].draw(view)
         if not self._ship is None:
             self._ship.draw(view)
-        self._dline.draw(view)
         for x in range(len(self._bolts)):
             self._bolts[x].draw(view)
 
-    def moveShip(self, i):
+    def attach(self,view):
         """
-        Moves the ship when given the user input
+        Attaches the aliens and the defensive line to the view
 
-        This method moves the ship to the left and to the right when i is supplied
-        by the user
+        They stay on screen, below the ship and bolts, until detach is called.
+        Attaching a wave that is already attached does nothing.
+
+        Parameter view: the view to show the wave in
+        Precondition: view is a GView, and the wave is ready (see isReady)
+        """
+        view.attach(self._block)
+        view.attach(self._dline)
+
+    def detach(self,view):
+        """
+        Takes the aliens and the defensive line out of the view
+
+        Parameter view: the view the wave is attached to
+        Precondition: view is a GView
+        """
+        view.detach(self._block)
+        view.detach(self._dline)
+
+    def readInput(self, i):
+        """
+        Returns the INPUT flags for the keys held down by the player
 
         Parameter i: indicates which key is being pressed by the user
         Preconditon: i is an instance of GInput
         """
-        assert isinstance(i, GInput) == True
-        da = 0
-        if self._ship is None:
-            return
+        inputs = 0
         if i.is_key_down('left'):
-            da -= SHIP_MOVEMENT
+            inputs |= INPUT_LEFT
         if i.is_key_down('right'):
-            da += SHIP_MOVEMENT
-        old = self._ship.getX()
-        new = old + da
-        if new > (GAME_WIDTH - (SHIP_WIDTH/2)):
-            return
-        elif (new < SHIP_WIDTH/2):
-            return
-        self._ship.setX(old + da)
-
-    def moveAlien(self):
-        """
-        Helper method to move all the aliens
-
-        This method first finds the alien in the farthest left column and the top
-        row, and the alien in the farthest right column and bottom row. Using
-        these aliens, the aliens move down once it hits the edge of the game
-        screen, and moves left and right depending on self.rt
-        """
-        for y in range(ALIENS_IN_ROW):
-            if self.isEmptyColumn(y) == False:
-                for x in range(len(self._aliens)):
-                    if not self._aliens[x][y] is None:
-                        wizz = self._aliens[x][y]
-        for y in range(ALIENS_IN_ROW):
-            h = ALIENS_IN_ROW - 1 - y
-            if self.isEmptyColumn(h) == False:
-                for x in range(len(self._aliens)):
-                    if not self._aliens[x][h] is None:
-                        queburt = self._aliens[x][h]
-        if (self._time > ALIEN_SPEED):
-            if (wizz.getX() > (GAME_WIDTH - ALIEN_H_SEP - ALIEN_WIDTH/2)) \
-                and (self.getDn() == 0):
-                self.downAlien()
-            elif (queburt.getX() < (ALIEN_H_SEP + ALIEN_WIDTH/2)) \
-                and (self.getDn() == 2):
-                self.downAlien()
-            elif self.getRt() == True:
-                self.rightAlien()
-            elif self.getRt() == False:
-                self.leftAlien()
-            self._time = 0
-            self.alienSteps += 1
-
-    def rightAlien(self):
-        """
-        Helper method to move all the aliens to the right
-
-        This method moves all the aliens to the right by ALIEN_H_WALK and sets
-        self.Dn to 0 to signify that the aliens are moving to the right
-        """
-        for x in range(len(self._aliens)):
-            for y in range(len(self._aliens[x])):
-                if self._aliens[x][y] is None:
-                    continue
-                old = self._aliens[x][y].getX()
-                self._aliens[x][y].setX(old+ALIEN_H_WALK)
-        self.setDn(0)
-
-    def leftAlien(self):
-        """
-        Helper method to move all the aliens to the left
-
-        This method moves all the aliens to the left by ALIEN_H_WALK and sets
-        self.Dn to 2 to signify that the aliens are moving to the left
-        """
-        for x in range(len(self._aliens)):
-            for y in range(len(self._aliens[x])):
-                if self._aliens[x][y] is None:
-                    continue
-                old = self._aliens[x][y].getX()
-                self._aliens[x][y].setX(old-ALIEN_H_WALK)
-        self.setDn(2)
-
-    def downAlien(self):
-        """
-        Helper method to move all the aliens down
-
-        This method moves all the aliens down by ALIEN_V_WALK and sets
-        self.Dn to 1 to signify that the aliens have just moved down
-        """
-        for x in range(len(self._aliens)):
-            for y in range(len(self._aliens[x])):
-                if self._aliens[x][y] is None:
-                    continue
-                old = self._aliens[x][y].getY()
-                self._aliens[x][y].setY(old-ALIEN_V_WALK)
-        self.setRt(not self.getRt())
-        self.setDn(1)
-
-    def createBolt(self, i):
-        """
-        Helper method to create a bolt for the player when the up key is pressed
-
-        When the 'up' key is pressed by the player, and they are no other bolts
-        that are fired by the ship in the game, then this method creates a bolt
-        that is fired by the ship
-
-        Parameter i: i is the key that is pressed
-        Precondtion: i is a GInput object
-        """
-        assert isinstance(i, GInput) == True
-        for x in self._bolts:
-            if x.isPlayerBolt() == True:
-                return
+            inputs |= INPUT_RIGHT
         if i.is_key_down('up'):
-            self._bolts.append(Bolt(self._ship.getX(),\
-                self._ship.getY() + SHIP_HEIGHT/2, BOLT_SPEED, True))
-            self.pewShip.play()
-
-    def createAlienBolt(self):
-        """
-        Helper method to create an alien bolt
-
-        When self.alienSteps == self.boltFire (when the steps the alien has taken
-        and the steps needed to take for the next alien bolt to be fired equal
-        each other) then this method creates a bolt fired by an alien of the bottom
-        row in a random column.
-        """
-        if self.alienSteps == self.boltFire:
-            x = random.randint(0, ALIENS_IN_ROW-1)
-            while self.isEmptyColumn(x) == True:
-                x = random.randint(0, ALIENS_IN_ROW-1)
-            for q in range(len(self._aliens)):
-                r = ALIEN_ROWS - 1 - q
-                if not self._aliens[r][x] is None:
-                    break
-            self._bolts.append(Bolt(self._aliens[r][x].getX(), self._aliens\
-                [r][x].getY(), -BOLT_SPEED, False))
-            self.alienSteps = 0
-            self.boltFire = 0
-            self.pewAlien.play()
-
-    def isEmptyColumn(self,x):
-        """
-        Helper method to see whether column x is empty
-
-        This method checks through column x of self._aliens to see if there are
-        any more aliens in that column. it returns True if there are no more aliens
-        in that column, and it returns False if there are aliens in that column
-
-        Parameter x: The column being checked
-        Preconditon: x is int < ALIENS_IN_ROW
-        """
-        assert type(x) == int and x < ALIENS_IN_ROW
-        for q in range(ALIEN_ROWS):
-            if not self._aliens[q][x] is None:
-                return False
-        return True
+            inputs |= INPUT_FIRE
+        return inputs
 
-    def isEmptyRow(self,x):
+    def createShip(self):
         """
-        Helper method to see whether row x of the aliens is empty
+        A helper method to create the ship object
 
-        This method checks through row x of self._aliens to see if there are any
-        aliens in the row. It returns true if there are no aliens in the row,
-        and it returns False if there are aliens in that row.
+        This method places a new ship in the simulation and puts the ship object
+        back in the middle of the screen
+        """
+        self._sim.createShip()
+        self._respawn = INPUT_RESPAWN
+        self._ship = self._shipModel
+        self._ship.setX(self._sim.getShipX())
 
-        Parameter x: The row being checked
-        Preconditon: x is int < ALIEN_ROWS
+    def _playSounds(self, events):
         """
-        assert type(x) == int and x < ALIEN_ROWS
-        for q in range(ALIENS_IN_ROW):
-            if not self._aliens[x][q] is None:
-                return False
-            return True
+        Plays the sounds for the EVENT flags raised by the last step
+
+        Parameter events: the events raised by the simulation
+        Precondition: events is an int combining EVENT flags
+        """
+        for flag, name in EVENT_SOUNDS:
+            if events & flag:
+                self._sounds.play(name)
+
+    def _syncShip(self, alpha):
+        """
+        Moves the ship object to match the simulation
+
+        The ship object is set to None once the ship is hit.
+
+        Parameter alpha: how far to draw the ship between the last two steps
+        Precondition: alpha is a float, 0 <= alpha < 1
+        """
+        if not self._sim.hasShip():
+            self._ship = None
+        elif not self._ship is None:
+            old = self._sim.getPrevShipX()
+            self._ship.setX(old + (self._sim.getShipX() - old)*alpha)
 
-    def moveBolts(self):
+    def _syncAliens(self):
         """
-        Helper method to move the bolts
+        Shows only the aliens that are alive in the simulation
 
-        This method moves all the bolts depending on their velocity
+        Only the aliens that died or came back are changed in the mesh of the block.
+        The aliens never move on their own, since the whole block is moved by the
+        offset of the formation.
         """
-        for x in self._bolts:
-            old = x.getY()
-            x.setY(old + x.getVelocity())
+        self._block.set_all_visible(self._sim.getAliens().alive.ravel().tolist())
 
-    def delBolts(self):
+    def _syncBolts(self, alpha):
         """
-        Helper method to delete the bolts once they go off screen
+        Moves the bolt objects to match the bolts in the simulation
+
+        Bolt objects are taken from the pool when there are more bolts in the
+        simulation than on screen, and given back when there are fewer.
 
-        This method checks through all the bolts in self._bolts to see if they
-        go off screen, and when they do, they get deleted from the list.
+        Parameter alpha: how far to draw the bolts between the last two steps
+        Precondition: alpha is a float, 0 <= alpha < 1
         """
-        x = 0
-        while x < len(self._bolts):
-            if self._bolts[x].getY() > (GAME_HEIGHT + BOLT_HEIGHT/2):
-                del self._bolts[x]
-            elif self._bolts[x].getY() < -BOLT_HEIGHT/2:
-                del self._bolts[x]
+        bank = self._sim.getBolts()
+        n = bank.count
+        xs = bank.x[:n].tolist()
+        ys = (bank.py[:n] + (bank.y[:n] - bank.py[:n])*alpha).tolist()
+        vs = bank.vy[:n].tolist()
+        owners = bank.owner[:n].tolist()
+        for k in range(n):
+            x, y, v, player = xs[k], ys[k], vs[k], owners[k] != OWNER_ALIEN
+            if k >= len(self._bolts):
+                self._bolts.append(self._pool.acquire(x, y, v, player))
             else:
-                x += 1
-
-    def collideBoltAlien(self):
-        """
-        Helper method to check whether the bolt fired by the player hit any aliens.
-
-        This method first find the bolt fired by the player and checks through
-        all the aliens to see if that bolt hit any of the aliens. If it hits an
-        alien, then the alien is set to None and the bolt is removed. This method
-        also accumalates the score. If the alien hit is within the bottom half
-        rows, then score is increased by ten. If the alien hit is within the top
-        half rows, then the score is increased by twenty.
-        """
-        for q in self._bolts:
-            if q.isPlayerBolt() == True:
-                for x in range(len(self._aliens)):
-                    for y in range(len(self._aliens[x])):
-                        if (not self._aliens[x][y] is None) and (self._aliens\
-                            [x][y].collides(q) == True):
-                            if ALIEN_ROWS/(x+1) >= ALIEN_ROWS/2:
-                                self.score+=20
-                            else:
-                                self.score+=10
-                            self._aliens[x][y] = None
-                            self._bolts.remove(q)
-                            self.blastAlien.play()
-                            return
-
-    def collideBoltPlayer(self):
-        """
-        Helper method to check whether any alien bolts collided with the ship
-
-        This method checks the bolts in the list self._bolts to see if they
-        collide with the player. Once it sees that a bolt has collided with the
-        ship, then is sets the ship to None, deletes the bolt and decreases the
-        lives of the ship by one.
-        """
-        for q in range(len(self._bolts)):
-            if self._ship.collides(self._bolts[q]) == True:
-                self.blastShip.play()
-                self._ship = None
-                del self._bolts[q]
-                self._lives -=1
-                if self._lives == 0:
-                    self.isFinish = True
-                return
-
-    def isThereAlien(self):
-        """
-        Helper method to check if there are still aliens in the wave.
-
-        This method checks through all the aliens in the self._aliens list to
-        see if there are anymore aliens in the wave, If there are no more aliens,
-        theb self.isFinish is set to True, and self.isWin is set to True.
-        """
-        for x in range(len(self._aliens)):
-            for y in range(len(self._aliens[x])):
-                if not self._aliens[x][y] is None:
-                    return
-        self.isFinish = True
-        self.isWin = True
-
-    def didAlienPass(self):
-        """
-        Helper method to check when the aliens have passed the defense line.
-
-        This method checks through the aliens on the bottom row to see if they
-        past the defense line. If the aliens pass the defense line, then self.isFinish
-        is set to True.
-        """
-        for x in range(ALIEN_ROWS):
-            need = ALIEN_ROWS - 1 - x
-            if self.isEmptyRow(x) == False:
-                for y in range(ALIENS_IN_ROW):
-                    if (not self._aliens[need][y] is None) and ((self._aliens\
-                        [need][y].getY() - ALIEN_HEIGHT/2) <= DEFENSE_LINE):
-                        self.isFinish = True
-                        return
+                self._bolts[k].reset(x, y, v, player)
+        while len(self._bolts) > n:
+            self._pool.release(self._bolts.pop())
 
-    def createShip(self):
+    def _build(self):
         """
-        A helper method to create the ship object
+        Makes the aliens, the ship, the defense line and the sounds, one at a time
 
-        This method creates the ship object using the SHip constructor
+        This method is a generator, and yields after each object (see prepare).
         """
-        self._ship = Ship(GAME_WIDTH/2 , SHIP_BOTTOM)
+        for step in self._createAliens():
+            yield
+        self._shipModel = Ship(self._sim.getShipX(), SHIP_BOTTOM)
+        self._ship = None
+        self.createShip()
+        self._respawn = 0
+        yield
+        self._dline = GPath(points =[0, DEFENSE_LINE, GAME_WIDTH, DEFENSE_LINE]\
+            ,linewidth = 2, linecolor = 'black')
+        yield
+        for name in WAVE_SOUNDS:
+            self._sounds.load(name, name)
+            yield
 
     def _createAliens(self):
         """
-        A helper method that creates the _aliens 2D list.
-
-        This method creates a 2d list of all the aliens in a wave with the
-        dimensions ALIEN_ROWS by ALIENS_IN_ROW.
-        """
-        y = 0
-        x = 0
-        i = ''
-        r = 0
-        self._aliens = []
-        for q in range(ALIEN_ROWS):
-            t = []
-            y = GAME_HEIGHT - (ALIEN_CEILING + q*(ALIEN_V_SEP) + q*(\
-                ALIEN_HEIGHT))
-            for w in range(ALIENS_IN_ROW):
-                x = (w+2)*ALIEN_H_SEP + w*ALIEN_WIDTH
-                t.append(Alien(x,y,i))
-            self._aliens.append(t)
-            x = 0
-        for q in range(ALIEN_ROWS):
-            r = q
-            for w in range(ALIENS_IN_ROW):
-                i = ALIEN_IMAGES[int(r%(len(ALIEN_IMAGES)*2)//2)]
-                self._aliens[ALIEN_ROWS-q-1][w].setSource(i)
+        A helper method that creates the block of aliens.
+
+        This method places all the aliens in a wave, ALIEN_ROWS by ALIENS_IN_ROW, at
+        the grid slots and with the images given by the simulation, and makes the
+        block that draws them.  It is a generator, and yields after each row and
+        after making the block (see prepare).
+        """
+        aliens = self._sim.getAliens()
+        sources = []
+        positions = []
+        for r in range(aliens.rows):
+            for c in range(aliens.cols):
+                sources.append(aliens.getImage(r))
+                positions.append(aliens.getSlot(r, c))
+            yield
+        ox, oy = aliens.getOrigin()
+        self._block = GBatch(x=ox, y=oy, width=ALIEN_WIDTH, height=ALIEN_HEIGHT,
+            sources=sources, positions=positions,
+            visible=aliens.alive.ravel().tolist())
+        yield